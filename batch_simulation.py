@@ -0,0 +1,434 @@
+# A batched simulation engine for Monte-Carlo sweeps.
+# Many independent single-core simulations advance in lockstep, with the state of every run
+# in NumPy arrays, so the per-event Python overhead is paid once per step for the whole batch
+# rather than once per event per run.
+import numpy as np
+
+from job import COMPUTE_CODE, TASK_TYPES
+from job_timeline import make_workload
+from metrics import job_weights
+
+# Scheduling policies, named as in main.SCHEDULERS
+FIFO = "FIFO"
+ROUND_ROBIN = "RR"
+PRIORITY = "priority"
+POLICIES = (FIFO, ROUND_ROBIN, PRIORITY)
+
+# Core states
+IDLE = 0
+SWITCHING = 1
+COMPUTING = 2
+STALLED = 3
+
+# The kinds of events a run can process in a step, in the order of the rows of the next event times
+ARRIVAL = 0
+CORE = 1  # the job on the core finished switching or computing, depending on the core state
+QUANTUM = 2
+IO = 3
+
+NOT_IN_POOL = np.iinfo(np.int64).max
+
+# The I/O device of each task type code, or -1 for compute tasks
+IO_CODES = [code for code in range(len(TASK_TYPES)) if code != COMPUTE_CODE]
+NUM_DEVICES = len(IO_CODES)
+DEVICE_OF_CODE = np.full(len(TASK_TYPES), -1)
+DEVICE_OF_CODE[IO_CODES] = np.arange(NUM_DEVICES)
+
+
+class BatchSimulation:
+    """
+    Runs a batch of independent single-core simulations in lockstep.
+
+    Each run follows the same rules as Simulation with one core, a FIFO I/O device per task type
+    and a scheduler of the given policy, so the runs have the same job arrival, first dispatch
+    and completion times as Simulation for the same workloads:
+    - FIFO runs the oldest job, like FIFOScheduler.
+    - RR runs each job in turn, with new jobs going to the front of the queue, like RoundRobinScheduler.
+    - priority runs the job with the lowest priority value, then the oldest, like PriorityScheduler.
+
+    In every step each unfinished run processes its next event. Runs which processed all of the events
+    at their current time and need a decision first apply their policy's decision.
+    Events at the same time are processed in an arbitrary order: their effects don't depend on it
+    before the decision that follows them.
+
+    Args:
+        workloads: list of Workload, one per run.
+        policy: one of POLICIES.
+        schedule_every: the time slice, as for Simulation. None or 0 disables time slicing.
+        context_switch_time: how long it takes the core to switch to a new job.
+        ready_only: only pick jobs which are ready to run. Not supported for RR.
+    """
+
+    def __init__(
+        self,
+        workloads,
+        policy,
+        schedule_every=10,
+        context_switch_time=2,
+        ready_only=False,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unrecognized policy: {policy}")
+        if ready_only and policy == ROUND_ROBIN:
+            raise ValueError("The batched engine does not support ready_only for RR")
+        self.policy = policy
+        self.schedule_every = schedule_every or 0
+        self.context_switch_time = context_switch_time
+        self.ready_only = ready_only
+
+        num_runs = len(workloads)
+        self.num_jobs = np.array([len(w.priorities) for w in workloads])
+        max_jobs = int(self.num_jobs.max())
+        max_tasks = max(len(w.durations) for w in workloads)
+        self.task_types = np.zeros((num_runs, max_tasks), np.int8)
+        self.durations = np.zeros((num_runs, max_tasks))
+        self.job_start = np.zeros((num_runs, max_jobs), np.int64)
+        self.job_end = np.zeros((num_runs, max_jobs), np.int64)
+        self.priorities = np.zeros((num_runs, max_jobs), np.int64)
+        # one extra column, so that the start time of the next arrival is inf once every job arrived
+        self.start_times = np.full((num_runs, max_jobs + 1), np.inf)
+        for run, workload in enumerate(workloads):
+            n_jobs, n_tasks = len(workload.priorities), len(workload.durations)
+            self.task_types[run, :n_tasks] = workload.task_types
+            self.durations[run, :n_tasks] = workload.durations
+            self.job_start[run, :n_jobs] = workload.job_offsets[:-1]
+            self.job_end[run, :n_jobs] = workload.job_offsets[1:]
+            self.priorities[run, :n_jobs] = workload.priorities
+            self.start_times[run, :n_jobs] = workload.start_times
+
+        # Jobs
+        self.cursor = self.job_start.copy()
+        self.remaining = np.take_along_axis(
+            self.durations, np.minimum(self.job_start, max_tasks - 1), axis=1
+        )
+        self.resident = np.zeros((num_runs, max_jobs), bool)
+        self.blocked = np.zeros((num_runs, max_jobs), bool)
+        self.io_done = np.full((num_runs, max_jobs), np.inf)
+        self.num_resident = np.zeros(num_runs, np.int64)
+        self.next_arrival = np.zeros(num_runs, np.int64)
+        self.dispatch_time = np.full((num_runs, max_jobs), np.nan)
+        self.completion_time = np.full((num_runs, max_jobs), np.nan)
+
+        # The core, and its pending events
+        self.clock = np.zeros(num_runs)
+        self.need_scheduling = np.zeros(num_runs, bool)
+        self.core_job = np.full(num_runs, -1)
+        self.core_state = np.full(num_runs, IDLE)
+        # when the switch or the compute task of the job on the core ends
+        self.core_time = np.full(num_runs, np.inf)
+        self.quantum_time = np.full(num_runs, np.inf)
+        self.context_switches = np.zeros(num_runs, np.int64)
+
+        # FIFO I/O devices: a ring buffer of the waiting jobs of each device, and the completion time of the first
+        self.device_queue = np.zeros((num_runs, NUM_DEVICES, max_jobs), np.int64)
+        self.device_head = np.zeros((num_runs, NUM_DEVICES), np.int64)
+        self.device_count = np.zeros((num_runs, NUM_DEVICES), np.int64)
+        self.device_next = np.full((num_runs, NUM_DEVICES), np.inf)
+        self.device_tail = np.zeros((num_runs, NUM_DEVICES))
+
+        # Each run picks the job with the lowest key. Jobs the policy can't pick have the key NOT_IN_POOL.
+        # FIFO and priority jobs have fixed keys. The round robin queue is the resident jobs in increasing
+        # order of their keys: new jobs get keys below every other key, and the job picked to run a key
+        # above every other key.
+        self.keys = np.full((num_runs, max_jobs), NOT_IN_POOL)
+        job_index = np.arange(max_jobs)
+        if policy == PRIORITY:
+            self.job_keys = self.priorities * max_jobs + job_index
+        else:
+            self.job_keys = np.broadcast_to(job_index, (num_runs, max_jobs))
+        self.rr_front = np.zeros(num_runs, np.int64)
+        self.rr_back = np.zeros(num_runs, np.int64)
+        # the jobs which arrived before job rr_queued are in the queue
+        self.rr_queued = np.zeros(num_runs, np.int64)
+
+    def is_finished(self):
+        """Returns a bool array of which runs are finished."""
+        return (self.num_resident == 0) & (self.next_arrival == self.num_jobs)
+
+    def run(self):
+        """Steps every run until all of them are finished."""
+        while True:
+            runs = np.flatnonzero(~self.is_finished())
+            if not runs.size:
+                return self
+            self.step(runs)
+
+    def step(self, runs):
+        """
+        Processes the next event of each of the given runs.
+        Runs which processed every event at their current time and need a decision make it first.
+        """
+        kinds, next_times = self._next_events(runs)
+        deciding = self.need_scheduling[runs] & (next_times > self.clock[runs])
+        if deciding.any():
+            self._decide(runs[deciding])
+            # the decision changed the core's events
+            kinds, next_times = self._next_events(runs)
+        self.clock[runs] = next_times
+
+        self._arrive(runs[kinds == ARRIVAL])
+        core_runs = runs[kinds == CORE]
+        switched = core_runs[self.core_state[core_runs] == SWITCHING]
+        computed = core_runs[self.core_state[core_runs] == COMPUTING]
+        quantum_runs = runs[kinds == QUANTUM]
+        self.quantum_time[quantum_runs] = np.inf
+        self.need_scheduling[quantum_runs] = True
+        io_runs = runs[kinds == IO]
+
+        # Each of these returns the runs whose job on the core starts its next task
+        self._start_next_task(
+            np.concatenate(
+                [
+                    self._switching_done(switched),
+                    self._computing_done(computed),
+                    self._io_done(io_runs),
+                ]
+            )
+        )
+
+    def _next_events(self, runs):
+        """Returns the kind and time of the next event of each run."""
+        event_times = np.stack(
+            [
+                self.start_times[runs, self.next_arrival[runs]],
+                self.core_time[runs],
+                self.quantum_time[runs],
+                self.device_next[runs].min(axis=1),
+            ]
+        )
+        kinds = event_times.argmin(axis=0)
+        return kinds, event_times[kinds, np.arange(runs.size)]
+
+    def _arrive(self, runs):
+        job_ids = self.next_arrival[runs]
+        self.resident[runs, job_ids] = True
+        if self.policy != ROUND_ROBIN:
+            self.keys[runs, job_ids] = self.job_keys[runs, job_ids]
+        self.num_resident[runs] += 1
+        self.next_arrival[runs] += 1
+        self.need_scheduling[runs] = True
+
+    def _switching_done(self, runs):
+        job_ids = self.core_job[runs]
+        first = np.isnan(self.dispatch_time[runs, job_ids])
+        self.dispatch_time[runs[first], job_ids[first]] = self.clock[runs[first]]
+        self.core_state[runs] = STALLED
+        self.core_time[runs] = np.inf
+        return runs[~self.blocked[runs, job_ids]]
+
+    def _computing_done(self, runs):
+        self._advance(runs, self.core_job[runs])
+        self.need_scheduling[runs] = True
+        return runs
+
+    def _io_done(self, runs):
+        devices = self.device_next[runs].argmin(axis=1)
+        heads = self.device_head[runs, devices]
+        job_ids = self.device_queue[runs, devices, heads]
+        heads = (heads + 1) % self.device_queue.shape[2]
+        self.device_head[runs, devices] = heads
+        self.device_count[runs, devices] -= 1
+        self.device_next[runs, devices] = np.where(
+            self.device_count[runs, devices] > 0,
+            self.io_done[runs, self.device_queue[runs, devices, heads]],
+            np.inf,
+        )
+        self.io_done[runs, job_ids] = np.inf
+        self.blocked[runs, job_ids] = False
+        if self.ready_only:
+            self.keys[runs, job_ids] = self.job_keys[runs, job_ids]
+        self._advance(runs, job_ids)
+        self.need_scheduling[runs] = True
+        on_core = (self.core_job[runs] == job_ids) & (
+            self.core_state[runs] != SWITCHING
+        )
+        return runs[on_core]
+
+    def _advance(self, runs, job_ids):
+        """Finishes the current task of each job."""
+        cursor = self.cursor[runs, job_ids] + 1
+        self.cursor[runs, job_ids] = cursor
+        has_tasks = cursor < self.job_end[runs, job_ids]
+        self.remaining[runs[has_tasks], job_ids[has_tasks]] = self.durations[
+            runs[has_tasks], cursor[has_tasks]
+        ]
+
+    def _start_next_task(self, runs):
+        job_ids = self.core_job[runs]
+        cursor = self.cursor[runs, job_ids]
+        done = cursor >= self.job_end[runs, job_ids]
+
+        # Jobs with no tasks left exit
+        exiting, exit_ids = runs[done], job_ids[done]
+        self.resident[exiting, exit_ids] = False
+        self.keys[exiting, exit_ids] = NOT_IN_POOL
+        self.num_resident[exiting] -= 1
+        self.completion_time[exiting, exit_ids] = self.clock[exiting]
+        self._release(exiting)
+        self.need_scheduling[exiting] = self.num_resident[exiting] > 0
+
+        runs, job_ids, cursor = runs[~done], job_ids[~done], cursor[~done]
+        devices = DEVICE_OF_CODE[self.task_types[runs, cursor]]
+        remaining = self.remaining[runs, job_ids]
+
+        computing = devices < 0
+        compute_runs = runs[computing]
+        self.core_state[compute_runs] = COMPUTING
+        self.core_time[compute_runs] = self.clock[compute_runs] + remaining[computing]
+        self._start_quantum(compute_runs)
+
+        waiting = ~computing
+        io_runs, io_jobs, devices = runs[waiting], job_ids[waiting], devices[waiting]
+        start = np.maximum(self.clock[io_runs], self.device_tail[io_runs, devices])
+        done_time = start + remaining[waiting]
+        self.device_tail[io_runs, devices] = done_time
+        self.io_done[io_runs, io_jobs] = done_time
+        count = self.device_count[io_runs, devices]
+        slot = (self.device_head[io_runs, devices] + count) % self.device_queue.shape[2]
+        self.device_queue[io_runs, devices, slot] = io_jobs
+        self.device_count[io_runs, devices] = count + 1
+        first = count == 0
+        self.device_next[io_runs[first], devices[first]] = done_time[first]
+        self.blocked[io_runs, io_jobs] = True
+        if self.ready_only:
+            self.keys[io_runs, io_jobs] = NOT_IN_POOL
+        self.core_state[io_runs] = STALLED
+        self.core_time[io_runs] = np.inf
+        self.quantum_time[io_runs] = np.inf
+
+    def _start_quantum(self, runs):
+        if self.schedule_every:
+            runs = runs[np.isinf(self.quantum_time[runs])]
+            self.quantum_time[runs] = self.clock[runs] + self.schedule_every
+
+    def _release(self, runs):
+        self.core_job[runs] = -1
+        self.core_state[runs] = IDLE
+        self.core_time[runs] = np.inf
+        self.quantum_time[runs] = np.inf
+
+    def _decide(self, runs):
+        choices = self._choose(runs)
+        current = self.core_job[runs]
+        switching = choices != current
+
+        # Take the current job off the core, saving the progress of its compute task
+        descheduled = runs[switching & (current >= 0)]
+        computing = descheduled[self.core_state[descheduled] == COMPUTING]
+        self.remaining[computing, self.core_job[computing]] = (
+            self.core_time[computing] - self.clock[computing]
+        )
+        self._release(descheduled)
+
+        dispatched = switching & (choices >= 0)
+        dispatched_runs = runs[dispatched]
+        self.core_job[dispatched_runs] = choices[dispatched]
+        self.core_state[dispatched_runs] = SWITCHING
+        self.core_time[dispatched_runs] = (
+            self.clock[dispatched_runs] + self.context_switch_time
+        )
+        self.context_switches[dispatched_runs] += 1
+
+        # A job which keeps the core starts its next time slice
+        kept = runs[~switching]
+        self._start_quantum(kept[self.core_state[kept] == COMPUTING])
+        self.need_scheduling[runs] = False
+
+    def _choose(self, runs):
+        """Returns the job each run's policy picks, or -1 to leave the core idle."""
+        if self.policy == ROUND_ROBIN:
+            self._queue_arrivals(runs)
+        keys = self.keys[runs]
+        choices = keys.argmin(axis=1)
+        if self.policy == ROUND_ROBIN:
+            # the picked job moves to the back of the queue
+            self.keys[runs, choices] = self.rr_back[runs]
+            self.rr_back[runs] += 1
+        # With ready_only and every job blocked, the current job keeps the core
+        in_pool = keys[np.arange(runs.size), choices] != NOT_IN_POOL
+        return np.where(in_pool, choices, self.core_job[runs])
+
+    def _queue_arrivals(self, runs):
+        """Puts the jobs which arrived since the last decision at the front of the queue, in arrival order."""
+        runs = runs[self.rr_queued[runs] < self.next_arrival[runs]]
+        first, end = self.rr_queued[runs], self.next_arrival[runs]
+        job_index = np.arange(self.keys.shape[1])
+        new = (job_index >= first[:, None]) & (job_index < end[:, None])
+        # job j gets key front - (end - j), so the first arrival gets the lowest key
+        keys = (self.rr_front[runs] - end)[:, None] + job_index
+        self.keys[runs] = np.where(new, keys, self.keys[runs])
+        self.rr_front[runs] -= end - first
+        self.rr_queued[runs] = end
+
+    def job_times(self):
+        """
+        Returns arrays of shape (runs, jobs) of the time each job arrived, was first dispatched and completed.
+        Padding for runs with fewer jobs is NaN.
+        """
+        arrival = self.start_times[:, :-1].copy()
+        arrival[np.isinf(arrival)] = np.nan
+        return arrival, self.dispatch_time, self.completion_time
+
+    def results(self):
+        """Returns the per-run metrics, as run by main.run_simulation: a dict of arrays with one entry per run."""
+        arrival, dispatch, completion = self.job_times()
+        is_job = ~np.isnan(arrival)
+        weights = np.where(is_job, job_weights(self.priorities), 0.0)
+
+        def weighted_mean(values):
+            return (np.where(is_job, values, 0.0) * weights).sum(axis=1) / weights.sum(
+                axis=1
+            )
+
+        makespan = np.nanmax(completion, axis=1)
+        # every compute task runs to completion, and the padding has no duration
+        compute_time = np.where(
+            self.task_types == COMPUTE_CODE, self.durations, 0.0
+        ).sum(axis=1)
+        return {
+            "turnaround": weighted_mean(completion - arrival),
+            "response": weighted_mean(dispatch - arrival),
+            "context_switches": self.context_switches,
+            "makespan": makespan,
+            "utilization": compute_time / makespan,
+        }
+
+
+def run_batch(
+    policy,
+    num_jobs,
+    max_start_time,
+    seeds,
+    ready_only=False,
+    num_cores=1,
+    schedule_every=10,
+    context_switch_time=2,
+):
+    """
+    Runs one simulation per seed with the batched engine, on the same workloads as main.run_simulation.
+    The batched engine only simulates one core.
+
+    Returns:
+        list of dicts of each run's seed and metrics, in seed order.
+    """
+    if num_cores != 1:
+        raise ValueError("The batched engine only simulates one core")
+    workloads = [make_workload(num_jobs, max_start_time, rng=seed) for seed in seeds]
+    results = (
+        BatchSimulation(
+            workloads,
+            policy,
+            schedule_every=schedule_every,
+            context_switch_time=context_switch_time,
+            ready_only=ready_only,
+        )
+        .run()
+        .results()
+    )
+    return [
+        {
+            "seed": seed,
+            **{name: values[run].item() for name, values in results.items()},
+        }
+        for run, seed in enumerate(seeds)
+    ]
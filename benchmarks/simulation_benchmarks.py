@@ -0,0 +1,228 @@
+# Benchmarks for the simulator core, compared against a stored baseline.
+#
+#   python benchmarks/simulation_benchmarks.py                    # run and compare with baseline.json
+#   python benchmarks/simulation_benchmarks.py --sizes 1000,10000 # a quick subset
+#   python benchmarks/simulation_benchmarks.py --save-baseline    # record a new baseline
+#
+# Each case runs one scheduler on a fixed-seed workload in a fresh process, so that its peak memory
+# is its own. Exits with status 1 if any case regressed by more than the threshold.
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from history import NONE
+from job_timeline import make_workload, workload_to_job_timeline
+from main import SCHEDULERS, make_scheduler
+from profiling import SimulationProfile
+from simulation import Simulation
+
+SIZES = (1000, 10_000, 100_000, 1_000_000)
+# The random scheduler is left out by default: under it the number of resident jobs grows with the workload,
+# and each of its decisions costs O(resident jobs), so its large cases take hours.
+BENCHMARK_SCHEDULERS = ("FIFO", "RR", "priority")
+# Jobs arrive every ARRIVAL_GAP time units on average, which keeps the CPU busy without
+# letting the number of resident jobs grow with the size of the workload.
+ARRIVAL_GAP = 50
+SEED = 0
+# Small cases are repeated until they have run for this long, and the fastest run is kept
+MIN_SECONDS = 3.0
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json"
+)
+# Higher is better for these metrics, lower is better for the others
+THROUGHPUT_METRICS = ("events_per_second", "decisions_per_second")
+COMPARED_METRICS = THROUGHPUT_METRICS + ("peak_rss_mb",)
+
+
+def case_name(scheduler_type, num_jobs):
+    return f"{scheduler_type}/{num_jobs}"
+
+
+def run_case(scheduler_type, num_jobs, repeat=1, min_seconds=MIN_SECONDS):
+    """
+    Runs one scheduler on the fixed-seed workload of num_jobs jobs and returns its measurements.
+    The run is repeated at least repeat times, and until the runs have taken min_seconds in all,
+    so that small cases aren't dominated by noise. Times are from the fastest run.
+    Generating the workload is not timed.
+    """
+    best = None
+    num_runs = 0
+    total_seconds = 0.0
+    while num_runs < repeat or total_seconds < min_seconds:
+        job_timeline = workload_to_job_timeline(
+            make_workload(num_jobs, num_jobs * ARRIVAL_GAP, rng=SEED)
+        )
+        # only the scheduler is timed, so the other phases run at full speed
+        profile = SimulationProfile(timers=("schedule",))
+        simulation = Simulation(job_timeline, record=NONE, profile=profile)
+        scheduler = make_scheduler(scheduler_type)
+        start = time.perf_counter()
+        simulation.run(scheduler)
+        seconds = time.perf_counter() - start
+        num_runs += 1
+        total_seconds += seconds
+        if best is None or seconds < best[0]:
+            best = (seconds, profile)
+
+    seconds, profile = best
+    counters = profile.counters
+    decisions = counters["scheduling_decisions"]
+    schedule_seconds = profile.timers.get("schedule", [0, 0.0])[1]
+    return {
+        "seconds": seconds,
+        "events": counters["events_processed"],
+        "decisions": decisions,
+        "events_per_second": counters["events_processed"] / seconds,
+        "decisions_per_second": decisions / seconds,
+        # the scheduler's share of the run, and its cost per decision
+        "scheduler_fraction": schedule_seconds / seconds,
+        "scheduler_us_per_decision": 1e6 * schedule_seconds / max(1, decisions),
+        "max_queue_length": counters["max_queue_length"],
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        / (1 << 20 if sys.platform == "darwin" else 1 << 10),
+    }
+
+
+def _run_case_star(args):
+    return run_case(*args)
+
+
+def run_benchmarks(sizes=SIZES, scheduler_types=BENCHMARK_SCHEDULERS, repeat=1):
+    """Runs every case, each in a new process. Returns a dict of {case name: measurements}."""
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for num_jobs in sizes:
+        for scheduler_type in scheduler_types:
+            with context.Pool(1) as pool:
+                result = pool.apply(
+                    _run_case_star, ((scheduler_type, num_jobs, repeat),)
+                )
+            name = case_name(scheduler_type, num_jobs)
+            results[name] = result
+            print(
+                f"{name:>18} {result['seconds']:>9.2f}s {result['events_per_second']:>11.0f} events/s"
+                f" {result['decisions_per_second']:>11.0f} decisions/s"
+                f" {result['scheduler_us_per_decision']:>7.2f} us/decision"
+                f" {result['peak_rss_mb']:>8.1f} MB",
+                flush=True,
+            )
+    return results
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares results with the baseline's. Cases missing from either are skipped.
+
+    Returns:
+        list of (case name, metric, baseline value, new value) for each metric which got worse by more
+        than threshold, as a fraction: lower throughput or higher peak memory.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = expected[metric], result[metric]
+            if metric in THROUGHPUT_METRICS:
+                worse = new < old * (1 - threshold)
+            else:
+                worse = new > old * (1 + threshold)
+            if worse:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the simulator on fixed-seed workloads and compare against a baseline"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=str,
+        default=",".join(map(str, SIZES)),
+        help="Comma-separated workload sizes, in jobs",
+    )
+    parser.add_argument(
+        "--schedulers",
+        type=str,
+        default=",".join(BENCHMARK_SCHEDULERS),
+        help=f"Comma-separated schedulers, from {sorted(SCHEDULERS)}",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="Keep the fastest of this many runs"
+    )
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="The fraction a metric can get worse by before it counts as a regression",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results as the baseline, merged with the cases already in it",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Also write the results to this JSON file",
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        [int(size) for size in args.sizes.split(",")],
+        args.schedulers.split(","),
+        args.repeat,
+    )
+    report = {"machine": machine_info(), "cases": results}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    if args.save_baseline:
+        cases = dict(baseline["cases"]) if baseline else {}
+        cases.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump({"machine": machine_info(), "cases": cases}, file, indent=2)
+            file.write("\n")
+        print(f"Saved the baseline to {args.baseline}")
+    elif baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+    else:
+        if baseline["machine"] != report["machine"]:
+            print(
+                "Warning: the baseline was recorded on a different machine:",
+                json.dumps(baseline["machine"]),
+            )
+        regressions = compare(results, baseline["cases"], args.threshold)
+        for name, metric, old, new in regressions:
+            print(f"REGRESSION {name} {metric}: {old:.1f} -> {new:.1f}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}")
@@ -0,0 +1,157 @@
+class IODevice:
+    """
+    A FIFO I/O resource, such as memory, a disk or a network interface.
+
+    Requests are served one at a time in the order they arrive, so the device only needs to remember
+    when its last queued request will complete. Enqueueing a request is O(1).
+
+    Attributes:
+        name (str): The task type served by this device.
+        tail_time (float): The time at which the last queued request completes.
+        queue_length (int): The number of requests queued or in service.
+        max_queue_length (int): The largest queue length seen so far.
+        num_requests (int): The total number of requests enqueued.
+        busy_time (float): The total service time of all requests enqueued.
+        total_wait_time (float): The total time requests spent waiting for earlier requests to finish.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.tail_time = None
+        self.queue_length = 0
+        self.max_queue_length = 0
+        self.num_requests = 0
+        self.busy_time = 0
+        self.total_wait_time = 0
+        self._queue_area = 0
+        self._last_update = 0
+
+    def enqueue(self, time, duration):
+        """
+        Queue a request at the given time.
+
+        Args:
+            time (float): The time at which the request is issued.
+            duration (float): How long the device takes to serve the request.
+
+        Returns:
+            The time at which the request completes.
+        """
+        self._update_queue_area(time)
+        start_time = time
+        if self.tail_time is not None and self.tail_time > time:
+            start_time = self.tail_time
+        self.tail_time = start_time + duration
+        self.queue_length += 1
+        if self.queue_length > self.max_queue_length:
+            self.max_queue_length = self.queue_length
+        self.num_requests += 1
+        self.busy_time += duration
+        self.total_wait_time += start_time - time
+        return self.tail_time
+
+    def complete(self, time):
+        """
+        Record that the request at the head of the queue finished at the given time.
+        """
+        self._update_queue_area(time)
+        self.queue_length -= 1
+
+    def utilization(self, time):
+        """
+        The fraction of time up to the given time that the device spent serving requests.
+        """
+        if not time:
+            return 0.0
+        busy_time = self.busy_time
+        if self.tail_time is not None and self.tail_time > time:
+            busy_time -= self.tail_time - time
+        return busy_time / time
+
+    def mean_queue_length(self, time):
+        """
+        The time-averaged number of requests queued or in service up to the given time.
+        """
+        if not time:
+            return 0.0
+        return (
+            self._queue_area + self.queue_length * (time - self._last_update)
+        ) / time
+
+    def stats(self, time):
+        """
+        Returns a dict summarizing the device's usage up to the given time.
+        """
+        return {
+            "utilization": self.utilization(time),
+            "mean_queue_length": self.mean_queue_length(time),
+            "max_queue_length": self.max_queue_length,
+            "num_requests": self.num_requests,
+            "mean_wait_time": (
+                self.total_wait_time / self.num_requests if self.num_requests else 0.0
+            ),
+        }
+
+    def _update_queue_area(self, time):
+        self._queue_area += self.queue_length * (time - self._last_update)
+        self._last_update = time
+
+    def __repr__(self):
+        return f"IODevice(name={self.name}, tail_time={self.tail_time}, queue_length={self.queue_length})"
+
+
+# States of a CPU core
+IDLE = "idle"
+SWITCHING = "switching"
+COMPUTING = "computing"
+STALLED = "stalled"  # holding a job which is blocked on I/O
+CORE_STATES = (IDLE, SWITCHING, COMPUTING, STALLED)
+
+
+class CPUCore:
+    """
+    A CPU core, which runs at most one job at a time.
+
+    The core accounts for its time lazily: it only adds up how long it spent in each state
+    when its state changes, so an idle or busy core costs nothing per event.
+
+    Attributes:
+        index (int): The core's position in Simulation.cores.
+        job (Job): The job on the core, or None if the core is idle.
+        state (str): One of CORE_STATES.
+        since (float): The time at which the core entered its current state.
+        time_in_state (dict): Total time spent in each state, up to `since`.
+        context_switches (int): How many jobs were switched onto this core.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.job = None
+        self.state = IDLE
+        self.since = 0
+        self.time_in_state = {state: 0 for state in CORE_STATES}
+        self.context_switches = 0
+
+    def set_state(self, time, state):
+        self.time_in_state[self.state] += time - self.since
+        self.state = state
+        self.since = time
+
+    def stats(self, time):
+        """
+        Returns a dict of the fraction of time up to the given time spent in each state.
+        "utilization" is the fraction spent computing.
+        """
+        time_in_state = dict(self.time_in_state)
+        time_in_state[self.state] += time - self.since
+        stats = {
+            state: (time_in_state[state] / time if time else 0.0)
+            for state in CORE_STATES
+        }
+        stats["utilization"] = stats[COMPUTING]
+        stats["context_switches"] = self.context_switches
+        return stats
+
+    def __repr__(self):
+        job_id = None if self.job is None else self.job.id
+        return f"CPUCore(index={self.index}, job={job_id}, state={self.state})"
@@ -1,9 +1,32 @@
-import bisect
+import heapq
+import itertools
 from collections import namedtuple
 
 Event = namedtuple("Event", ["type", "job_id"])
 
 
+class _Removed:
+    """
+    Marks a heap entry whose event has been removed from the queue.
+
+    An event taken out with take_job_events and merged back keeps its time and sequence number,
+    so its new entry can tie with its own removed entry. Removed entries sort first in a tie,
+    which keeps heap comparisons from ever comparing an event with the marker.
+    """
+
+    def __lt__(self, other):
+        return other is not self
+
+    def __gt__(self, other):
+        return False
+
+    def __repr__(self):
+        return "REMOVED"
+
+
+_REMOVED = _Removed()
+
+
 def find_event(event_list, event_type=None, job_id=None, get_last=False):
     assert (event_type is not None) or (
         job_id is not None
@@ -24,11 +47,17 @@ class EventQueue:
     """
     A priority queue of events, where events are popped off in the order that they occur based on their scheduled time.
 
+    The queue is a binary heap of [time, sequence number, event] entries. The sequence number breaks ties
+    between events scheduled at the same time, so they are popped in the order they were pushed.
+    Pending entries are also indexed by event type, by job id and by (event type, job id), so that lookups
+    and removals never scan the whole queue. Removed events are cancelled lazily: their heap entry is
+    marked as removed and discarded once it reaches the top of the heap.
+
     Attributes:
-        queue (list): The list representing the priority queue of events.
+        queue (list): The binary heap of [time, sequence number, event] entries, including cancelled ones.
 
     Methods:
-        push(event: Event, time: float) -> None:
+        push(event: Event, time: float, seq: Optional[int]=None) -> None:
             Add an event to the priority queue at a specified time.
 
         pop_next_event() -> Event:
@@ -42,6 +71,15 @@ class EventQueue:
 
         remove_event(event_type: Optional[str]=None, job_id: Optional[int]=None, get_last: bool=False) -> None:
             Remove the specified event from the priority queue based on its event type and/or job id.
+
+        copy() -> EventQueue:
+            Copy the pending events into a new, independent queue.
+
+        take_job_events(job_id: int) -> SmallEventQueue:
+            Remove the pending events of a job, to process them separately from the rest of the queue.
+
+        merge(job_events: SmallEventQueue) -> None:
+            Put the events of a job back into the priority queue.
     """
 
     def __init__(self):
@@ -49,20 +87,34 @@ class EventQueue:
         Initialize an empty priority queue of events.
         """
         self.queue = []
-
-    def push(self, event, time):
+        self._counter = itertools.count()
+        self._num_events = 0
+        # Each index maps a key to a dict of {sequence number: entry} for the pending events with that key.
+        self._by_key = {}
+        self._by_type = {}
+        self._by_job = {}
+
+    def push(self, event, time, seq=None):
         """
         Add an event to the priority queue at a specified time.
 
         Args:
             event (namedtuple): The event to be added to the priority queue.
             time (float): The time at which the event is scheduled to occur.
+            seq (int, optional): The sequence number, which orders events at the same time.
+                By default, events at the same time are popped in the order they were pushed.
+                Explicit sequence numbers must not collide with those of other pending events.
 
         Returns:
             None.
         """
 
-        bisect.insort_left(self.queue, (time, event))
+        if seq is None:
+            seq = next(self._counter)
+        entry = [time, seq, event]
+        heapq.heappush(self.queue, entry)
+        self._index_entry(entry)
+        self._num_events += 1
 
     def pop_next_event(self):
         """
@@ -71,7 +123,10 @@ class EventQueue:
         Returns:
             The next event in the priority queue.
         """
-        time, event = self.queue.pop(0)
+        self._discard_removed()
+        time, seq, event = heapq.heappop(self.queue)
+        self._unindex_entry(time, seq, event)
+        self._num_events -= 1
         return event
 
     def get_next_event_time(self):
@@ -81,15 +136,15 @@ class EventQueue:
         Returns:
             The time of the next event in the priority queue, or None if the priority queue is empty.
         """
+        self._discard_removed()
         if self.queue:
-            time, _ = self.queue[0]
-            return time
+            return self.queue[0][0]
         else:
             return None
 
-    def _find_event(self, event_type=None, job_id=None, get_last=False):
+    def _find_entry(self, event_type=None, job_id=None, get_last=False):
         """
-        Find the index of the specified event in the priority queue based on its event type and/or job id.
+        Find the heap entry of the specified event based on its event type and/or job id.
 
         Args:
             event_type (str, optional): The type of the event to find.
@@ -97,22 +152,23 @@ class EventQueue:
             get_last (bool, optional): Whether to find the last event in the priority queue that matches the specified criteria.
 
         Returns:
-            The index of the specified event in the priority queue, or None if the event is not found.
+            The [time, sequence number, event] entry of the specified event, or None if the event is not found.
         """
 
         assert (event_type is not None) or (
             job_id is not None
         ), "must specify either an event type or job id!"
-        indices = range(len(self.queue))
+        if event_type is None:
+            entries = self._by_job.get(job_id)
+        elif job_id is None:
+            entries = self._by_type.get(event_type)
+        else:
+            entries = self._by_key.get((event_type, job_id))
+        if not entries:
+            return None
         if get_last:
-            indices = reversed(indices)
-        for index in indices:
-            time, event = self.queue[index]
-            event_type_matches = event_type is None or event_type == event.type
-            job_id_matches = job_id is None or job_id == event.job_id
-            if event_type_matches and job_id_matches:
-                return index
-        return None
+            return max(entries.values())
+        return min(entries.values())
 
     def get_event(self, event_type=None, job_id=None, get_last=False):
         """
@@ -127,11 +183,12 @@ class EventQueue:
             The specified event from the priority queue, or None if the event is not found.
         """
 
-        event_index = find_event(self.queue, event_type, job_id, get_last)
-        if event_index is None:
+        entry = self._find_entry(event_type, job_id, get_last)
+        if entry is None:
             return None, None
         else:
-            return self.queue[event_index]
+            time, seq, event = entry
+            return time, event
 
     def remove_event(self, event_type=None, job_id=None, get_last=False):
         """
@@ -146,9 +203,147 @@ class EventQueue:
             None.
         """
 
-        event_index = find_event(self.queue, event_type, job_id, get_last)
-        if event_index is not None:
-            del self.queue[event_index]
+        entry = self._find_entry(event_type, job_id, get_last)
+        if entry is not None:
+            self._cancel_entry(entry)
+
+    def copy(self):
+        """
+        Copy the pending events into a new queue, leaving cancelled entries behind. Events are immutable, so they are shared.
+
+        Returns:
+            An EventQueue which pops the same events in the same order as this one, and numbers the events pushed to it
+            after all of them, in O(pending events).
+        """
+        queue = EventQueue()
+        entries = [list(entry) for entry in self.queue if entry[2] is not _REMOVED]
+        heapq.heapify(entries)
+        queue.queue = entries
+        for entry in entries:
+            queue._index_entry(entry)
+        queue._num_events = len(entries)
+        # Events pushed to the copy are numbered after every pending event, as in this queue,
+        # and from 0 up, clear of negative explicit sequence numbers
+        next_seq = max((entry[1] + 1 for entry in entries), default=0)
+        queue._counter = itertools.count(max(next_seq, 0))
+        return queue
+
+    def take_job_events(self, job_id):
+        """
+        Remove the pending events of the given job from the priority queue.
+
+        Returns:
+            A SmallEventQueue of the removed events. It shares this queue's sequence numbers,
+            so after merge() the events are popped in the same order as if they had never been taken out.
+        """
+        entries = self._by_job.get(job_id, {})
+        job_events = SmallEventQueue(
+            [list(entry) for entry in entries.values()], self._counter
+        )
+        for entry in list(entries.values()):
+            self._cancel_entry(entry)
+        return job_events
+
+    def merge(self, job_events):
+        """
+        Add the events of a SmallEventQueue from take_job_events back to the priority queue.
+        """
+        for entry in job_events.entries:
+            heapq.heappush(self.queue, entry)
+            self._index_entry(entry)
+            self._num_events += 1
+        job_events.entries = []
+
+    def _cancel_entry(self, entry):
+        time, seq, event = entry
+        self._unindex_entry(time, seq, event)
+        entry[2] = _REMOVED
+        self._num_events -= 1
+        # Rebuild the heap once most of it is cancelled entries, so it stays O(pending events) in size.
+        if len(self.queue) > 64 and self._num_events < len(self.queue) // 2:
+            self.queue = [entry for entry in self.queue if entry[2] is not _REMOVED]
+            heapq.heapify(self.queue)
+
+    def _discard_removed(self):
+        queue = self.queue
+        while queue and queue[0][2] is _REMOVED:
+            heapq.heappop(queue)
+
+    def _index_entry(self, entry):
+        time, seq, event = entry
+        for index, key in (
+            (self._by_key, event),
+            (self._by_type, event.type),
+            (self._by_job, event.job_id),
+        ):
+            entries = index.get(key)
+            if entries is None:
+                index[key] = {seq: entry}
+            else:
+                entries[seq] = entry
+
+    def _unindex_entry(self, time, seq, event):
+        for index, key in (
+            (self._by_key, event),
+            (self._by_type, event.type),
+            (self._by_job, event.job_id),
+        ):
+            entries = index[key]
+            del entries[seq]
+            if not entries:
+                del index[key]
+
+    def __len__(self):
+        return self._num_events
+
+    def __bool__(self):
+        return self._num_events > 0
+
+
+class SmallEventQueue:
+    """
+    A queue of a handful of events, such as the pending events of one job, kept in an unsorted list.
+
+    It has the same interface as EventQueue for pushing, popping and removing events,
+    without the cost of maintaining a heap and indexes. Entries are [time, sequence number, event],
+    with sequence numbers drawn from the given counter, so events pushed here
+    keep their order relative to the EventQueue that shares the counter.
+    """
+
+    def __init__(self, entries=(), counter=None):
+        self.entries = list(entries)
+        self._counter = itertools.count() if counter is None else counter
+
+    def push(self, event, time, seq=None):
+        if seq is None:
+            seq = next(self._counter)
+        self.entries.append([time, seq, event])
+
+    def pop_next_event(self):
+        entry = min(self.entries)
+        self.entries.remove(entry)
+        return entry[2]
+
+    def get_next_event_time(self):
+        if self.entries:
+            return min(self.entries)[0]
+        return None
+
+    def remove_event(self, event_type=None, job_id=None, get_last=False):
+        assert (event_type is not None) or (
+            job_id is not None
+        ), "must specify either an event type or job id!"
+        matches = [
+            entry
+            for entry in self.entries
+            if (event_type is None or entry[2].type == event_type)
+            and (job_id is None or entry[2].job_id == job_id)
+        ]
+        if matches:
+            self.entries.remove(max(matches) if get_last else min(matches))
+
+    def __len__(self):
+        return len(self.entries)
 
     def __bool__(self):
-        return bool(self.queue)
+        return bool(self.entries)
@@ -0,0 +1,278 @@
+# Recording what happened in a simulation.
+# The history is kept as columns of event time, event type code and job id,
+# rather than a list of (time, Event) tuples, so a long run costs 13 bytes per event
+# and the metrics can be computed with vectorized NumPy operations.
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from event_queue import Event
+
+# Record levels
+NONE = "none"  # record nothing
+METRICS = "metrics"  # only the per-job times the metrics need
+FULL = "full"  # every event
+RECORD_LEVELS = (NONE, METRICS, FULL)
+
+COLUMN_DTYPES = {"time": np.float64, "type": np.int8, "job_id": np.int32}
+EVENT_TYPES_FILE = "event_types.npy"
+
+# A full history. Event i happened at time[i], had type event_types[type[i]] and belonged to job job_id[i].
+HistoryColumns = namedtuple("HistoryColumns", ["time", "type", "job_id", "event_types"])
+
+# .npy files are written with a fixed-size header, so that it can be rewritten
+# in place with the final length once all of the events have been appended.
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+_NPY_HEADER_SIZE = 128
+
+
+def _write_npy_header(file, dtype, length):
+    header = repr(
+        {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+            "fortran_order": False,
+            "shape": (length,),
+        }
+    )
+    header = header.ljust(_NPY_HEADER_SIZE - len(_NPY_MAGIC) - 3) + "\n"
+    file.seek(0)
+    file.write(_NPY_MAGIC + struct.pack("<H", len(header)) + header.encode("latin1"))
+    file.seek(0, os.SEEK_END)
+
+
+class HistoryRecorder:
+    """
+    Records a simulation's events.
+
+    At the FULL level the events are written into preallocated NumPy columns, which double in size when they fill up.
+    Given a path, the columns are instead streamed to one .npy file per column in that directory,
+    whenever chunk_size events have been recorded, so memory use stays bounded however long the run is.
+    The files can be loaded zero-copy with load_history.
+
+    At the METRICS level only the times each job arrived (its first event), was first dispatched
+    and completed (its last event) are kept. At the NONE level nothing is kept.
+
+    Iterating over a full history yields (time, Event) tuples, in the order the events happened.
+
+    Args:
+        event_types: the event type names. An event's type code is its index in event_types.
+        num_jobs: the number of jobs. Job ids go from 0 to num_jobs - 1.
+        level: one of RECORD_LEVELS.
+        path (optional): directory to stream a full history to.
+        dispatch_type: the event type which marks that a job got a core, for the response time.
+        chunk_size: how many events the columns hold to begin with, or between writes when streaming.
+    """
+
+    def __init__(
+        self,
+        event_types,
+        num_jobs,
+        level=FULL,
+        path=None,
+        dispatch_type=None,
+        chunk_size=1 << 16,
+    ):
+        if level not in RECORD_LEVELS:
+            raise ValueError(f"Unrecognized record level: {level}")
+        if path is not None and level != FULL:
+            raise ValueError("Only a full history can be streamed to disk")
+        self.event_types = tuple(event_types)
+        self.codes = {event_type: code for code, event_type in enumerate(event_types)}
+        self.dispatch_type = dispatch_type
+        self.num_jobs = num_jobs
+        self.level = level
+        self.path = path
+        self.num_written = 0  # events already streamed to disk
+        self._size = 0  # events in the columns
+        self._files = None
+
+        if level == FULL:
+            self._set_columns(
+                {
+                    name: np.empty(chunk_size, dtype)
+                    for name, dtype in COLUMN_DTYPES.items()
+                }
+            )
+            self.record = self._record_event
+        elif level == METRICS:
+            self.arrival = [None] * num_jobs
+            self.dispatch = [None] * num_jobs
+            self.completion = [None] * num_jobs
+            self.record = self._record_job_times
+        else:
+            self.record = self._record_nothing
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            np.save(
+                os.path.join(path, EVENT_TYPES_FILE), np.array(self.event_types, str)
+            )
+            self._files = {}
+            for name, dtype in COLUMN_DTYPES.items():
+                file = open(os.path.join(path, f"{name}.npy"), "wb+")
+                _write_npy_header(file, dtype, 0)
+                self._files[name] = file
+
+    def _record_event(self, time, event):
+        size = self._size
+        if size == len(self._times):
+            self._make_room()
+            size = self._size
+        self._times[size] = time
+        self._types[size] = self.codes[event.type]
+        self._job_ids[size] = event.job_id
+        self._size = size + 1
+
+    def _record_job_times(self, time, event):
+        job_id = event.job_id
+        if self.arrival[job_id] is None:
+            self.arrival[job_id] = time
+        if event.type == self.dispatch_type and self.dispatch[job_id] is None:
+            self.dispatch[job_id] = time
+        self.completion[job_id] = time
+
+    def _record_nothing(self, time, event):
+        pass
+
+    def _make_room(self):
+        if self._files is not None:
+            self.flush()
+        else:
+            self._set_columns(
+                {
+                    name: np.concatenate([column, np.empty_like(column)])
+                    for name, column in self._columns.items()
+                }
+            )
+
+    def _set_columns(self, columns):
+        self._columns = columns
+        # the columns are also kept as attributes, which are quicker to get at in _record_event
+        self._times = columns["time"]
+        self._types = columns["type"]
+        self._job_ids = columns["job_id"]
+
+    def flush(self):
+        """Writes the recorded events to disk, if the history is being streamed, and leaves the files loadable."""
+        if self._files is None:
+            return
+        size = self._size
+        for name, file in self._files.items():
+            file.write(self._columns[name][:size].tobytes())
+        self.num_written += size
+        self._size = 0
+        for name, file in self._files.items():
+            _write_npy_header(file, COLUMN_DTYPES[name], self.num_written)
+            file.flush()
+
+    def close(self):
+        """Flushes the history and closes its files. Nothing more can be recorded afterwards."""
+        if self._files is None:
+            return
+        self.flush()
+        for file in self._files.values():
+            file.close()
+        self._files = None
+        self._columns = None
+
+    def columns(self):
+        """
+        Returns the full history as HistoryColumns.
+        In memory, the columns are views of the recorder's arrays; when streamed, they are memory-mapped from disk.
+        """
+        if self.level != FULL:
+            raise ValueError(f"A {self.level} history does not record every event")
+        if self.path is not None:
+            self.flush()
+            return load_history(self.path)
+        size = self._size
+        return HistoryColumns(
+            self._columns["time"][:size],
+            self._columns["type"][:size],
+            self._columns["job_id"][:size],
+            self.event_types,
+        )
+
+    def job_times(self):
+        """
+        Returns arrays of the time each job arrived, was first dispatched and completed, indexed by job id.
+        Jobs which never reached a stage have NaN for it.
+        """
+        if self.level == METRICS:
+            return (
+                np.array(self.arrival, dtype=float),
+                np.array(self.dispatch, dtype=float),
+                np.array(self.completion, dtype=float),
+            )
+        return job_times_from_columns(self.columns(), self.num_jobs, self.dispatch_type)
+
+    def __len__(self):
+        if self.level != FULL:
+            return 0
+        return self.num_written + self._size
+
+    def __iter__(self):
+        if self.level != FULL:
+            raise ValueError(f"A {self.level} history does not record every event")
+        return iter_events(self.columns())
+
+
+def load_history(path, mmap_mode="r"):
+    """Loads a history streamed to the directory at path as HistoryColumns, memory-mapping the columns by default."""
+    columns = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in COLUMN_DTYPES
+    }
+    event_types = tuple(np.load(os.path.join(path, EVENT_TYPES_FILE)).tolist())
+    return HistoryColumns(event_types=event_types, **columns)
+
+
+def columns_from_events(events, event_types):
+    """Converts a list of (time, Event) tuples into HistoryColumns."""
+    codes = {event_type: code for code, event_type in enumerate(event_types)}
+    return HistoryColumns(
+        np.array([time for time, event in events], dtype=COLUMN_DTYPES["time"]),
+        np.array([codes[event.type] for time, event in events], COLUMN_DTYPES["type"]),
+        np.array([event.job_id for time, event in events], COLUMN_DTYPES["job_id"]),
+        tuple(event_types),
+    )
+
+
+def iter_events(columns, chunk_size=1 << 16):
+    """Yields the (time, Event) tuples of HistoryColumns, converting a chunk of events at a time."""
+    for start in range(0, len(columns.time), chunk_size):
+        stop = start + chunk_size
+        for time, code, job_id in zip(
+            columns.time[start:stop].tolist(),
+            columns.type[start:stop].tolist(),
+            columns.job_id[start:stop].tolist(),
+        ):
+            yield time, Event(columns.event_types[code], job_id)
+
+
+def job_times_from_columns(columns, num_jobs, dispatch_type):
+    """
+    Returns arrays of the time each job arrived (its first event), was first dispatched
+    (its first dispatch_type event) and completed (its last event), indexed by job id.
+    Events of jobs with ids of num_jobs or more are ignored. Jobs which never reached a stage have NaN for it.
+    """
+    time = np.asarray(columns.time)
+    types = np.asarray(columns.type)
+    job_ids = np.asarray(columns.job_id)
+    known = job_ids < num_jobs
+    if not known.all():
+        time, types, job_ids = time[known], types[known], job_ids[known]
+
+    arrival = np.full(num_jobs, np.inf)
+    completion = np.full(num_jobs, -np.inf)
+    dispatch = np.full(num_jobs, np.inf)
+    np.minimum.at(arrival, job_ids, time)
+    np.maximum.at(completion, job_ids, time)
+    if dispatch_type in columns.event_types:
+        dispatched = types == columns.event_types.index(dispatch_type)
+        np.minimum.at(dispatch, job_ids[dispatched], time[dispatched])
+    for times in (arrival, completion, dispatch):
+        times[np.isinf(times)] = np.nan
+    return arrival, dispatch, completion
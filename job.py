@@ -1,3 +1,4 @@
+from array import array
 from collections import namedtuple
 
 COMPUTE = "COMPUTE"
@@ -5,17 +6,120 @@ MEMORY = "MEMORY"
 DISK = "DISK"
 NETWORK = "NETWORK"
 
+# Task types are stored as their index in this tuple in columnar workloads.
+TASK_TYPES = (COMPUTE, MEMORY, DISK, NETWORK)
+TASK_CODES = {task_type: code for code, task_type in enumerate(TASK_TYPES)}
+COMPUTE_CODE = TASK_CODES[COMPUTE]
+
 Task = namedtuple("Task", ["type", "time_remaining"])
 
 
 class Job:
+    """
+    A job and its progress through its tasks.
+
+    The tasks are stored as two typed arrays of task type codes (indices into TASK_TYPES) and durations.
+    The job's tasks are the slice [start, end) of those arrays, so many jobs can share the arrays of one workload.
+    The arrays are never modified: the job tracks its progress with a cursor pointing at its current task,
+    and the time remaining on that task, which is updated in place as the task runs.
+
+    Attributes:
+        id (int): The job id, assigned by the simulation.
+        priority (int): The job priority. 0 is the most important.
+        blocked (bool): Whether the job is waiting on an I/O task.
+        task_types (array): Task type codes, shared between jobs.
+        task_times (array): Task durations, shared between jobs.
+        start (int): Index of the job's first task in the arrays.
+        end (int): Index one past the job's last task in the arrays.
+        cursor (int): Index of the current task. The job is done when cursor == end.
+        time_remaining: The time remaining on the current task.
+    """
+
+    __slots__ = (
+        "id",
+        "priority",
+        "blocked",
+        "task_types",
+        "task_times",
+        "start",
+        "end",
+        "cursor",
+        "time_remaining",
+    )
+
     def __init__(self, job_id, priority, instructions):
-        pass
+        task_types = array("b", [TASK_CODES[task.type] for task in instructions])
+        task_times = array("q", [task.time_remaining for task in instructions])
+        self._init(job_id, priority, task_types, task_times, 0, len(instructions))
+
+    @classmethod
+    def from_arrays(cls, job_id, priority, task_types, task_times, start, end):
+        """
+        Creates a job whose tasks are task_types[start:end] and task_times[start:end], without copying them.
+        """
+        job = cls.__new__(cls)
+        job._init(job_id, priority, task_types, task_times, start, end)
+        return job
+
+    def _init(self, job_id, priority, task_types, task_times, start, end):
         self.id = job_id
         self.priority = priority
-        self.instructions = instructions
         self.blocked = False
-        self.remaining_tasks = instructions.copy()  # starts as a copy of instructions
+        self.task_types = task_types
+        self.task_times = task_times
+        self.start = start
+        self.end = end
+        self.cursor = start
+        self.time_remaining = task_times[start] if start < end else 0
+
+    def copy(self):
+        """Returns a copy of the job's progress through its tasks, sharing its task arrays."""
+        job = Job.from_arrays(
+            self.id,
+            self.priority,
+            self.task_types,
+            self.task_times,
+            self.start,
+            self.end,
+        )
+        job.blocked = self.blocked
+        job.cursor = self.cursor
+        job.time_remaining = self.time_remaining
+        return job
+
+    def has_tasks(self):
+        return self.cursor < self.end
+
+    def current_task_type(self):
+        """Returns the type code of the current task."""
+        return self.task_types[self.cursor]
+
+    def advance(self):
+        """Finishes the current task and moves on to the next one."""
+        self.cursor += 1
+        if self.cursor < self.end:
+            self.time_remaining = self.task_times[self.cursor]
+
+    def total_task_time(self):
+        """The total duration of all of the job's tasks."""
+        return sum(self.task_times[self.start : self.end])
+
+    @property
+    def instructions(self):
+        return [
+            Task(TASK_TYPES[self.task_types[i]], self.task_times[i])
+            for i in range(self.start, self.end)
+        ]
+
+    @property
+    def remaining_tasks(self):
+        tasks = [
+            Task(TASK_TYPES[self.task_types[i]], self.task_times[i])
+            for i in range(self.cursor, self.end)
+        ]
+        if tasks:
+            tasks[0] = Task(tasks[0].type, self.time_remaining)
+        return tasks
 
     def __str__(self):
         return f"id={self.id}, priority={self.priority}, blocked={self.blocked}, remaining_tasks={self.remaining_tasks}"
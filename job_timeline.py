@@ -1,23 +1,35 @@
-from job import Job, Task, COMPUTE, MEMORY, DISK, NETWORK
+from job import Job, Task, COMPUTE, MEMORY, DISK, NETWORK, TASK_TYPES
+from array import array
+from collections import namedtuple
+import bisect
 import random
 import numpy as np
 
 END = "end"
 
+LOG_TIME_MEANS = {
+    COMPUTE: 0,
+    MEMORY: 1,
+    DISK: 1.5,
+    NETWORK: 1.5,
+}  # TODO randomly generate
+LOG_TIME_STDS = {
+    COMPUTE: 1,
+    MEMORY: 1,
+    DISK: 0.2,
+    NETWORK: 0.5,
+}  # TODO randomly generate
+MAX_PRIORITY = 4
+
+# A columnar workload. The tasks of job i are
+# task_types[job_offsets[i]:job_offsets[i + 1]] (as indices into TASK_TYPES)
+# and durations[job_offsets[i]:job_offsets[i + 1]].
+Workload = namedtuple(
+    "Workload", ["task_types", "durations", "job_offsets", "priorities", "start_times"]
+)
+
 
 def task_distribution_factory():
-    log_time_means = {
-        COMPUTE: 0,
-        MEMORY: 1,
-        DISK: 1.5,
-        NETWORK: 1.5,
-    }  # TODO randomly generate
-    log_time_stds = {
-        COMPUTE: 1,
-        MEMORY: 1,
-        DISK: 0.2,
-        NETWORK: 0.5,
-    }  # TODO randomly generate
     task_types = [COMPUTE, MEMORY, DISK, NETWORK, END]
 
     task_weights = np.random.randint(1, 10, size=len(task_types))
@@ -27,16 +39,14 @@ def task_distribution_factory():
     def task_distribution():
         # Choose a task type from the distribution
         x = random.random()
-        i = 0
-        while x > task_cdf[i] and i < len(task_cdf):
-            i += 1
+        i = min(bisect.bisect_left(task_cdf, x), len(task_cdf) - 1)
         task_type = task_types[i]
         if task_type == END:
             return END
 
         # Randomly sample the time remaining
-        log_time_mean = log_time_means[task_type]
-        log_time_std = log_time_stds[task_type]
+        log_time_mean = LOG_TIME_MEANS[task_type]
+        log_time_std = LOG_TIME_STDS[task_type]
         log_time_remaining = random.gauss(log_time_mean, log_time_std)
         time_remaining = max(1, int(10 ** (log_time_remaining)))
 
@@ -61,8 +71,97 @@ def make_job_timeline(n_jobs, max_start_time, get_task_distribution):
             start_time = 0
         else:
             start_time = random.randint(0, max_start_time)
-        priority = random.randint(0, 4)
+        priority = random.randint(0, MAX_PRIORITY)
         job = Job(None, priority, tasks)
         job_timeline.append((start_time, job))
 
     return sorted(job_timeline, key=lambda k: k[0])
+
+
+def make_workload(n_jobs, max_start_time, rng=None):
+    """
+    Samples a workload from the same distribution as make_job_timeline(..., task_distribution_factory),
+    drawing every job and task in bulk with NumPy.
+
+    Each job gets its own task weights. Since each task is the job's last with probability
+    p_end = weight[END], job lengths are geometric; jobs with no tasks are redrawn.
+    Task types are sampled with searchsorted over each job's CDF of the non-END task types,
+    and durations are lognormal (base 10) with the per-type parameters of LOG_TIME_MEANS/LOG_TIME_STDS.
+
+    Args:
+        n_jobs: how many jobs to create.
+        max_start_time: job start times are uniform between 0 and this value. The first job starts at 0.
+        rng: a numpy Generator, or a seed for one.
+
+    Returns:
+        A Workload, with jobs sorted by start time.
+    """
+    rng = np.random.default_rng(rng)
+    n_task_types = len(TASK_TYPES)
+
+    # Draw the task weights and job lengths, redrawing jobs with no tasks
+    weights = np.empty((n_jobs, n_task_types + 1))
+    lengths = np.empty(n_jobs, dtype=np.int64)
+    todo = np.arange(n_jobs)
+    while todo.size:
+        job_weights = rng.integers(1, 10, size=(todo.size, n_task_types + 1))
+        job_weights = job_weights / job_weights.sum(axis=1, keepdims=True)
+        job_lengths = rng.geometric(job_weights[:, -1]) - 1
+        has_tasks = job_lengths > 0
+        weights[todo[has_tasks]] = job_weights[has_tasks]
+        lengths[todo[has_tasks]] = job_lengths[has_tasks]
+        todo = todo[~has_tasks]
+
+    job_offsets = np.zeros(n_jobs + 1, dtype=np.int64)
+    np.cumsum(lengths, out=job_offsets[1:])
+    task_jobs = np.repeat(np.arange(n_jobs), lengths)
+
+    # Offset each job's CDF by its job index, so one searchsorted over the
+    # concatenated CDFs samples every task from its own job's distribution.
+    task_cdfs = np.cumsum(weights[:, :n_task_types], axis=1)
+    task_cdfs /= task_cdfs[:, -1:]
+    task_cdfs += np.arange(n_jobs)[:, None]
+    x = rng.random(task_jobs.size) + task_jobs
+    task_types = np.searchsorted(task_cdfs.ravel(), x) - task_jobs * n_task_types
+    task_types = np.clip(task_types, 0, n_task_types - 1).astype(np.int8)
+
+    log_time_means = np.array([LOG_TIME_MEANS[task_type] for task_type in TASK_TYPES])
+    log_time_stds = np.array([LOG_TIME_STDS[task_type] for task_type in TASK_TYPES])
+    log_durations = rng.normal(log_time_means[task_types], log_time_stds[task_types])
+    durations = np.maximum(1, (10.0**log_durations).astype(np.int64))
+
+    # Jobs are independent, so sorting the start times is enough to sort the jobs.
+    start_times = rng.integers(0, max_start_time, size=n_jobs, endpoint=True)
+    start_times[0] = 0
+    start_times.sort()
+    priorities = rng.integers(0, MAX_PRIORITY, size=n_jobs, endpoint=True)
+
+    return Workload(task_types, durations, job_offsets, priorities, start_times)
+
+
+def workload_to_job_timeline(workload):
+    """
+    Converts a columnar Workload into a job timeline of (start_time, Job) for Simulation.
+    The columns are copied once into typed arrays which all of the jobs share.
+    """
+    task_types = array("b")
+    task_types.frombytes(np.ascontiguousarray(workload.task_types, np.int8).tobytes())
+    durations = array("q")
+    durations.frombytes(np.ascontiguousarray(workload.durations, np.int64).tobytes())
+    job_offsets = workload.job_offsets.tolist()
+    return [
+        (
+            start_time,
+            Job.from_arrays(
+                None,
+                priority,
+                task_types,
+                durations,
+                job_offsets[i],
+                job_offsets[i + 1],
+            ),
+        )
+        for i, (start_time, priority) in enumerate(
+            zip(workload.start_times.tolist(), workload.priorities.tolist())
+        )
+    ]
@@ -1,64 +1,384 @@
 # Run a simulation and print out the result
 import argparse
-from schedulers.priority import WeightedRandomScheduler
+import functools
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+import random
+import time
+from schedulers.priority import (
+    MLFQScheduler,
+    PriorityScheduler,
+    WeightedRandomScheduler,
+)
 from schedulers.basic import RandomScheduler, RoundRobinScheduler, FIFOScheduler
-from job_timeline import make_job_timeline, task_distribution_factory
+from schedulers.srpt import SJFScheduler, SRPTScheduler
+from schedulers.cfs import CFSScheduler
+from schedulers.lookahead import RolloutScheduler
+from job_timeline import make_workload, workload_to_job_timeline
 from simulation import Simulation
+from batch_simulation import POLICIES, run_batch
+from history import METRICS
 from metrics import weighted_mean_turnaround_time, weighted_mean_response_time
+from profiling import SimulationProfile, merge_summaries
+from traces import Trace, load_trace
+from result_cache import DEFAULT_CACHE_PATH, ResultCache, workload_digest
 import numpy as np
-import matplotlib.pyplot as plt
-import torch
 
+SCHEDULERS = {
+    "RR": RoundRobinScheduler,
+    "random": RandomScheduler,
+    "FIFO": FIFOScheduler,
+    "weightedRandom": WeightedRandomScheduler,
+    "priority": PriorityScheduler,
+    "SRPT": SRPTScheduler,
+    "weightedSRPT": functools.partial(SRPTScheduler, weighted=True),
+    "SJF": SJFScheduler,
+    "weightedSJF": functools.partial(SJFScheduler, weighted=True),
+    "CFS": CFSScheduler,
+    "MLFQ": MLFQScheduler,
+    "rollout": RolloutScheduler,
+}
+ENGINES = ("step", "batch")
+# The results kept in the result cache, with their struct format characters
+RESULT_FIELDS = {
+    "seed": "Q",
+    "turnaround": "d",
+    "response": "d",
+    "context_switches": "q",
+    "makespan": "d",
+    "utilization": "d",
+}
+# Bump this when a change to the simulator changes its results, to stop using the results cached before it
+CACHE_VERSION = 1
+# New results are written to the result cache this many at a time
+CACHE_WRITE_BATCH = 1000
 
-def execute_simulations(scheduler_type, num_jobs, max_start_time, num_runs):
+
+def make_scheduler(scheduler_type, ready_only=False):
+    if scheduler_type not in SCHEDULERS:
+        raise ValueError(f"Unrecognized scheduler type: {scheduler_type}")
+    return SCHEDULERS[scheduler_type](ready_only=ready_only)
+
+
+def run_seeds(num_runs, seed=None):
+    """
+    Derives one seed per run from a base seed.
+    Run i always gets the same seed, no matter how the runs are split between workers.
+    """
+    return np.random.SeedSequence(seed).generate_state(num_runs).tolist()
+
+
+def run_simulation(
+    scheduler_type,
+    num_jobs,
+    max_start_time,
+    seed,
+    ready_only=False,
+    num_cores=1,
+    schedule_every=10,
+    context_switch_time=2,
+    profile=False,
+    trace=None,
+):
+    """
+    Runs a single simulation with its own seed.
+    With profile, the simulation's counters and phase timers are also returned, under "profile".
+    Given the path of a trace saved with traces.save_trace, its jobs are run instead of a random workload,
+    and num_jobs and max_start_time are ignored.
+
+    Returns:
+        dict of the run's seed and metrics.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    # create the job timeline
+    if trace is not None:
+        workload = load_trace(trace)
+        job_timeline = Trace(workload)
+    else:
+        workload = make_workload(num_jobs, max_start_time, rng=seed)
+        job_timeline = workload_to_job_timeline(workload)
+    # create the simulation
+    simulation = Simulation(
+        job_timeline,
+        schedule_every=schedule_every,
+        context_switch_time=context_switch_time,
+        num_cores=num_cores,
+        record=METRICS,
+        profile=SimulationProfile(timers=True) if profile else None,
+    )
+    # create the scheduler
+    scheduler = make_scheduler(scheduler_type, ready_only=ready_only)
+
+    # Run the simulation
+    simulation.run(scheduler)
+
+    # Evaluate metrics
+    metrics_start = time.perf_counter()
+    job_priorities = dict(enumerate(workload.priorities.tolist()))
+    result = {
+        "seed": seed,
+        "turnaround": weighted_mean_turnaround_time(simulation.history, job_priorities),
+        "response": weighted_mean_response_time(simulation.history, job_priorities),
+        "context_switches": simulation.context_switches,
+        "makespan": simulation.time,
+        "utilization": float(
+            np.mean([stats["utilization"] for stats in simulation.core_stats()])
+        ),
+    }
+    if profile:
+        simulation.profile.add_time("metrics", time.perf_counter() - metrics_start)
+        result["profile"] = simulation.profile.summary()
+    return result
+
+
+# run_simulation's options and their defaults
+RUN_DEFAULTS = {
+    name: parameter.default
+    for name, parameter in inspect.signature(run_simulation).parameters.items()
+    if parameter.default is not inspect.Parameter.empty
+}
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _random_workload_digest(num_jobs, max_start_time, seed):
+    return workload_digest(make_workload(num_jobs, max_start_time, rng=seed))
+
+
+@functools.lru_cache(maxsize=16)
+def _trace_digest(trace, modified_time):
+    # modified_time is only part of the memo key, so a trace which was saved again is hashed again
+    return workload_digest(load_trace(trace))
+
+
+def run_key(
+    scheduler_type, num_jobs, max_start_time, seed, engine="step", **run_options
+):
+    """
+    The result cache key of a run: a digest of its workload (generated from the seed, or the trace's),
+    and of the rest of its configuration, with run_simulation's defaults filled in.
+    """
+    options = dict(RUN_DEFAULTS)
+    options.update(run_options)
+    options.pop("profile")
+    trace = options.pop("trace")
+    if trace is None:
+        workload = _random_workload_digest(num_jobs, max_start_time, seed)
+    else:
+        modified_time = max(entry.stat().st_mtime_ns for entry in os.scandir(trace))
+        workload = _trace_digest(os.path.abspath(trace), modified_time)
+    config = {
+        "version": CACHE_VERSION,
+        "fields": RESULT_FIELDS,
+        "scheduler_type": scheduler_type,
+        "engine": engine,
+        "seed": seed,
+        "options": options,
+    }
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode())
+    digest.update(workload)
+    return digest.digest()
+
+
+def iter_simulation_results(
+    scheduler_type,
+    num_jobs,
+    max_start_time,
+    num_runs,
+    workers=1,
+    seed=None,
+    chunksize=None,
+    engine="step",
+    batch_size=1000,
+    cache=None,
+    **run_options,
+):
+    """
+    Runs num_runs independent simulations and yields each run's results in run order,
+    as soon as they are available. run_options are passed on to run_simulation.
+
+    Given a ResultCache, runs whose results are in it aren't run again, and the results of the other runs are added to it.
+    Profiled runs are always run.
+
+    With workers > 1 the runs are distributed in chunks over a pool of worker processes.
+    The results only depend on the seed, not on the number of workers.
+
+    With engine="batch", the runs are simulated batch_size at a time by BatchSimulation,
+    which gives the same results as Simulation for the FIFO, RR and priority schedulers.
+    """
+    seeds = run_seeds(num_runs, seed)
+    run_seeds_with = functools.partial(
+        _iter_seed_results,
+        scheduler_type,
+        num_jobs,
+        max_start_time,
+        workers=workers,
+        chunksize=chunksize,
+        engine=engine,
+        batch_size=batch_size,
+        **run_options,
+    )
+    if cache is None or run_options.get("profile"):
+        yield from run_seeds_with(seeds)
+        return
+
+    keys = [
+        run_key(scheduler_type, num_jobs, max_start_time, seed, engine, **run_options)
+        for seed in seeds
+    ]
+    results = cache.get_many(keys)
+    missing = [run for run, result in enumerate(results) if result is None]
+    computed = run_seeds_with([seeds[run] for run in missing])
+    new_results = []
+    try:
+        for run, result in enumerate(results):
+            if result is None:
+                result = next(computed)
+                new_results.append((keys[run], result))
+                # store results as they come, so an interrupted study keeps most of them
+                if len(new_results) >= CACHE_WRITE_BATCH:
+                    cache.put_many(new_results)
+                    new_results = []
+            yield result
+    finally:
+        computed.close()
+        if new_results:
+            cache.put_many(new_results)
+        if missing:
+            cache.evict()
+
+
+def _iter_seed_results(
+    scheduler_type,
+    num_jobs,
+    max_start_time,
+    seeds,
+    workers=1,
+    chunksize=None,
+    engine="step",
+    batch_size=1000,
+    **run_options,
+):
+    """Runs one simulation per seed, as iter_simulation_results, and yields the results in seed order."""
+    num_runs = len(seeds)
+    if not num_runs:
+        return
+    if engine == "batch":
+        if scheduler_type not in POLICIES:
+            raise ValueError(
+                f"The batch engine does not support the {scheduler_type} scheduler"
+            )
+        run = functools.partial(
+            run_batch, scheduler_type, num_jobs, max_start_time, **run_options
+        )
+        batches = [
+            seeds[start : start + batch_size]
+            for start in range(0, num_runs, batch_size)
+        ]
+        if workers <= 1:
+            for results in map(run, batches):
+                yield from results
+            return
+        with multiprocessing.Pool(workers) as pool:
+            for results in pool.imap(run, batches):
+                yield from results
+        return
+    if engine != "step":
+        raise ValueError(f"Unrecognized engine: {engine}")
+
+    run = functools.partial(
+        run_simulation,
+        scheduler_type,
+        num_jobs,
+        max_start_time,
+        **run_options,
+    )
+    if workers <= 1:
+        yield from map(run, seeds)
+        return
+    if chunksize is None:
+        # a few chunks per worker keeps the workers busy without much IPC overhead
+        chunksize = max(1, num_runs // (workers * 4))
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap(run, seeds, chunksize=chunksize)
+
+
+def execute_simulations(
+    scheduler_type,
+    num_jobs,
+    max_start_time,
+    num_runs,
+    workers=1,
+    seed=None,
+    profiles=None,
+    **run_options,
+):
+    """
+    Runs the simulations and returns arrays of each run's turnaround and response time.
+    If a list of profiles is given, the runs are profiled and each run's profile summary is appended to it.
+    Given a ResultCache as cache, cached runs are not run again (see iter_simulation_results).
+    """
     turnaround = []
     response = []
+    if profiles is not None:
+        run_options["profile"] = True
 
-    for run in range(num_runs):
-        # create the job timeline
-        job_timeline = make_job_timeline(
-            num_jobs, max_start_time, task_distribution_factory
-        )
-        # create the simulation
-        simulation = Simulation(job_timeline)
-        # create the scheduler
-        if scheduler_type == "RR":
-            scheduler = RoundRobinScheduler()
-        elif scheduler_type == "random":
-            scheduler = RandomScheduler()
-        elif scheduler_type == "FIFO":
-            scheduler = FIFOScheduler()
-        elif scheduler_type == "weightedRandom":
-            scheduler = WeightedRandomScheduler()
-        else:
-            raise ValueError(f"Unrecognized scheduler type: {scheduler_type}")
-
-        # Run the simulation
-        simulation.run_until_scheduling_needed()
-        while not simulation.is_finished():
-            try:
-                simulation.schedule_job(scheduler.schedule(simulation))
-            except IndexError as ie:
-                import pdb
-
-                pdb.set_trace()
-            simulation.run_until_scheduling_needed()
-
-        # Evaluate metrics
-        job_priorities = {
-            job.id: job.priority for start_time, job in job_timeline
-        }  # TODO
-        mean_trt = weighted_mean_turnaround_time(simulation.history, job_priorities)
-        mean_rt = weighted_mean_response_time(simulation.history, job_priorities)
-
-        turnaround.append(mean_trt)
-        response.append(mean_rt)
+    for result in iter_simulation_results(
+        scheduler_type,
+        num_jobs,
+        max_start_time,
+        num_runs,
+        workers=workers,
+        seed=seed,
+        **run_options,
+    ):
+        turnaround.append(result["turnaround"])
+        response.append(result["response"])
+        if profiles is not None:
+            profiles.append(result["profile"])
 
     turnaround = np.array(turnaround)
     response = np.array(response)
     return turnaround, response
 
 
+def sweep_quantum(
+    quanta, scheduler_type, num_jobs, max_start_time, num_runs, **run_options
+):
+    """
+    Runs the same workloads with each time slice length in quanta.
+
+    Returns:
+        list of dicts, one per quantum, with the mean throughput (jobs per unit of simulated time),
+        weighted mean turnaround and response times, and context switches per run.
+    """
+    rows = []
+    for quantum in quanta:
+        results = list(
+            iter_simulation_results(
+                scheduler_type,
+                num_jobs,
+                max_start_time,
+                num_runs,
+                schedule_every=quantum,
+                **run_options,
+            )
+        )
+        rows.append(
+            {
+                "quantum": quantum,
+                "throughput": np.mean([num_jobs / r["makespan"] for r in results]),
+                "turnaround": np.mean([r["turnaround"] for r in results]),
+                "response": np.mean([r["response"] for r in results]),
+                "context_switches": np.mean([r["context_switches"] for r in results]),
+            }
+        )
+    return rows
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Run simulations of a process scheduler with the given parameters"
@@ -67,7 +387,7 @@ if __name__ == "__main__":
         "--scheduler_type",
         type=str,
         default="random",
-        help="One of {'RR', 'random', 'FIFO', 'weightedRandom'}",
+        help=f"One of {list(SCHEDULERS)}",
     )
     parser.add_argument(
         "--num_jobs",
@@ -77,18 +397,149 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--max_start_time",
+        type=int,
         default=1000,
         help="What's the latest start time a job can have? Job start times are uniformly sampled between 0 and this value.",
     )
     parser.add_argument(
         "--num_runs", type=int, default=1, help="How many times to run the simulation"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="How many processes to spread the runs over",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Base seed for the runs. Each run derives its own seed from it.",
+    )
+    parser.add_argument(
+        "--ready_only",
+        action="store_true",
+        help="Only schedule jobs which are not blocked on I/O",
+    )
+    parser.add_argument(
+        "--cores",
+        type=int,
+        default=1,
+        help="How many CPU cores the simulated machine has",
+    )
+    parser.add_argument(
+        "--engine",
+        type=str,
+        default="step",
+        choices=ENGINES,
+        help="'batch' simulates many runs at once with NumPy. It supports the FIFO, RR and priority schedulers on one core.",
+    )
+    parser.add_argument(
+        "--schedule_every",
+        type=int,
+        default=10,
+        help="Time slice length: a job which computes this long without blocking can be preempted. 0 disables time slicing.",
+    )
+    parser.add_argument(
+        "--sweep_quantum",
+        type=str,
+        default=None,
+        help="Comma-separated time slice lengths. Runs the same workloads with each one and prints throughput and latency.",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        help="Run the jobs of a trace saved with traces.py, rather than random workloads. --num_jobs and --max_start_time are ignored.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Count events and scheduling decisions, time each phase of the simulations and print a JSON summary",
+    )
+    parser.add_argument(
+        "--cache_path",
+        type=str,
+        default=DEFAULT_CACHE_PATH,
+        help="The result cache. Runs whose results are in it are not run again.",
+    )
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Run every simulation, without reading or writing the result cache",
+    )
+    parser.add_argument(
+        "--clear_cache",
+        action="store_true",
+        help="Empty the result cache before running, e.g. after changing the simulator",
+    )
     args = parser.parse_args()
+    if args.trace is not None and args.engine != "step":
+        parser.error("--trace only works with the step engine")
+    if args.profile and (args.sweep_quantum or args.engine != "step"):
+        parser.error("--profile only profiles the step engine, without --sweep_quantum")
 
-    turnaround, response = execute_simulations(
-        args.scheduler_type, args.num_jobs, args.max_start_time, args.num_runs
-    )
-    print(f"Mean turnaround time: {turnaround.mean():.01f} +- {turnaround.std():.01f}")
-    print(f"Mean response time: {response.mean():.01f} +- {response.std():.01f}")
+    # the batch engine has no trace option
+    trace_options = {} if args.trace is None else {"trace": args.trace}
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(args.cache_path, RESULT_FIELDS)
+        if args.clear_cache:
+            cache.clear()
+    elif args.clear_cache:
+        ResultCache(args.cache_path, RESULT_FIELDS).clear()
+    if args.sweep_quantum:
+        if args.seed is None:
+            # every quantum has to see the same workloads
+            args.seed = int(np.random.SeedSequence().generate_state(1)[0])
+        rows = sweep_quantum(
+            [int(quantum) for quantum in args.sweep_quantum.split(",")],
+            args.scheduler_type,
+            args.num_jobs,
+            args.max_start_time,
+            args.num_runs,
+            workers=args.workers,
+            seed=args.seed,
+            ready_only=args.ready_only,
+            **trace_options,
+            num_cores=args.cores,
+            engine=args.engine,
+            cache=cache,
+        )
+        print(
+            f"{'quantum':>8} {'throughput':>11} {'turnaround':>11} {'response':>9} {'switches':>9}"
+        )
+        for row in rows:
+            print(
+                f"{row['quantum']:>8} {row['throughput']:>11.4f} {row['turnaround']:>11.1f}"
+                f" {row['response']:>9.1f} {row['context_switches']:>9.1f}"
+            )
+    else:
+        profiles = [] if args.profile else None
+        start = time.perf_counter()
+        turnaround, response = execute_simulations(
+            args.scheduler_type,
+            args.num_jobs,
+            args.max_start_time,
+            args.num_runs,
+            workers=args.workers,
+            seed=args.seed,
+            ready_only=args.ready_only,
+            **trace_options,
+            num_cores=args.cores,
+            schedule_every=args.schedule_every,
+            engine=args.engine,
+            profiles=profiles,
+            cache=cache,
+        )
+        wall_time = time.perf_counter() - start
+        print(
+            f"Mean turnaround time: {turnaround.mean():.01f} +- {turnaround.std():.01f}"
+        )
+        print(f"Mean response time: {response.mean():.01f} +- {response.std():.01f}")
+        if profiles is not None:
+            summary = merge_summaries(profiles)
+            summary["wall_seconds"] = wall_time
+            print(json.dumps(summary, indent=2))
 
 # TODO: plot histograms of turnaround time and response time
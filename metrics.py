@@ -1,31 +1,162 @@
-# TODO: scheduler metrics
-# takes in a history and a job priority and spits out a metric
-from event_queue import find_event
-from simulation import SWITCHING_DONE
+# Scheduler metrics.
+# Each metric takes in a history and the job priorities and spits out a number.
+# The per-job timestamps are collected from the history's columns with vectorized reductions;
+# every metric is then a vectorized computation over those arrays.
+from collections import namedtuple
+
+import numpy as np
+
+from history import (
+    HistoryColumns,
+    HistoryRecorder,
+    columns_from_events,
+    job_times_from_columns,
+)
+from simulation import EVENT_TYPES, SWITCHING_DONE
+
+TAIL_PERCENTILES = (50, 95, 99)
+
+JobTimes = namedtuple(
+    "JobTimes", ["job_ids", "priorities", "arrival", "dispatch", "completion"]
+)
+
+
+def job_weights(priorities):
+    """Jobs are weighted by 1 / (1 + priority), so priority 0 jobs count the most."""
+    return 1 / (1 + np.asarray(priorities, dtype=float))
+
+
+def collect_job_times(history, job_priorities):
+    """
+    Collects the timestamps each metric needs.
+
+    Args:
+        history: a HistoryRecorder at the METRICS or FULL level, HistoryColumns loaded with history.load_history,
+            or a list of (time, Event) tuples, in the order they occurred.
+        job_priorities: dict of {job_id: priority} for the jobs to collect.
+
+    Returns:
+        A JobTimes of arrays aligned with job_ids: the time each job arrived (its first event),
+        was first dispatched (its first SWITCHING_DONE) and completed (its last event).
+        Jobs which never reached a stage have NaN for it.
+    """
+    job_ids = np.fromiter(
+        job_priorities.keys(), dtype=np.int64, count=len(job_priorities)
+    )
+    priorities = np.fromiter(
+        job_priorities.values(), dtype=float, count=len(job_priorities)
+    )
+    if isinstance(history, HistoryRecorder):
+        times = history.job_times()
+    else:
+        if not isinstance(history, HistoryColumns):
+            history = columns_from_events(history, EVENT_TYPES)
+        num_jobs = int(job_ids.max()) + 1 if len(job_ids) else 0
+        times = job_times_from_columns(history, num_jobs, SWITCHING_DONE)
+    arrival, dispatch, completion = (job_time[job_ids] for job_time in times)
+
+    return JobTimes(job_ids, priorities, arrival, dispatch, completion)
+
+
+def service_times(job_timeline):
+    """
+    Returns a dict of {job_id: total task time}: how long each job would take running alone.
+    """
+    return {job.id: job.total_task_time() for start_time, job in job_timeline}
+
+
+def _weighted_mean(values, priorities):
+    weights = job_weights(priorities)
+    return float((values * weights).sum() / weights.sum())
+
+
+def turnaround_times(job_times):
+    return job_times.completion - job_times.arrival
+
+
+def response_times(job_times):
+    return job_times.dispatch - job_times.arrival
+
+
+def _service_time_array(job_times, job_service_times):
+    return np.array(
+        [job_service_times[job_id] for job_id in job_times.job_ids.tolist()],
+        dtype=float,
+    )
 
 
 def weighted_mean_turnaround_time(history, job_priorities):
-    # add 1 to the priority
     # divide the turnaround time by (1+priority)
-    total_turnaround_time = 0
-    total_weight = 0
-    for job_id, priority in job_priorities.items():
-        job_start_time, _ = history[find_event(history, job_id=job_id)]
-        job_end_time, _ = history[find_event(history, job_id=job_id, get_last=True)]
-        weight = 1 / (1 + priority)
-        total_turnaround_time = (job_end_time - job_start_time) * weight
-        total_weight += weight
-    return total_turnaround_time / total_weight
+    job_times = collect_job_times(history, job_priorities)
+    return _weighted_mean(turnaround_times(job_times), job_times.priorities)
 
 
 def weighted_mean_response_time(history, job_priorities):
-    total_response_time = 0
-    total_weight = 0
-    for job_id, priority in job_priorities.items():
-        job_start_time, _ = history[find_event(history, job_id=job_id)]
-        job_run_time, _ = history[
-            find_event(history, job_id=job_id, event_type=SWITCHING_DONE)
-        ]
-        total_response_time = (job_run_time - job_start_time) / (1 + priority)
-        total_weight += 1 / (1 + priority)
-    return total_response_time / total_weight
+    job_times = collect_job_times(history, job_priorities)
+    return _weighted_mean(response_times(job_times), job_times.priorities)
+
+
+def weighted_mean_waiting_time(history, job_priorities, job_service_times):
+    """The time a job spends resident without making progress: its turnaround time minus its service time."""
+    job_times = collect_job_times(history, job_priorities)
+    waiting = turnaround_times(job_times) - _service_time_array(
+        job_times, job_service_times
+    )
+    return _weighted_mean(waiting, job_times.priorities)
+
+
+def weighted_mean_slowdown(history, job_priorities, job_service_times):
+    """How many times longer a job takes than it would running alone."""
+    job_times = collect_job_times(history, job_priorities)
+    slowdown = turnaround_times(job_times) / _service_time_array(
+        job_times, job_service_times
+    )
+    return _weighted_mean(slowdown, job_times.priorities)
+
+
+def summarize(
+    history, job_priorities, job_service_times=None, percentiles=TAIL_PERCENTILES
+):
+    """
+    Computes every metric from one collection of the per-job timestamps.
+
+    Args:
+        history: a HistoryRecorder, HistoryColumns or list of (time, Event) tuples, as for collect_job_times.
+        job_priorities: dict of {job_id: priority}.
+        job_service_times (optional): dict of {job_id: total task time}, as returned by service_times.
+            Waiting time and slowdown are only reported when this is given.
+        percentiles: the tail latency percentiles to report.
+
+    Returns:
+        A dict of weighted means, unweighted tail percentiles of turnaround and response time,
+        and a "by_priority" dict with the unweighted means of each priority level.
+    """
+    job_times = collect_job_times(history, job_priorities)
+    per_job = {
+        "turnaround_time": turnaround_times(job_times),
+        "response_time": response_times(job_times),
+    }
+    if job_service_times is not None:
+        service = _service_time_array(job_times, job_service_times)
+        per_job["waiting_time"] = per_job["turnaround_time"] - service
+        per_job["slowdown"] = per_job["turnaround_time"] / service
+
+    summary = {"num_jobs": len(job_times.job_ids)}
+    for name, values in per_job.items():
+        summary[f"weighted_mean_{name}"] = _weighted_mean(values, job_times.priorities)
+    for name in ("turnaround_time", "response_time"):
+        for percentile, value in zip(
+            percentiles, np.percentile(per_job[name], percentiles)
+        ):
+            summary[f"p{percentile}_{name}"] = float(value)
+
+    by_priority = {}
+    levels, level_index = np.unique(job_times.priorities, return_inverse=True)
+    counts = np.bincount(level_index, minlength=len(levels))
+    for name, values in per_job.items():
+        means = np.bincount(level_index, weights=values, minlength=len(levels)) / counts
+        for level, count, mean in zip(levels.tolist(), counts.tolist(), means.tolist()):
+            level_summary = by_priority.setdefault(int(level), {"num_jobs": count})
+            level_summary[f"mean_{name}"] = mean
+    summary["by_priority"] = by_priority
+    return summary
@@ -0,0 +1,363 @@
+# Reinforcement learning environments around Simulation.
+# An agent sees the job tokens of Simulation.tokenize_state and picks the job to run at every scheduling decision.
+import functools
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from history import METRICS
+from job_timeline import make_workload, workload_to_job_timeline
+from metrics import (
+    job_weights,
+    weighted_mean_response_time,
+    weighted_mean_turnaround_time,
+)
+from simulation import Simulation, SimulationListener
+from tokens import NUM_FEATURES
+
+
+@functools.lru_cache(maxsize=None)
+def _job_weight(priority):
+    return float(job_weights(priority))
+
+
+class TurnaroundMeter(SimulationListener):
+    """
+    Accumulates the weighted time jobs have spent resident, for rewards.
+
+    Each resident job adds its weight (metrics.job_weights) per unit of time, so at the end of the simulation
+    the total is the weighted sum of the turnaround times. Divided by the total weight of the workload,
+    it is the weighted mean turnaround time.
+    """
+
+    def __init__(self):
+        self.total = 0.0
+        self.resident_weight = 0.0
+        self.time = 0
+
+    def on_subscribe(self, simulation):
+        self.total = 0.0
+        self.resident_weight = 0.0
+        self.time = simulation.time
+
+    def on_job_arrival(self, simulation, job):
+        self._accumulate(simulation.time)
+        self.resident_weight += _job_weight(job.priority)
+
+    def on_job_exit(self, simulation, job):
+        self._accumulate(simulation.time)
+        self.resident_weight -= _job_weight(job.priority)
+
+    def _accumulate(self, time):
+        self.total += self.resident_weight * (time - self.time)
+        self.time = time
+
+    def value(self, time):
+        """The weighted resident time up to the given time."""
+        return self.total + self.resident_weight * (time - self.time)
+
+
+class SchedulingEnv:
+    """
+    One single-core simulation as an episodic environment.
+
+    Each episode runs a new workload of num_jobs jobs. At every scheduling decision the agent observes
+    the tokens of the resident jobs and picks one of them by its row. The reward of a decision is minus the
+    weighted time jobs spent resident until the next decision, divided by the total weight of the workload,
+    so the return of an episode is minus its weighted mean turnaround time.
+
+    Args:
+        num_jobs: the number of jobs in each episode.
+        max_start_time: job start times are uniform between 0 and this value.
+        seed (optional): an int or np.random.SeedSequence. Each episode's workload is seeded from it in turn.
+        simulation_options: passed on to Simulation, e.g. schedule_every and context_switch_time.
+    """
+
+    def __init__(self, num_jobs, max_start_time, seed=None, **simulation_options):
+        self.num_jobs = num_jobs
+        self.max_start_time = max_start_time
+        self.seed_sequence = (
+            seed
+            if isinstance(seed, np.random.SeedSequence)
+            else np.random.SeedSequence(seed)
+        )
+        self.simulation_options = simulation_options
+        self.simulation = None
+        self.meter = None
+        self.total_weight = 0.0
+        self.episode_seed = None
+        self.episode_return = 0.0
+        self.episode_decisions = 0
+
+    def reset(self):
+        """Starts a new episode and returns the tokens of the first decision."""
+        self.episode_seed = int(self.seed_sequence.spawn(1)[0].generate_state(1)[0])
+        job_timeline = workload_to_job_timeline(
+            make_workload(self.num_jobs, self.max_start_time, rng=self.episode_seed)
+        )
+        self.total_weight = float(
+            job_weights([job.priority for start_time, job in job_timeline]).sum()
+        )
+        self.simulation = Simulation(
+            job_timeline, record=METRICS, **self.simulation_options
+        )
+        self.meter = TurnaroundMeter()
+        self.simulation.subscribe(self.meter)
+        self.simulation.run_until_scheduling_needed()
+        self.episode_return = 0.0
+        self.episode_decisions = 0
+        return self.observe()
+
+    def observe(self):
+        """
+        Returns the tokens of the resident jobs. Row i is the token of job self.simulation.token_buffer.job_ids[i].
+        The array is only valid until the next step.
+        """
+        return self.simulation.tokenize_state()
+
+    def step(self, row):
+        """
+        Runs the job in the given row of the last observation until the next decision.
+
+        Returns:
+            (reward, done)
+        """
+        simulation = self.simulation
+        if not 0 <= row < simulation.token_buffer.num_jobs:
+            raise ValueError(f"No job in row {row}")
+        before = self.meter.value(simulation.time)
+        simulation.schedule_job(int(simulation.token_buffer.job_ids[row]))
+        simulation.run_until_scheduling_needed()
+        reward = (before - self.meter.value(simulation.time)) / self.total_weight
+        self.episode_return += reward
+        self.episode_decisions += 1
+        return reward, simulation.is_finished()
+
+    def episode_info(self):
+        """The metrics of the episode which just finished."""
+        simulation = self.simulation
+        job_priorities = {
+            job.id: job.priority for start_time, job in simulation.job_timeline
+        }
+        return {
+            "seed": self.episode_seed,
+            "return": self.episode_return,
+            "decisions": self.episode_decisions,
+            "turnaround": weighted_mean_turnaround_time(
+                simulation.history, job_priorities
+            ),
+            "response": weighted_mean_response_time(simulation.history, job_priorities),
+            "makespan": simulation.time,
+        }
+
+
+class _EnvGroup:
+    """Steps some of a VectorSchedulingEnv's environments, writing their observations into the shared arrays."""
+
+    def __init__(self, env_indices, seed_sequences, env_options, tokens, mask):
+        self.env_indices = env_indices
+        self.envs = [SchedulingEnv(seed=seed, **env_options) for seed in seed_sequences]
+        self.tokens = tokens
+        self.mask = mask
+
+    def _write(self, index, env_tokens):
+        num_jobs = len(env_tokens)
+        self.tokens[index, :num_jobs] = env_tokens
+        self.tokens[index, num_jobs:] = 0
+        self.mask[index, :num_jobs] = True
+        self.mask[index, num_jobs:] = False
+
+    def reset(self):
+        for index, env in zip(self.env_indices, self.envs):
+            self._write(index, env.reset())
+
+    def step(self, actions):
+        rewards = np.empty(len(self.envs))
+        dones = np.zeros(len(self.envs), bool)
+        infos = {}
+        for i, (index, env, row) in enumerate(
+            zip(self.env_indices, self.envs, actions)
+        ):
+            rewards[i], dones[i] = env.step(int(row))
+            if dones[i]:
+                infos[index] = env.episode_info()
+                env_tokens = env.reset()
+            else:
+                env_tokens = env.observe()
+            self._write(index, env_tokens)
+        return rewards, dones, infos
+
+
+def _shared_arrays(memories, shape):
+    """The observation arrays in the shared memory created by VectorSchedulingEnv."""
+    tokens = np.ndarray(shape + (NUM_FEATURES,), np.float32, memories[0].buf)
+    mask = np.ndarray(shape, bool, memories[1].buf)
+    return tokens, mask
+
+
+def _worker(connection, names, shape, env_indices, seed_sequences, env_options):
+    memories = [shared_memory.SharedMemory(name=name) for name in names]
+    tokens, mask = _shared_arrays(memories, shape)
+    group = _EnvGroup(env_indices, seed_sequences, env_options, tokens, mask)
+    try:
+        while True:
+            command, argument = connection.recv()
+            if command == "reset":
+                connection.send(group.reset())
+            elif command == "step":
+                connection.send(group.step(argument))
+            else:
+                break
+    finally:
+        del tokens, mask, group
+        for memory in memories:
+            memory.close()
+        connection.close()
+
+
+class VectorSchedulingEnv:
+    """
+    Runs num_envs SchedulingEnvs side by side, with stacked observations and automatic resets.
+
+    Observations are padded to num_jobs rows, the most jobs which can be resident at once:
+    tokens is a (num_envs, num_jobs, NUM_FEATURES) float32 array and mask a (num_envs, num_jobs) bool array,
+    True for rows holding a job. Both are updated in place by reset and step.
+
+    When an episode finishes, its environment starts a new one straight away: the observation returned
+    for it is the first of the new episode, and infos holds the finished episode's metrics under its index.
+
+    With workers > 0 the environments are split between that many worker processes, which write
+    their observations into shared memory, so only the actions, rewards and finished episodes' infos
+    are sent between processes. The episodes only depend on the seed, not on the number of workers.
+
+    Args:
+        num_envs: the number of environments.
+        num_jobs, max_start_time, simulation_options: as for SchedulingEnv.
+        workers: the number of worker processes, or 0 to step the environments in this process.
+        seed (optional): the base seed. Each environment gets its own seed sequence spawned from it.
+    """
+
+    def __init__(
+        self,
+        num_envs,
+        num_jobs,
+        max_start_time,
+        workers=0,
+        seed=None,
+        **simulation_options,
+    ):
+        self.num_envs = num_envs
+        env_options = dict(
+            num_jobs=num_jobs, max_start_time=max_start_time, **simulation_options
+        )
+        seed_sequences = np.random.SeedSequence(seed).spawn(num_envs)
+        shape = (num_envs, num_jobs)
+        self._memories = []
+        self._workers = []
+        self._connections = []
+
+        if workers <= 0:
+            self.tokens = np.zeros(shape + (NUM_FEATURES,), np.float32)
+            self.mask = np.zeros(shape, bool)
+            self._groups = [
+                _EnvGroup(
+                    list(range(num_envs)),
+                    seed_sequences,
+                    env_options,
+                    self.tokens,
+                    self.mask,
+                )
+            ]
+            return
+
+        self._groups = None
+        self._memories = [
+            shared_memory.SharedMemory(create=True, size=max(1, size))
+            for size in (
+                num_envs * num_jobs * NUM_FEATURES * np.dtype(np.float32).itemsize,
+                num_envs * num_jobs,
+            )
+        ]
+        names = [memory.name for memory in self._memories]
+        self.tokens, self.mask = _shared_arrays(self._memories, shape)
+        self._splits = np.array_split(np.arange(num_envs), min(workers, num_envs))
+        for env_indices in self._splits:
+            connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target=_worker,
+                args=(
+                    worker_connection,
+                    names,
+                    shape,
+                    env_indices.tolist(),
+                    [seed_sequences[i] for i in env_indices],
+                    env_options,
+                ),
+                daemon=True,
+            )
+            worker.start()
+            worker_connection.close()
+            self._workers.append(worker)
+            self._connections.append(connection)
+
+    def reset(self):
+        """Starts a new episode in every environment. Returns (tokens, mask)."""
+        if self._groups is not None:
+            for group in self._groups:
+                group.reset()
+        else:
+            for connection in self._connections:
+                connection.send(("reset", None))
+            for connection in self._connections:
+                connection.recv()
+        return self.tokens, self.mask
+
+    def step(self, actions):
+        """
+        Takes one decision in every environment: actions[i] is the row of the job to run in environment i.
+
+        Returns:
+            (tokens, mask, rewards, dones, infos), where infos is a dict of {env index: episode_info()}
+            for the environments whose episode finished.
+        """
+        actions = np.asarray(actions)
+        if self._groups is not None:
+            rewards, dones, infos = self._groups[0].step(actions)
+            return self.tokens, self.mask, rewards, dones, infos
+
+        for connection, env_indices in zip(self._connections, self._splits):
+            connection.send(("step", actions[env_indices]))
+        rewards = np.empty(self.num_envs)
+        dones = np.empty(self.num_envs, bool)
+        infos = {}
+        for connection, env_indices in zip(self._connections, self._splits):
+            rewards[env_indices], dones[env_indices], group_infos = connection.recv()
+            infos.update(group_infos)
+        return self.tokens, self.mask, rewards, dones, infos
+
+    def close(self):
+        """
+        Stops the worker processes and frees the shared memory.
+        self.tokens and self.mask are copied out first; arrays returned by earlier calls must not be used afterwards.
+        """
+        for connection in self._connections:
+            connection.send(("close", None))
+            connection.close()
+        for worker in self._workers:
+            worker.join()
+        self._connections = []
+        self._workers = []
+        if self._memories:
+            self.tokens = self.tokens.copy()
+            self.mask = self.mask.copy()
+            for memory in self._memories:
+                memory.close()
+                memory.unlink()
+            self._memories = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
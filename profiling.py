@@ -0,0 +1,147 @@
+# Instrumentation for finding out where a simulation spends its time.
+# A Simulation given a SimulationProfile wraps its hot-path methods to count and time them.
+# Without a profile nothing is wrapped, so an unprofiled simulation runs exactly the same code.
+import time
+
+COUNTERS = (
+    "events_processed",
+    "event_batches",  # calls to _process_next_events: the times at which something happened
+    "scheduling_decisions",  # calls to the scheduler from Simulation.run
+    "fast_forwards",
+    "context_switches",
+    "max_queue_length",  # the most pending events, sampled before each batch of events
+)
+# Phases which are timed with timers=True.
+# The times are inclusive: "advance" includes "process_event", which includes some "event_queue" time.
+PHASES = (
+    "advance",  # Simulation.run_until_scheduling_needed
+    "process_event",  # Simulation._process_event, including the listeners it notifies
+    "event_queue",  # EventQueue operations outside of fast-forwarding
+    "schedule",  # the scheduler's decisions
+    "fast_forward",  # Simulation._fast_forward
+    "metrics",  # computing the metrics, when timed by the caller with add_time
+)
+EVENT_QUEUE_METHODS = ("push", "pop_next_event", "get_next_event_time", "remove_event")
+
+
+class SimulationProfile:
+    """
+    Counters, and optionally per-phase timers, filled in by the Simulation it is given to.
+
+    Args:
+        timers: also time each phase in PHASES, or given a collection of phases, only those phases.
+            Timing costs a couple of clock reads per call, so it slows the simulation down more than counting does.
+
+    Attributes:
+        counters (dict): counter name -> value, for the names in COUNTERS.
+        timers (dict): phase -> [calls, seconds].
+    """
+
+    def __init__(self, timers=False):
+        self.timed_phases = set(PHASES) if timers is True else set(timers or ())
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.timers = {}
+
+    def instrument(self, simulation):
+        """Wraps the simulation's hot-path methods, as instance attributes, to count and time them."""
+        counters = self.counters
+        record = simulation.history.record
+
+        def counted_record(time, event):
+            counters["events_processed"] += 1
+            record(time, event)
+
+        simulation.history.record = counted_record
+
+        process_next_events = simulation._process_next_events
+        events = simulation.events
+
+        def counted_process_next_events():
+            counters["event_batches"] += 1
+            if len(events) > counters["max_queue_length"]:
+                counters["max_queue_length"] = len(events)
+            process_next_events()
+
+        simulation._process_next_events = counted_process_next_events
+        simulation._fast_forward = self.wrap(
+            "fast_forward", simulation._fast_forward, "fast_forwards"
+        )
+        if "advance" in self.timed_phases:
+            simulation.run_until_scheduling_needed = self.timed(
+                "advance", simulation.run_until_scheduling_needed
+            )
+        if "process_event" in self.timed_phases:
+            simulation._process_event = self.timed(
+                "process_event", simulation._process_event
+            )
+        if "event_queue" in self.timed_phases:
+            for name in EVENT_QUEUE_METHODS:
+                setattr(events, name, self.timed("event_queue", getattr(events, name)))
+
+    def wrap(self, phase, function, counter):
+        """Returns function, counting its calls in the given counter and timing it if the phase is timed."""
+        if phase in self.timed_phases:
+            function = self.timed(phase, function)
+        counters = self.counters
+
+        def counted(*args, **kwargs):
+            counters[counter] += 1
+            return function(*args, **kwargs)
+
+        return counted
+
+    def timed(self, phase, function):
+        """Returns function, adding each call's duration to the phase's timer."""
+        timer = self.timers.setdefault(phase, [0, 0.0])
+        clock = time.perf_counter
+
+        def timed_function(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timer[0] += 1
+                timer[1] += clock() - start
+
+        return timed_function
+
+    def add_time(self, phase, seconds, calls=1):
+        """Adds time spent outside of the simulation, e.g. computing metrics, to a phase."""
+        timer = self.timers.setdefault(phase, [0, 0.0])
+        timer[0] += calls
+        timer[1] += seconds
+
+    def finish(self, simulation):
+        """Collects the counters the simulation keeps itself. Called at the end of Simulation.run."""
+        self.counters["context_switches"] = simulation.context_switches
+
+    def summary(self):
+        """Returns the counters and timers as a JSON-serializable dict."""
+        return {
+            "runs": 1,
+            "counters": dict(self.counters),
+            "timers": {
+                phase: {"calls": calls, "seconds": seconds}
+                for phase, (calls, seconds) in self.timers.items()
+            },
+        }
+
+
+def merge_summaries(summaries):
+    """
+    Combines the summaries of several runs: counters and timers are summed,
+    except for high-water marks, which take the maximum.
+    """
+    merged = {"runs": 0, "counters": dict.fromkeys(COUNTERS, 0), "timers": {}}
+    for summary in summaries:
+        merged["runs"] += summary["runs"]
+        for name, value in summary["counters"].items():
+            if name.startswith("max_"):
+                merged["counters"][name] = max(merged["counters"][name], value)
+            else:
+                merged["counters"][name] += value
+        for phase, timer in summary["timers"].items():
+            total = merged["timers"].setdefault(phase, {"calls": 0, "seconds": 0.0})
+            total["calls"] += timer["calls"]
+            total["seconds"] += timer["seconds"]
+    return merged
@@ -0,0 +1,136 @@
+# An on-disk cache of simulation results, so repeated sweeps only pay for the runs they haven't done before.
+#
+# Results are keyed by a hash of the run's workload and configuration (see main.run_key), and stored as
+# packed binary records in a SQLite database, which serializes concurrent access from several processes.
+import hashlib
+import os
+import sqlite3
+import struct
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "scheduler_simulation", "results.sqlite"
+)
+# Keys are looked up this many at a time, below SQLite's limit on query parameters
+LOOKUP_CHUNK_SIZE = 500
+
+
+def workload_digest(workload):
+    """A SHA-256 digest of a Workload's columns, which identifies its jobs."""
+    digest = hashlib.sha256()
+    for name, column in zip(workload._fields, workload):
+        column = np.ascontiguousarray(column)
+        digest.update(f"{name}:{column.dtype.str}:{column.shape}".encode())
+        digest.update(column.tobytes())
+    return digest.digest()
+
+
+class ResultCache:
+    """
+    A size-bounded store of run results, shared by every process that opens the same path.
+
+    Each result is a dict of numbers, stored as one record packed with struct in the order of fields,
+    so a run's metrics take a few dozen bytes. Every lookup refreshes the last use time of the results it finds,
+    and evict() drops the least recently used results beyond max_entries.
+    Writers wait up to timeout seconds for each other; readers never see a partly written result.
+
+    Args:
+        path: the SQLite database file. Its directory is created if needed.
+        fields: dict of {result key: struct format character}, e.g. {"seed": "Q", "turnaround": "d"}.
+        max_entries: how many results to keep.
+        timeout: how long to wait for another process's write, in seconds.
+    """
+
+    def __init__(
+        self, path=DEFAULT_CACHE_PATH, fields=None, max_entries=1_000_000, timeout=60.0
+    ):
+        if not fields:
+            raise ValueError("The cache needs the fields of a result")
+        self.path = path
+        self.fields = dict(fields)
+        self.record = struct.Struct("<" + "".join(self.fields.values()))
+        self.max_entries = max_entries
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=timeout)
+        with self.connection:
+            # Write-ahead logging lets readers go on while another process writes
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS results"
+                " (key BLOB PRIMARY KEY, value BLOB NOT NULL, last_used REAL NOT NULL)"
+                " WITHOUT ROWID"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)"
+            )
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get_many(self, keys):
+        """Returns the cached result of each key, or None for the keys which aren't cached."""
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[start : start + LOOKUP_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(
+                self.connection.execute(
+                    f"SELECT key, value FROM results WHERE key IN ({placeholders})",
+                    chunk,
+                )
+            )
+        if found:
+            now = time.time()
+            with self.connection:
+                self.connection.executemany(
+                    "UPDATE results SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+        return [self._unpack(found.get(key)) for key in keys]
+
+    def put_many(self, items):
+        """Stores the results of an iterable of (key, result) in one transaction."""
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO results (key, value, last_used) VALUES (?, ?, ?)",
+                [(key, self._pack(result), now) for key, result in items],
+            )
+
+    def evict(self):
+        """Deletes the least recently used results beyond max_entries. Returns how many were deleted."""
+        with self.connection:
+            excess = len(self) - self.max_entries
+            if excess <= 0:
+                return 0
+            self.connection.execute(
+                "DELETE FROM results WHERE key IN"
+                " (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+        return excess
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM results")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _pack(self, result):
+        return self.record.pack(*(result[name] for name in self.fields))
+
+    def _unpack(self, value):
+        if value is None or len(value) != self.record.size:
+            return None
+        return dict(zip(self.fields, self.record.unpack(value)))
@@ -0,0 +1,79 @@
+from simulation import SimulationListener
+
+
+class Scheduler(SimulationListener):
+    """
+    Base class for schedulers.
+
+    A scheduler picks the id of the job to run with schedule(simulation).
+    On a simulation with several cores, place(simulation) picks a job for every core,
+    from the jobs returned by schedule_many(simulation, num_cores).
+    Schedulers which keep their own run queues subscribe to the simulation,
+    and keep them up to date from its job arrival, exit, blocked and ready notifications.
+
+    Args:
+        ready_only: only pick jobs which are ready to run, skipping jobs blocked on I/O.
+    """
+
+    # Whether the scheduler always keeps the job on the CPU when it is the only job it could pick,
+    # and skipping those decisions leaves its later decisions unchanged.
+    # Simulation.run then fast-forwards through such stretches without asking the scheduler.
+    keeps_sole_runnable_job = False
+
+    def __init__(self, ready_only=False):
+        self.simulation = None
+        self.ready_only = ready_only
+
+    def on_subscribe(self, simulation):
+        self.simulation = simulation
+
+    def attach(self, simulation):
+        """Subscribes to the simulation, unless the scheduler is already subscribed to it."""
+        if self.simulation is not simulation:
+            simulation.subscribe(self)
+
+    def schedule(self, simulation):
+        raise NotImplementedError
+
+    def schedule_many(self, simulation, num_jobs):
+        """
+        Returns the ids of up to num_jobs distinct jobs to run at the same time, in order of preference.
+        Schedulers which don't override this only ever run one job at a time.
+        """
+        job_id = self.schedule(simulation)
+        return [] if job_id is None else [job_id]
+
+    def place(self, simulation):
+        """
+        Returns the id of the job to run on each core (None leaves the core idle).
+
+        Chosen jobs which are already running stay on their cores, to avoid context switches.
+        The other chosen jobs fill the remaining cores, and cores left over keep their current job.
+        """
+        job_ids = self.schedule_many(simulation, simulation.num_cores)
+        placement = [None] * simulation.num_cores
+        chosen = set(job_ids)
+        free_cores = []
+        for core in simulation.cores:
+            if core.job is not None and core.job.id in chosen:
+                placement[core.index] = core.job.id
+                chosen.discard(core.job.id)
+            else:
+                free_cores.append(core)
+        new_job_ids = iter([job_id for job_id in job_ids if job_id in chosen])
+        for core in free_cores:
+            job_id = next(new_job_ids, None)
+            if job_id is None and core.job is not None:
+                job_id = core.job.id
+            placement[core.index] = job_id
+        return placement
+
+    def no_ready_job(self, simulation):
+        """
+        The choice of a ready_only scheduler when every job is blocked:
+        keep the current job on the CPU rather than paying for a context switch,
+        or leave the CPU idle if there is no current job.
+        """
+        if simulation.current_job is None:
+            return None
+        return simulation.current_job.id
@@ -1,45 +1,165 @@
+import heapq
+import itertools
 import random
+from collections import deque
 
+from schedulers.base import Scheduler
 
-class RandomScheduler:
-    def __init__(self):
-        pass
 
+class RandomScheduler(Scheduler):
     def schedule(self, simulation):
+        if self.ready_only:
+            if not simulation.ready_jobs:
+                return self.no_ready_job(simulation)
+            return random.choice(list(simulation.ready_jobs.keys()))
         return random.choice(list(simulation.jobs.keys()))
 
+    def schedule_many(self, simulation, num_jobs):
+        pool = simulation.ready_jobs if self.ready_only else simulation.jobs
+        return random.sample(list(pool.keys()), min(num_jobs, len(pool)))
 
-class RoundRobinScheduler:
-    def __init__(self):
-        self.queue = []
+
+class RoundRobinScheduler(Scheduler):
+    """
+    Runs each job in turn. New jobs go to the front of the queue.
+
+    The queue is a deque of (job id, ticket) entries, plus a dict of the ticket of each job's live entry.
+    Entries of jobs which exited (or, with ready_only, blocked) are left in the deque and skipped
+    when they reach the front, so each decision is O(1) amortized.
+    With ready_only, jobs leave the queue when they block and rejoin at the back when their I/O completes.
+    """
+
+    keeps_sole_runnable_job = True
+
+    def __init__(self, ready_only=False):
+        super().__init__(ready_only)
+        self.queue = deque()
+        self.queued = {}
+        self.arrivals = []
+        self.tickets = itertools.count()
+
+    def on_subscribe(self, simulation):
+        super().on_subscribe(simulation)
+        self.queue.clear()
+        self.queued.clear()
+        self.arrivals.clear()
+
+    def on_job_arrival(self, simulation, job):
+        self.arrivals.append(job.id)
+
+    def on_job_exit(self, simulation, job):
+        self.queued.pop(job.id, None)
+
+    def on_job_blocked(self, simulation, job):
+        if self.ready_only:
+            self.queued.pop(job.id, None)
+
+    def on_job_ready(self, simulation, job):
+        if self.ready_only and job.id not in self.queued:
+            ticket = next(self.tickets)
+            self.queue.append((job.id, ticket))
+            self.queued[job.id] = ticket
 
     def schedule(self, simulation):
+        job_ids = self.schedule_many(simulation, 1)
+        if not job_ids and self.ready_only:
+            return self.no_ready_job(simulation)
+        assert job_ids, "No more jobs to schedule!"
+        return job_ids[0]
+
+    def schedule_many(self, simulation, num_jobs):
+        self.attach(simulation)
         # Add new jobs to the front of the queue
-        new_job_ids = [
-            job_id for job_id in simulation.jobs.keys() if job_id not in self.queue
-        ]
-        self.queue = new_job_ids + self.queue
-        while self.queue[0] not in simulation.jobs:
-            self.queue.pop(0)
-        assert self.queue, "No more jobs to schedule!"
-        # run the first job, then move it to the back
-        job_to_run = self.queue.pop(0)
-        self.queue.append(job_to_run)
-        return job_to_run
+        if self.arrivals:
+            pool = simulation.ready_jobs if self.ready_only else simulation.jobs
+            for job_id in reversed(self.arrivals):
+                if job_id in pool:
+                    ticket = next(self.tickets)
+                    self.queue.appendleft((job_id, ticket))
+                    self.queued[job_id] = ticket
+            self.arrivals.clear()
+        queue = self.queue
+        job_ids = []
+        for _ in range(min(num_jobs, len(self.queued))):
+            while self.queued.get(queue[0][0]) != queue[0][1]:
+                queue.popleft()
+            # run the first job, then move it to the back
+            queue.rotate(-1)
+            job_ids.append(queue[-1][0])
+        return job_ids
 
 
-class FIFOScheduler:
-    def __init__(self):
-        self.queue = []
+class FIFOScheduler(Scheduler):
+    """
+    Runs the oldest job until it is done.
 
-    def schedule(self, simulation):
+    Like RoundRobinScheduler, the queue is a deque of job ids plus the set of ids in it which are still resident,
+    and jobs which exit are skipped lazily.
+    With ready_only, the oldest ready job runs instead. Job ids are handed out in arrival order,
+    so the ready jobs are kept in a heap of job ids, and jobs which are no longer ready are skipped lazily.
+    """
+
+    keeps_sole_runnable_job = True
+
+    def __init__(self, ready_only=False):
+        super().__init__(ready_only)
+        self.queue = deque()
+        self.queued = set()
+        self.ready_heap = []
+
+    def on_subscribe(self, simulation):
+        super().on_subscribe(simulation)
+        self.queue.clear()
+        self.queued.clear()
+        self.ready_heap.clear()
+
+    def on_job_arrival(self, simulation, job):
         # Add new jobs to the back of the queue
-        new_job_ids = [
-            job_id for job_id in simulation.jobs.keys() if job_id not in self.queue
-        ]
-        self.queue += new_job_ids
-        while self.queue[0] not in simulation.jobs:
-            self.queue.pop(0)
+        self.queue.append(job.id)
+        self.queued.add(job.id)
+        if self.ready_only:
+            heapq.heappush(self.ready_heap, job.id)
+
+    def on_job_exit(self, simulation, job):
+        self.queued.discard(job.id)
+
+    def on_job_ready(self, simulation, job):
+        if self.ready_only:
+            heapq.heappush(self.ready_heap, job.id)
+
+    def schedule(self, simulation):
+        self.attach(simulation)
+        if self.ready_only:
+            ready_heap = self.ready_heap
+            while ready_heap and ready_heap[0] not in simulation.ready_jobs:
+                heapq.heappop(ready_heap)
+            if not ready_heap:
+                return self.no_ready_job(simulation)
+            return ready_heap[0]
+        while self.queue and self.queue[0] not in self.queued:
+            self.queue.popleft()
         assert self.queue, "No more jobs to schedule!"
         # just keep running the first job till its done
         return self.queue[0]
+
+    def schedule_many(self, simulation, num_jobs):
+        self.attach(simulation)
+        job_ids = []
+        if self.ready_only:
+            # Pop the oldest ready jobs, then put them back
+            ready_heap = self.ready_heap
+            while ready_heap and len(job_ids) < num_jobs:
+                job_id = heapq.heappop(ready_heap)
+                if job_id in simulation.ready_jobs and job_id not in job_ids:
+                    job_ids.append(job_id)
+            for job_id in job_ids:
+                heapq.heappush(ready_heap, job_id)
+            return job_ids
+        while self.queue and self.queue[0] not in self.queued:
+            self.queue.popleft()
+        for job_id in self.queue:
+            if len(job_ids) == num_jobs:
+                break
+            if job_id in self.queued:
+                job_ids.append(job_id)
+        return job_ids
@@ -0,0 +1,231 @@
+from schedulers.base import Scheduler
+
+# A model of Linux's completely fair scheduler: every job accrues virtual runtime as it computes,
+# at a rate inversely proportional to its weight, and the job with the least virtual runtime runs.
+
+# The weight of a nice 0 task in Linux. Each nice level scales a task's weight by about 1.25.
+NICE_0_WEIGHT = 1024
+
+
+def nice_weight(priority):
+    """The weight of a job, treating its priority as a nice level: priority 0 has NICE_0_WEIGHT."""
+    return NICE_0_WEIGHT / 1.25**priority
+
+
+class _Node:
+    __slots__ = ("key", "left", "right", "height")
+
+    def __init__(self, key):
+        self.key = key
+        self.left = None
+        self.right = None
+        self.height = 1
+
+
+def _height(node):
+    return node.height if node is not None else 0
+
+
+def _update(node):
+    node.height = 1 + max(_height(node.left), _height(node.right))
+
+
+def _rotate_right(node):
+    left = node.left
+    node.left = left.right
+    left.right = node
+    _update(node)
+    _update(left)
+    return left
+
+
+def _rotate_left(node):
+    right = node.right
+    node.right = right.left
+    right.left = node
+    _update(node)
+    _update(right)
+    return right
+
+
+def _rebalance(node):
+    _update(node)
+    balance = _height(node.left) - _height(node.right)
+    if balance > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if balance < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+
+class AVLTree:
+    """
+    A balanced binary search tree (an AVL tree) of unique, comparable keys,
+    which inserts and removes keys and finds the smallest key in O(log n).
+    Iterating over the tree yields its keys in order.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.key
+            node = node.right
+
+    def first(self):
+        """Returns the smallest key, or None if the tree is empty."""
+        node = self.root
+        if node is None:
+            return None
+        while node.left is not None:
+            node = node.left
+        return node.key
+
+    def insert(self, key):
+        self.root = self._insert(self.root, key)
+        self.size += 1
+
+    def remove(self, key):
+        """Removes the key from the tree. Raises a KeyError if it is not in the tree."""
+        self.root = self._remove(self.root, key)
+        self.size -= 1
+
+    def _insert(self, node, key):
+        if node is None:
+            return _Node(key)
+        if key < node.key:
+            node.left = self._insert(node.left, key)
+        elif node.key < key:
+            node.right = self._insert(node.right, key)
+        else:
+            raise KeyError(f"{key} is already in the tree")
+        return _rebalance(node)
+
+    def _remove(self, node, key):
+        if node is None:
+            raise KeyError(key)
+        if key < node.key:
+            node.left = self._remove(node.left, key)
+        elif node.key < key:
+            node.right = self._remove(node.right, key)
+        else:
+            if node.left is None:
+                return node.right
+            if node.right is None:
+                return node.left
+            # Replace the node's key with its successor's, and remove the successor
+            successor = node.right
+            while successor.left is not None:
+                successor = successor.left
+            node.key = successor.key
+            node.right = self._remove(node.right, successor.key)
+        return _rebalance(node)
+
+
+class CFSScheduler(Scheduler):
+    """
+    Completely fair scheduling: runs the job with the least virtual runtime.
+
+    A job's virtual runtime grows by its compute time scaled by NICE_0_WEIGHT / nice_weight(priority),
+    so a job one priority level less important accrues it 1.25 times as fast, and gets a smaller share of the CPU.
+    It is charged from the simulation's on_job_computed notifications, as the compute time is deducted from the job.
+    Jobs arrive with the smallest virtual runtime in the tree (min_vruntime), which never decreases,
+    so a new job can't monopolize the CPU to catch up with jobs which have run for a long time.
+    With ready_only, blocked jobs leave the tree, and come back with at least min_vruntime when their I/O completes.
+
+    The jobs are kept in an AVLTree keyed by (virtual runtime, job id), so picking the leftmost job,
+    and re-keying a job as it is charged, cost O(log n). A running job with more virtual runtime
+    than another job is preempted at the end of its time slice.
+
+    Args:
+        ready_only: only pick jobs which are ready to run.
+    """
+
+    keeps_sole_runnable_job = True
+
+    def __init__(self, ready_only=False):
+        super().__init__(ready_only)
+        self._reset()
+
+    def _reset(self):
+        self.tree = AVLTree()
+        self.vruntimes = {}  # job id -> virtual runtime
+        self.in_tree = set()  # ids of the jobs in the tree
+        self.min_vruntime = 0.0
+
+    def on_subscribe(self, simulation):
+        super().on_subscribe(simulation)
+        self._reset()
+
+    def _enqueue(self, job_id):
+        self.tree.insert((self.vruntimes[job_id], job_id))
+        self.in_tree.add(job_id)
+
+    def _dequeue(self, job_id):
+        self.tree.remove((self.vruntimes[job_id], job_id))
+        self.in_tree.discard(job_id)
+        self._update_min_vruntime()
+
+    def _update_min_vruntime(self):
+        leftmost = self.tree.first()
+        if leftmost is not None and leftmost[0] > self.min_vruntime:
+            self.min_vruntime = leftmost[0]
+
+    def on_job_arrival(self, simulation, job):
+        self.vruntimes[job.id] = self.min_vruntime
+        self._enqueue(job.id)
+
+    def on_job_exit(self, simulation, job):
+        if job.id in self.in_tree:
+            self._dequeue(job.id)
+        del self.vruntimes[job.id]
+
+    def on_job_blocked(self, simulation, job):
+        if self.ready_only:
+            self._dequeue(job.id)
+
+    def on_job_ready(self, simulation, job):
+        if self.ready_only:
+            self.vruntimes[job.id] = max(self.vruntimes[job.id], self.min_vruntime)
+            self._enqueue(job.id)
+
+    def on_job_computed(self, simulation, job, compute_time):
+        vruntime = self.vruntimes[job.id]
+        self.vruntimes[job.id] = vruntime + compute_time * NICE_0_WEIGHT / nice_weight(
+            job.priority
+        )
+        if job.id in self.in_tree:
+            self.tree.remove((vruntime, job.id))
+            self._enqueue(job.id)
+            self._update_min_vruntime()
+
+    def schedule(self, simulation):
+        job_ids = self.schedule_many(simulation, 1)
+        if not job_ids and self.ready_only:
+            return self.no_ready_job(simulation)
+        assert job_ids, "No more jobs to schedule!"
+        return job_ids[0]
+
+    def schedule_many(self, simulation, num_jobs):
+        self.attach(simulation)
+        job_ids = []
+        for vruntime, job_id in self.tree:
+            if len(job_ids) == num_jobs:
+                break
+            job_ids.append(job_id)
+        return job_ids
@@ -0,0 +1,86 @@
+from process_env import TurnaroundMeter
+from schedulers.basic import FIFOScheduler
+from schedulers.base import Scheduler
+
+
+class RolloutScheduler(Scheduler):
+    """
+    Picks each job by trying out the candidates in forks of the simulation (Simulation.fork).
+
+    The candidates are the job on the CPU and the first jobs in the order of the proposal policy.
+    Each candidate is scheduled in its own fork, which a rollout policy then runs for horizon time units.
+    The candidate whose forks accumulated the least weighted resident time over the horizon (see TurnaroundMeter)
+    is picked, the job on the CPU winning ties, so the decisions target the weighted mean turnaround time.
+    With a random rollout policy, the cost of a candidate is the mean over num_rollouts forks.
+
+    Forks share the simulation's task data and skip its history, so a decision costs
+    O(candidates * num_rollouts * (resident jobs + events within the horizon)). Only single-core simulations are supported.
+
+    Args:
+        max_candidates: how many jobs to try at each decision.
+        horizon: how far ahead each rollout runs, in time units.
+        num_rollouts: how many forks to run per candidate.
+        rollout_policy: makes the scheduler for each fork, given ready_only.
+        proposal_policy: makes the scheduler which orders the candidates, given ready_only.
+        ready_only: only pick jobs which are ready to run.
+    """
+
+    keeps_sole_runnable_job = True
+
+    def __init__(
+        self,
+        max_candidates=4,
+        horizon=200,
+        num_rollouts=1,
+        rollout_policy=FIFOScheduler,
+        proposal_policy=FIFOScheduler,
+        ready_only=False,
+    ):
+        super().__init__(ready_only)
+        self.max_candidates = max_candidates
+        self.horizon = horizon
+        self.num_rollouts = num_rollouts
+        self.rollout_policy = rollout_policy
+        self.proposal = proposal_policy(ready_only=ready_only)
+        self.num_forks = 0
+
+    def schedule(self, simulation):
+        if simulation.num_cores != 1:
+            raise ValueError("RolloutScheduler only supports single-core simulations")
+        self.attach(simulation)
+        self.proposal.attach(simulation)
+        pool = simulation.ready_jobs if self.ready_only else simulation.jobs
+        if not pool:
+            return self.no_ready_job(simulation)
+        candidates = []
+        current_job = simulation.current_job
+        if current_job is not None and current_job.id in pool:
+            candidates.append(current_job.id)
+        for job_id in self.proposal.schedule_many(simulation, self.max_candidates):
+            if len(candidates) == self.max_candidates:
+                break
+            if job_id not in candidates:
+                candidates.append(job_id)
+        if len(candidates) == 1:
+            return candidates[0]
+        costs = [self.evaluate(simulation, job_id) for job_id in candidates]
+        return candidates[costs.index(min(costs))]
+
+    def evaluate(self, simulation, job_id):
+        """The mean weighted resident time over the horizon of the forks which schedule the job now."""
+        until = simulation.time + self.horizon
+        total = 0.0
+        for _ in range(self.num_rollouts):
+            fork = simulation.fork()
+            self.num_forks += 1
+            meter = TurnaroundMeter()
+            fork.subscribe(meter)
+            policy = self.rollout_policy(ready_only=self.ready_only)
+            fork.subscribe(policy)
+            fork.schedule_job(job_id)
+            fork.run_until_scheduling_needed(until)
+            while fork.need_scheduling:
+                fork.schedule_job(policy.schedule(fork))
+                fork.run_until_scheduling_needed(until)
+            total += meter.value(until)
+        return total / self.num_rollouts
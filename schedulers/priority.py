@@ -1,28 +1,388 @@
+import heapq
+import itertools
 import random
+from collections import deque
+
+from schedulers.base import Scheduler
 
 # TODO: like the basic schedulers, but with additional
 # tooling for priorities.
 
 
-class WeightedRandomScheduler:
-    """Randomly selects a job to run, weighted towards the higher-priority jobs."""
+# Weight functions map a job priority to its relative chance of being picked.
+def inverse_priority(priority):
+    return 1 / (1 + priority)
+
+
+def sqrt_inverse_priority(priority):
+    # This used to be computed as (weight / total_weight) ** (1 / 2).
+    # Normalizing first scales every job's weight by the same factor,
+    # so it is the same distribution as sqrt(weight).
+    return inverse_priority(priority) ** (1 / 2)
+
+
+def exponential_priority(priority):
+    return 2.0**-priority
+
+
+def uniform_priority(priority):
+    return 1.0
+
+
+WEIGHT_FUNCTIONS = {
+    "inverse": inverse_priority,
+    "sqrt_inverse": sqrt_inverse_priority,
+    "exponential": exponential_priority,
+    "uniform": uniform_priority,
+}
+
+
+class FenwickTree:
+    """
+    A Fenwick (binary indexed) tree of non-negative weights, which supports
+    updating a weight and sampling an index in proportion to its weight in O(log n).
+
+    The tree grows as needed when weights are set past its capacity.
+    """
+
+    def __init__(self, capacity=16):
+        self.weights = [0.0] * capacity
+        self.tree = [0.0] * (capacity + 1)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def set(self, index, weight):
+        if index >= len(self.weights):
+            self._rebuild(max(index + 1, 2 * len(self.weights)))
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        tree = self.tree
+        i = index + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def total(self):
+        tree = self.tree
+        total = 0.0
+        i = len(self.weights)
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
 
-    def __init__(self):
-        pass
+    def find(self, value):
+        """Returns the first index whose cumulative weight is greater than value."""
+        tree = self.tree
+        n = len(self.weights)
+        index = 0
+        step = 1 << n.bit_length()
+        while step:
+            next_index = index + step
+            if next_index <= n and tree[next_index] <= value:
+                index = next_index
+                value -= tree[next_index]
+            step >>= 1
+        return min(index, n - 1)
+
+    def rebuild(self):
+        """Recomputes the partial sums from the weights, discarding accumulated rounding error."""
+        self._rebuild(len(self.weights))
+
+    def _rebuild(self, capacity):
+        self.weights.extend([0.0] * (capacity - len(self.weights)))
+        tree = [0.0] + self.weights
+        for i in range(1, capacity + 1):
+            parent = i + (i & -i)
+            if parent <= capacity:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+
+class WeightedRandomScheduler(Scheduler):
+    """
+    Randomly selects a job to run, weighted towards the higher-priority jobs.
+
+    The job weights live in a Fenwick tree which is only updated when jobs arrive or exit,
+    so each decision costs O(log n) instead of re-weighting every resident job.
+
+    With ready_only, blocked jobs have their weight set to 0 until their I/O completes.
+
+    Args:
+        weight_function: maps a job priority to its weight. Either a function or one of the names in WEIGHT_FUNCTIONS.
+        ready_only: only pick jobs which are ready to run.
+    """
+
+    def __init__(self, weight_function=sqrt_inverse_priority, ready_only=False):
+        super().__init__(ready_only)
+        if isinstance(weight_function, str):
+            weight_function = WEIGHT_FUNCTIONS[weight_function]
+        self.weight_function = weight_function
+        self._reset()
+
+    def _reset(self):
+        self.weights = FenwickTree()
+        self.slots = {}  # job id -> index in the tree
+        self.slot_jobs = []  # index in the tree -> job id, or None if the slot is free
+        self.free_slots = []
+        self.num_updates = 0
+
+    def on_subscribe(self, simulation):
+        super().on_subscribe(simulation)
+        self._reset()
+
+    def on_job_arrival(self, simulation, job):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.slot_jobs[slot] = job.id
+        else:
+            slot = len(self.slot_jobs)
+            self.slot_jobs.append(job.id)
+        self.slots[job.id] = slot
+        self._set_weight(slot, self.weight_function(job.priority))
+
+    def on_job_exit(self, simulation, job):
+        slot = self.slots.pop(job.id)
+        self.slot_jobs[slot] = None
+        self.free_slots.append(slot)
+        self._set_weight(slot, 0.0)
+
+    def on_job_blocked(self, simulation, job):
+        if self.ready_only:
+            self._set_weight(self.slots[job.id], 0.0)
+
+    def on_job_ready(self, simulation, job):
+        if self.ready_only:
+            self._set_weight(self.slots[job.id], self.weight_function(job.priority))
+
+    def _set_weight(self, slot, weight):
+        self.weights.set(slot, weight)
+        self.num_updates += 1
+        # Rounding errors build up in the partial sums as weights are added and removed.
+        # Rebuilding once per len(tree) updates keeps them bounded at O(1) amortized cost.
+        if self.num_updates >= len(self.weights):
+            self.weights.rebuild()
+            self.num_updates = 0
 
     def schedule(self, simulation):
-        job_weights = {
-            job.id: 1 / (1 + job.priority) for job in simulation.jobs.values()
-        }
-        # TODO: why isn't this working as expected?
-        total_weight = sum(job_weights.values())
-        job_weights = [
-            (job_id, (weight / total_weight) ** (1 / 2))
-            for job_id, weight in job_weights.items()
-        ]
-        job_id = random.choices(
-            [key for key, _ in job_weights],
-            [weight for _, weight in job_weights],
-        )[0]
+        self.attach(simulation)
+        if self.ready_only and not simulation.ready_jobs:
+            return self.no_ready_job(simulation)
+        assert self.slots, "No more jobs to schedule!"
+        return self._sample(simulation)
 
+    def schedule_many(self, simulation, num_jobs):
+        """Samples jobs without replacement, by zeroing the weight of each sampled job until all are drawn."""
+        self.attach(simulation)
+        pool = simulation.ready_jobs if self.ready_only else simulation.jobs
+        job_ids = []
+        for _ in range(min(num_jobs, len(pool))):
+            job_id = self._sample(simulation)
+            if job_id in job_ids:
+                # Rounding error left some weight on a job which was already drawn
+                self.weights.rebuild()
+                job_id = self._sample(simulation)
+            job_ids.append(job_id)
+            self.weights.set(self.slots[job_id], 0.0)
+        for job_id in job_ids:
+            priority = simulation.jobs[job_id].priority
+            self.weights.set(self.slots[job_id], self.weight_function(priority))
+        return job_ids
+
+    def _sample(self, simulation):
+        slot = self.weights.find(random.random() * self.weights.total())
+        job_id = self.slot_jobs[slot]
+        if job_id is None or (self.ready_only and job_id not in simulation.ready_jobs):
+            # Rounding error landed the draw on a free or blocked slot
+            self.weights.rebuild()
+            slot = self.weights.find(random.random() * self.weights.total())
+            job_id = self.slot_jobs[slot]
         return job_id
+
+
+class PriorityScheduler(Scheduler):
+    """
+    Runs the most important job (the lowest priority value), breaking ties in favour of the oldest job.
+    A more important job preempts the running job at the next decision.
+
+    The jobs are kept in a heap of (priority, job id). Like FIFOScheduler, entries of jobs which exited
+    (or, with ready_only, blocked) are skipped lazily, and ready_only jobs are pushed again when their I/O completes.
+    """
+
+    keeps_sole_runnable_job = True
+
+    def __init__(self, ready_only=False):
+        super().__init__(ready_only)
+        self.heap = []
+
+    def on_subscribe(self, simulation):
+        super().on_subscribe(simulation)
+        self.heap.clear()
+
+    def on_job_arrival(self, simulation, job):
+        heapq.heappush(self.heap, (job.priority, job.id))
+
+    def on_job_ready(self, simulation, job):
+        if self.ready_only:
+            heapq.heappush(self.heap, (job.priority, job.id))
+
+    def schedule(self, simulation):
+        job_ids = self.schedule_many(simulation, 1)
+        if not job_ids and self.ready_only:
+            return self.no_ready_job(simulation)
+        assert job_ids, "No more jobs to schedule!"
+        return job_ids[0]
+
+    def schedule_many(self, simulation, num_jobs):
+        self.attach(simulation)
+        pool = simulation.ready_jobs if self.ready_only else simulation.jobs
+        heap = self.heap
+        entries = []
+        while heap and len(entries) < num_jobs:
+            entry = heapq.heappop(heap)
+            if entry[1] in pool and entry not in entries:
+                entries.append(entry)
+        for entry in entries:
+            heapq.heappush(heap, entry)
+        return [job_id for priority, job_id in entries]
+
+
+class MLFQScheduler(Scheduler):
+    """
+    Multi-level feedback queue: jobs start in the top level, and move down a level each time they use up
+    the quantum of compute time of their level, so long-running jobs sink while short and I/O-bound jobs stay on top.
+    A job returning from I/O moves up a level. The highest non-empty level runs first, round robin within a level:
+    a job which uses up its quantum at the bottom level goes to the back of it.
+    Every boost_every time units, every job goes back to the top level, so that jobs at the bottom don't starve.
+
+    Compute time is counted from the simulation's on_job_computed notifications, so jobs are demoted
+    as soon as it is charged, but can only be preempted at a scheduling decision: quanta are effectively rounded up
+    to a multiple of the simulation's time slice.
+
+    Each level is a deque of (job id, ticket) entries, with stale entries skipped lazily as in RoundRobinScheduler.
+    A bitmap of the non-empty levels finds the highest one with a bit trick, so each decision is O(1) amortized.
+
+    Args:
+        num_levels: how many levels there are.
+        quanta: the compute time a job may use at each level before it is demoted, top level first.
+            By default the quantum doubles at each level, starting at 10.
+        boost_every: the period of the priority boost, in time units. None disables boosting.
+        ready_only: only pick jobs which are ready to run.
+    """
+
+    def __init__(self, num_levels=3, quanta=None, boost_every=1000, ready_only=False):
+        super().__init__(ready_only)
+        if quanta is None:
+            quanta = [10 * 2**level for level in range(num_levels)]
+        if len(quanta) != num_levels:
+            raise ValueError(f"Expected {num_levels} quanta, got {len(quanta)}")
+        self.num_levels = num_levels
+        self.quanta = list(quanta)
+        self.boost_every = boost_every
+        self.tickets = itertools.count()
+        self._reset()
+
+    def _reset(self):
+        self.queues = [deque() for _ in range(self.num_levels)]
+        self.sizes = [0] * self.num_levels  # live entries in each level
+        self.non_empty = 0  # bit i is set if level i has live entries
+        self.levels = {}  # job id -> level
+        self.used = {}  # job id -> compute time used at its level
+        self.queued = {}  # job id -> ticket of its live entry
+        self.next_boost = self.boost_every
+
+    def on_subscribe(self, simulation):
+        super().on_subscribe(simulation)
+        self._reset()
+
+    def _enqueue(self, job_id, level):
+        self.levels[job_id] = level
+        self.used[job_id] = 0
+        ticket = next(self.tickets)
+        self.queues[level].append((job_id, ticket))
+        self.queued[job_id] = ticket
+        self.sizes[level] += 1
+        self.non_empty |= 1 << level
+
+    def _dequeue(self, job_id):
+        if self.queued.pop(job_id, None) is not None:
+            level = self.levels[job_id]
+            self.sizes[level] -= 1
+            if not self.sizes[level]:
+                self.non_empty &= ~(1 << level)
+
+    def on_job_arrival(self, simulation, job):
+        self._enqueue(job.id, 0)
+
+    def on_job_exit(self, simulation, job):
+        self._dequeue(job.id)
+        del self.levels[job.id]
+        del self.used[job.id]
+
+    def on_job_blocked(self, simulation, job):
+        if self.ready_only:
+            self._dequeue(job.id)
+
+    def on_job_ready(self, simulation, job):
+        self._dequeue(job.id)
+        self._enqueue(job.id, max(0, self.levels[job.id] - 1))
+
+    def on_job_computed(self, simulation, job, compute_time):
+        used = self.used[job.id] + compute_time
+        level = self.levels[job.id]
+        if used < self.quanta[level]:
+            self.used[job.id] = used
+        else:
+            self._dequeue(job.id)
+            self._enqueue(job.id, min(level + 1, self.num_levels - 1))
+
+    def _boost(self, simulation):
+        """Moves every queued job to the top level, keeping them in order of level, then queue order."""
+        job_ids = [
+            job_id
+            for queue in self.queues
+            for job_id, ticket in queue
+            if self.queued.get(job_id) == ticket
+        ]
+        self.queues = [deque() for _ in range(self.num_levels)]
+        self.sizes = [0] * self.num_levels
+        self.non_empty = 0
+        self.queued.clear()
+        for job_id in job_ids:
+            self._enqueue(job_id, 0)
+        # Jobs which aren't queued (blocked, with ready_only) are boosted too
+        for job_id in self.levels:
+            self.levels[job_id] = 0
+            self.used[job_id] = 0
+        while self.next_boost <= simulation.time:
+            self.next_boost += self.boost_every
+
+    def schedule(self, simulation):
+        job_ids = self.schedule_many(simulation, 1)
+        if not job_ids and self.ready_only:
+            return self.no_ready_job(simulation)
+        assert job_ids, "No more jobs to schedule!"
+        return job_ids[0]
+
+    def schedule_many(self, simulation, num_jobs):
+        self.attach(simulation)
+        if self.boost_every and simulation.time >= self.next_boost:
+            self._boost(simulation)
+        queued = self.queued
+        if num_jobs == 1 and self.non_empty:
+            # The highest non-empty level is the lowest set bit
+            queue = self.queues[(self.non_empty & -self.non_empty).bit_length() - 1]
+            while queued.get(queue[0][0]) != queue[0][1]:
+                queue.popleft()
+            return [queue[0][0]]
+        job_ids = []
+        for queue in self.queues:
+            while queue and queued.get(queue[0][0]) != queue[0][1]:
+                queue.popleft()
+            for job_id, ticket in queue:
+                if len(job_ids) == num_jobs:
+                    return job_ids
+                if queued.get(job_id) == ticket:
+                    job_ids.append(job_id)
+        return job_ids
@@ -0,0 +1,236 @@
+from schedulers.base import Scheduler
+
+# Schedulers which know how much work each job has left, from its task list.
+# They are oracles: real schedulers don't know task durations in advance,
+# but shortest remaining processing time is the policy to beat on mean turnaround time.
+
+
+class IndexedHeap:
+    """
+    A binary min-heap of items with keys, which also knows where each item is,
+    so an item's key can be changed, or the item removed, in O(log n).
+
+    Items must be hashable and unique. Keys must be comparable; ties are broken by the items.
+    """
+
+    def __init__(self):
+        self.heap = []  # [key, item] entries
+        self.positions = {}  # item -> index of its entry in the heap
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def push(self, item, key):
+        assert item not in self.positions, f"{item} is already in the heap"
+        self.heap.append([key, item])
+        self.positions[item] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+
+    def update(self, item, key):
+        """Changes the key of an item in the heap."""
+        index = self.positions[item]
+        entry = self.heap[index]
+        old_key = entry[0]
+        entry[0] = key
+        if key < old_key:
+            self._sift_up(index)
+        elif old_key < key:
+            self._sift_down(index)
+
+    def remove(self, item):
+        index = self.positions.pop(item)
+        last = self.heap.pop()
+        if index < len(self.heap):
+            self.heap[index] = last
+            self.positions[last[1]] = index
+            self._sift_up(index)
+            self._sift_down(self.positions[last[1]])
+
+    def discard(self, item):
+        if item in self.positions:
+            self.remove(item)
+
+    def peek(self):
+        """Returns the item with the smallest key, or None if the heap is empty."""
+        return self.heap[0][1] if self.heap else None
+
+    def pop(self):
+        item = self.heap[0][1]
+        self.remove(item)
+        return item
+
+    def key(self, item):
+        return self.heap[self.positions[item]][0]
+
+    def _sift_up(self, index):
+        heap = self.heap
+        positions = self.positions
+        entry = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if not entry < heap[parent]:
+                break
+            heap[index] = heap[parent]
+            positions[heap[index][1]] = index
+            index = parent
+        heap[index] = entry
+        positions[entry[1]] = index
+
+    def _sift_down(self, index):
+        heap = self.heap
+        positions = self.positions
+        size = len(heap)
+        entry = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if not heap[child] < entry:
+                break
+            heap[index] = heap[child]
+            positions[heap[index][1]] = index
+            index = child
+        heap[index] = entry
+        positions[entry[1]] = index
+
+
+class SRPTScheduler(Scheduler):
+    """
+    Shortest remaining processing time: runs the job with the least work left,
+    counting the time left on its current task and the durations of its later tasks, I/O included.
+    A job with less work left preempts the running job at the next decision.
+
+    Each job's work left is kept up to date as the simulation runs: the durations of a job's later tasks
+    are summed when it arrives, and the next task's duration is subtracted each time it advances.
+    The jobs are kept in an IndexedHeap keyed by their work left. Before a decision only the jobs on the cores,
+    which may have made progress on a compute task, have their keys decreased, so a decision costs O(log n) per core.
+
+    Args:
+        weighted: divide each job's work by its weight 1 / (1 + priority), as in metrics.job_weights,
+            which targets the weighted mean turnaround time instead.
+        ready_only: only pick jobs which are ready to run.
+    """
+
+    keeps_sole_runnable_job = True
+
+    def __init__(self, weighted=False, ready_only=False):
+        super().__init__(ready_only)
+        self.weighted = weighted
+        self._reset()
+
+    def _reset(self):
+        self.heap = IndexedHeap()
+        # job id -> total duration of the tasks after its current one
+        self.later_work = {}
+
+    def on_subscribe(self, simulation):
+        super().on_subscribe(simulation)
+        self._reset()
+
+    def _work(self, job):
+        return job.time_remaining + self.later_work[job.id]
+
+    def _key(self, job):
+        work = self._work(job)
+        return (work * (1 + job.priority) if self.weighted else work), job.id
+
+    def on_job_arrival(self, simulation, job):
+        self.later_work[job.id] = sum(job.task_times[job.cursor + 1 : job.end])
+        self.heap.push(job.id, self._key(job))
+
+    def on_job_exit(self, simulation, job):
+        del self.later_work[job.id]
+        self.heap.discard(job.id)
+
+    def on_job_advance(self, simulation, job):
+        if job.has_tasks():
+            self.later_work[job.id] -= job.time_remaining
+        if job.id in self.heap:
+            self.heap.update(job.id, self._key(job))
+
+    def on_job_blocked(self, simulation, job):
+        if self.ready_only:
+            self.heap.discard(job.id)
+
+    def on_job_ready(self, simulation, job):
+        if self.ready_only:
+            self.heap.push(job.id, self._key(job))
+
+    def _update_running_jobs(self, simulation):
+        for core in simulation.cores:
+            job = core.job
+            if job is not None and job.id in self.heap:
+                self.heap.update(job.id, self._key(job))
+
+    def schedule(self, simulation):
+        job_ids = self.schedule_many(simulation, 1)
+        if not job_ids and self.ready_only:
+            return self.no_ready_job(simulation)
+        assert job_ids, "No more jobs to schedule!"
+        return job_ids[0]
+
+    def schedule_many(self, simulation, num_jobs):
+        self.attach(simulation)
+        self._update_running_jobs(simulation)
+        return self._smallest(num_jobs)
+
+    def _smallest(self, num_jobs):
+        """Returns the num_jobs jobs with the smallest keys, in order, leaving them in the heap."""
+        heap = self.heap
+        popped = []
+        while heap and len(popped) < num_jobs:
+            job_id = heap.peek()
+            popped.append((job_id, heap.key(job_id)))
+            heap.remove(job_id)
+        for job_id, key in popped:
+            heap.push(job_id, key)
+        return [job_id for job_id, key in popped]
+
+
+class SJFScheduler(SRPTScheduler):
+    """
+    Shortest job first: runs the job with the least total work, counting all of its tasks, I/O included.
+    A running job keeps its core until it exits or blocks: shorter jobs don't preempt it.
+
+    Jobs are kept in an IndexedHeap keyed by their total work, which never changes, so a decision costs O(log n).
+
+    Args:
+        weighted: divide each job's total work by its weight 1 / (1 + priority), as in metrics.job_weights.
+        ready_only: only pick jobs which are ready to run.
+    """
+
+    def _reset(self):
+        self.heap = IndexedHeap()
+        self.total_work = {}  # job id -> total duration of its tasks
+
+    def _work(self, job):
+        return self.total_work[job.id]
+
+    def on_job_arrival(self, simulation, job):
+        self.total_work[job.id] = job.total_task_time()
+        self.heap.push(job.id, self._key(job))
+
+    def on_job_exit(self, simulation, job):
+        del self.total_work[job.id]
+        self.heap.discard(job.id)
+
+    def on_job_advance(self, simulation, job):
+        pass
+
+    def schedule_many(self, simulation, num_jobs):
+        self.attach(simulation)
+        # Jobs which can keep running stay on their cores
+        running = [
+            core.job.id
+            for core in simulation.cores
+            if core.job is not None and not core.job.blocked
+        ][:num_jobs]
+        job_ids = self._smallest(num_jobs + len(running))
+        return (running + [job_id for job_id in job_ids if job_id not in running])[
+            :num_jobs
+        ]
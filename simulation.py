@@ -1,12 +1,16 @@
+import copy
+
 from event_queue import EventQueue, Event
-from job import Job, Task, COMPUTE, MEMORY, DISK, NETWORK
+from history import HistoryRecorder, FULL, NONE
+from devices import IODevice, CPUCore, IDLE, SWITCHING, COMPUTING, STALLED
+from job import Job, Task, COMPUTE, MEMORY, DISK, NETWORK, TASK_TYPES, COMPUTE_CODE
 
 # This simulation code is becoming a bit of a mess. Think about it more systematically.
 # What comprises the state of our system?
 
 # - remaining tasks for each job
-# - which job is currently on the CPU
-# - whether the CPU is still context switching to the new job
+# - which job is currently on each CPU core
+# - whether each core is still context switching to its new job
 # - Whether a job is blocked
 
 START_JOB = "START_JOB"
@@ -15,178 +19,568 @@ COMPUTING_DONE = "COMPUTING_DONE"
 MEMORY_DONE = "MEMORY_DONE"
 DISK_DONE = "DISK_DONE"
 NETWORK_DONE = "NETWORK_DONE"
+QUANTUM_EXPIRED = "QUANTUM_EXPIRED"
+# The history records an event's type as its index in this tuple.
+EVENT_TYPES = (
+    START_JOB,
+    SWITCHING_DONE,
+    COMPUTING_DONE,
+    MEMORY_DONE,
+    DISK_DONE,
+    NETWORK_DONE,
+    QUANTUM_EXPIRED,
+)
 
 WAITING_DONE_TYPES = {MEMORY_DONE, DISK_DONE, NETWORK_DONE}
+IO_DONE_TYPES = {MEMORY: MEMORY_DONE, DISK: DISK_DONE, NETWORK: NETWORK_DONE}
+IO_DEVICE_TYPES = {MEMORY_DONE: MEMORY, DISK_DONE: DISK, NETWORK_DONE: NETWORK}
 import pdb
 
 
+class SimulationListener:
+    """
+    Receives notifications from a Simulation it is subscribed to.
+    Subclasses override the hooks they need; the default hooks do nothing.
+    """
+
+    def on_subscribe(self, simulation):
+        """Called when the listener subscribes to the simulation, before the resident jobs are replayed as arrivals."""
+        pass
+
+    def on_job_arrival(self, simulation, job):
+        """Called when a job arrives, before the scheduler is asked to schedule it."""
+        pass
+
+    def on_job_exit(self, simulation, job):
+        """Called when a job has finished its last task and left the simulation."""
+        pass
+
+    def on_job_blocked(self, simulation, job):
+        """Called when a job starts waiting on an I/O task."""
+        pass
+
+    def on_job_ready(self, simulation, job):
+        """Called when a blocked job's I/O task completes."""
+        pass
+
+    def on_job_advance(self, simulation, job):
+        """Called when a job finishes a task and moves on to its next one, before it starts that task."""
+        pass
+
+    def on_job_computed(self, simulation, job, compute_time):
+        """Called when compute_time of CPU time is deducted from the job's current task, as it runs on a core."""
+        pass
+
+
 class Simulation:
-    def __init__(self, job_timeline, schedule_every=10, context_switch_time=2):
+    def __init__(
+        self,
+        job_timeline,
+        schedule_every=10,
+        context_switch_time=2,
+        num_cores=1,
+        record=FULL,
+        history_path=None,
+        profile=None,
+    ):
         """
         args:
-        job_timeline: list (start_time, job): jobs do not need IDs set; the simulation will assign job ids.
+        job_timeline: list (start_time, job), sorted by start time, or a traces.Trace.
+            Jobs in a list do not need IDs set; the simulation will assign job ids.
+        schedule_every: the time slice. A job which computes for this long without blocking
+            triggers a scheduling decision, so that the scheduler can preempt it. None disables time slicing.
+        context_switch_time: how long it takes a core to switch to a new job.
+        num_cores: how many CPU cores run jobs in parallel.
+        record: how much of the history to keep: one of history.RECORD_LEVELS.
+        history_path (optional): directory to stream the full history to, instead of keeping it in memory.
+        profile (optional): a profiling.SimulationProfile to fill in with counters and timers.
         """
         self.job_timeline = job_timeline
         self.schedule_every = schedule_every
         self.context_switch_time = context_switch_time
         self.need_scheduling = False
         self.events = EventQueue()
-        self.history = []
+        self.history = HistoryRecorder(
+            EVENT_TYPES,
+            len(job_timeline),
+            level=record,
+            path=history_path,
+            dispatch_type=SWITCHING_DONE,
+        )
         self.jobs = {}
-        self.current_job = None
+        # Every resident job is either ready to run or blocked on I/O
+        self.ready_jobs = {}
+        self.blocked_jobs = {}
         self.time = 0
+        self.devices = {task_type: IODevice(task_type) for task_type in IO_DONE_TYPES}
+        self.listeners = []
+        self.token_buffer = None
+        self.num_cores = num_cores
+        self.cores = [CPUCore(index) for index in range(num_cores)]
+        self.job_cores = {}  # job id -> the core it is on
+        self.computing_cores = {}  # index -> core, for the cores in the COMPUTING state
+        self.timed_cores = (
+            set()
+        )  # indices of the cores with a QUANTUM_EXPIRED event pending
 
-        for job_id, job_start in enumerate(job_timeline):
-            start_time, job = job_start
-            job.id = job_id
-            self.events.push(Event(START_JOB, job_id), start_time)
+        if isinstance(job_timeline, (list, tuple)):
+            for job_id, (start_time, job) in enumerate(job_timeline):
+                job.id = job_id
+        # Jobs are admitted lazily: only the next arrival is queued, so a long timeline
+        # (such as a traces.Trace) is consumed as the simulation reaches each job.
+        self.num_jobs = len(job_timeline)
+        self._arrivals = iter(job_timeline)
+        self._next_arrival = None
+        self._num_arrivals = 0
+        self._queue_next_arrival()
+
+        self.context_switches = 0
+
+        self.profile = profile
+        if profile is not None:
+            profile.instrument(self)
 
-        self.context_switching = False
+    @property
+    def current_job(self):
+        """The job on the first core."""
+        return self.cores[0].job
 
-    def run_until_scheduling_needed(self):
+    @property
+    def context_switching(self):
+        """Whether the first core is still context switching to its job."""
+        return self.cores[0].state == SWITCHING
+
+    def subscribe(self, listener):
+        """
+        Subscribes a SimulationListener to job arrivals, exits, and jobs blocking and unblocking.
+        Jobs which already arrived are reported to it as arrivals straight away,
+        followed by a blocked notification if they are blocked.
+        """
+        self.listeners.append(listener)
+        listener.on_subscribe(self)
+        for job in self.jobs.values():
+            listener.on_job_arrival(self, job)
+            if job.blocked:
+                listener.on_job_blocked(self, job)
+
+    def run(self, scheduler, fast_forward=True):
+        """
+        Runs the simulation to the end, asking the scheduler for a job to run whenever one is needed.
+        With more than one core, the scheduler is asked for a placement of jobs on every core.
+
+        With fast_forward, stretches where the job on the CPU is the only job the scheduler could pick
+        are run without asking the scheduler, if it declares that it would keep that job (see _fast_forward).
+        """
+        if scheduler not in self.listeners:
+            self.subscribe(scheduler)
+        if self.num_cores == 1:
+            decide, apply = scheduler.schedule, self.schedule_job
+        else:
+            decide, apply = scheduler.place, self.schedule_jobs
+        if self.profile is not None:
+            decide = self.profile.wrap("schedule", decide, "scheduling_decisions")
+        # A simulation which was stepped by hand, or forked, may already be waiting for a decision
+        if not self.need_scheduling:
+            self.run_until_scheduling_needed()
+        while not self.is_finished():
+            if fast_forward and self._can_fast_forward(scheduler):
+                self._fast_forward()
+            if self.need_scheduling:
+                apply(decide(self))
+            self.run_until_scheduling_needed()
+        self.history.close()
+        if self.profile is not None:
+            self.profile.finish(self)
+        return self
+
+    def run_until_scheduling_needed(self, until=None):
+        """
+        Processes events until the scheduler needs to make a decision, or the simulation is finished.
+        With until, also stops before processing any event later than that time.
+        """
         assert not self.need_scheduling
         # pdb.set_trace()
         while not (self.is_finished() or self.need_scheduling):
+            if until is not None and self.events.get_next_event_time() > until:
+                break
             self._process_next_events()
+        # Bring the running jobs' remaining compute time up to date for the scheduler
+        for core in list(self.computing_cores.values()):
+            self._charge_compute(core)
 
-    def schedule_job(self, job_id):
+    def _can_fast_forward(self, scheduler):
+        """Whether the scheduler is known to keep the job on the CPU, since it is the only job it could pick."""
+        if self.num_cores != 1 or not scheduler.keeps_sole_runnable_job:
+            return False
+        job = self.cores[0].job
+        if job is None:
+            return False
+        if scheduler.ready_only:
+            # every other job is blocked
+            return len(self.ready_jobs) == (0 if job.blocked else 1)
+        return len(self.jobs) == 1
+
+    def _fast_forward(self):
+        """
+        Runs the job on the CPU up to the next event of any other job (an arrival, or another job's I/O completing),
+        applying the scheduler's decisions to keep the job without asking the scheduler.
+
+        The job's pending events are taken out of the event queue into a SmallEventQueue, so running the job
+        through a chain of tasks costs no heap operations or scheduler calls. Events are processed
+        and recorded exactly as in run_until_scheduling_needed, and any which are still pending
+        when another job's event comes up are merged back into the event queue in their original order.
+        """
+        core = self.cores[0]
+        job = core.job
+        events = self.events
+        job_events = events.take_job_events(job.id)
+        # The other jobs' events at this time or later are left to the step-by-step engine
+        horizon = events.get_next_event_time()
+        record = self.history.record
+        self.events = job_events
+        try:
+            while True:
+                if self.need_scheduling:
+                    if core.job is not job:
+                        # the job exited: the next decision is the scheduler's
+                        break
+                    self._charge_compute(core)
+                    self.schedule_job(job.id)
+                time = job_events.get_next_event_time()
+                if time is None or (horizon is not None and time >= horizon):
+                    break
+                self.time = time
+                while job_events.get_next_event_time() == time:
+                    event = job_events.pop_next_event()
+                    self._process_event(event)
+                    record(time, event)
+        finally:
+            self.events = events
+            events.merge(job_events)
+
+    def fork(self):
         """
-        Schedules the given job,
+        Returns an independent copy of the simulation in its current state, to try out decisions on.
+
+        Only the mutable state is copied: the pending events, the resident jobs' progress, the cores and the devices.
+        Jobs share their task arrays with the originals, and jobs which haven't arrived yet are created
+        from the job timeline as the fork reaches them, so a fork costs O(resident jobs + pending events).
+        The fork records no history, and has no listeners or profile.
+        The job timeline must support indexing, like a list or a traces.Trace.
+        """
+        fork = Simulation.__new__(Simulation)
+        fork.job_timeline = self.job_timeline
+        fork.schedule_every = self.schedule_every
+        fork.context_switch_time = self.context_switch_time
+        fork.need_scheduling = self.need_scheduling
+        fork.events = self.events.copy()
+        fork.history = HistoryRecorder(EVENT_TYPES, self.num_jobs, level=NONE)
+        fork.jobs = {job_id: job.copy() for job_id, job in self.jobs.items()}
+        fork.ready_jobs = {job_id: fork.jobs[job_id] for job_id in self.ready_jobs}
+        fork.blocked_jobs = {job_id: fork.jobs[job_id] for job_id in self.blocked_jobs}
+        fork.time = self.time
+        fork.devices = {
+            task_type: copy.copy(device) for task_type, device in self.devices.items()
+        }
+        fork.listeners = []
+        fork.token_buffer = None
+        fork.num_cores = self.num_cores
+        fork.cores = []
+        for core in self.cores:
+            forked_core = copy.copy(core)
+            forked_core.time_in_state = dict(core.time_in_state)
+            if core.job is not None:
+                forked_core.job = fork.jobs[core.job.id]
+            fork.cores.append(forked_core)
+        fork.job_cores = {
+            job_id: fork.cores[core.index] for job_id, core in self.job_cores.items()
+        }
+        fork.computing_cores = {
+            index: fork.cores[index] for index in self.computing_cores
+        }
+        fork.timed_cores = set(self.timed_cores)
+
+        fork.num_jobs = self.num_jobs
+        fork._num_arrivals = self._num_arrivals
+        fork._next_arrival = None
+        if self._next_arrival is not None:
+            start_time, job = self._next_arrival
+            fork._next_arrival = (start_time, self._new_job(job))
+        fork._arrivals = (
+            (start_time, self._new_job(job))
+            for start_time, job in map(
+                self.job_timeline.__getitem__, range(self._num_arrivals, self.num_jobs)
+            )
+        )
+        fork.context_switches = self.context_switches
+        fork.profile = None
+        return fork
+
+    @staticmethod
+    def _new_job(job):
+        """A copy of the job as it was before it arrived, which the original simulation may since have run."""
+        return Job.from_arrays(
+            job.id, job.priority, job.task_types, job.task_times, job.start, job.end
+        )
+
+    def _queue_next_arrival(self):
+        """Queues the START_JOB event of the next job in the timeline, if there is one."""
+        arrival = next(self._arrivals, None)
+        self._next_arrival = arrival
+        if arrival is None:
+            return
+        start_time = arrival[0]
+        if start_time < self.time:
+            raise ValueError("The job timeline must be sorted by start time")
+        job_id = self._num_arrivals
+        self._num_arrivals += 1
+        # Arrivals come before other events at the same time, in job order,
+        # as if every arrival had been queued when the simulation was created.
+        self.events.push(
+            Event(START_JOB, job_id), start_time, seq=job_id - self.num_jobs
+        )
+
+    def schedule_job(self, job_id, core=0):
+        """
+        Schedules the given job on the given core,
         then updates the simulation
         to the next time step where the scheduler
         needs to make another decision.
+        A job_id of None leaves the core idle.
+        If the job is running on another core, it migrates and leaves that core idle.
         """
-        # if this is the id of the job that's already on the CPU, nothing changes
+        # if this is the id of the job that's already on the core, nothing changes
         assert self.need_scheduling
-        current_job_id = None if self.current_job is None else self.current_job.id
+        core = self.cores[core]
+        current_job_id = None if core.job is None else core.job.id
 
         if current_job_id != job_id:
             # We're de-scheduling the current job. Remove any events which assume
             # it is scheduled on the CPU.
             if current_job_id is not None:
-                self.events.remove_event(
-                    event_type=SWITCHING_DONE, job_id=current_job_id
-                )
-                self.events.remove_event(
-                    event_type=COMPUTING_DONE, job_id=current_job_id
-                )
-
-            # schedule the new job
-            self.current_job = self.jobs[job_id]
-            self.context_switching = True
-
-            # add event for switching_done
-            switching_done_time = self.time + self.context_switch_time
-            event = Event(SWITCHING_DONE, job_id)
-            self.events.push(event, switching_done_time)
+                self._deschedule(core)
+            if job_id is not None:
+                other_core = self.job_cores.get(job_id)
+                if other_core is not None:
+                    self._deschedule(other_core)
+                self._dispatch(core, job_id)
+        elif core.state == COMPUTING:
+            # The job keeps the core: start its next time slice
+            self._start_quantum(core)
 
         self.need_scheduling = False
 
+    def schedule_jobs(self, placement):
+        """
+        Schedules a job on every core at once.
+
+        args:
+        placement: sequence with one job id (or None, to leave the core idle) per core.
+            A job may only be placed on one core.
+        """
+        assert self.need_scheduling
+        assert len(placement) == self.num_cores, "need one placement per core"
+        placed = [job_id for job_id in placement if job_id is not None]
+        assert len(placed) == len(set(placed)), "a job can only run on one core"
+
+        # Take jobs off their cores first, so that they can move to other cores
+        for core, job_id in zip(self.cores, placement):
+            if core.job is not None and core.job.id != job_id:
+                self._deschedule(core)
+        for core, job_id in zip(self.cores, placement):
+            if job_id is not None and core.job is None:
+                self._dispatch(core, job_id)
+        # Jobs which keep their core start their next time slice
+        for core in self.computing_cores.values():
+            self._start_quantum(core)
+
+        self.need_scheduling = False
+
+    def _dispatch(self, core, job_id):
+        # schedule the new job
+        job = self.jobs[job_id]
+        core.job = job
+        core.set_state(self.time, SWITCHING)
+        core.context_switches += 1
+        self.job_cores[job_id] = core
+        self.context_switches += 1
+
+        # add event for switching_done
+        switching_done_time = self.time + self.context_switch_time
+        event = Event(SWITCHING_DONE, job_id)
+        self.events.push(event, switching_done_time)
+
+    def _deschedule(self, core):
+        job = core.job
+        self._charge_compute(core)
+        self.events.remove_event(event_type=SWITCHING_DONE, job_id=job.id)
+        self.events.remove_event(event_type=COMPUTING_DONE, job_id=job.id)
+        self._release(core)
+
+    def _release(self, core):
+        self._cancel_quantum(core)
+        del self.job_cores[core.job.id]
+        core.job = None
+        core.set_state(self.time, IDLE)
+        self.computing_cores.pop(core.index, None)
+
+    def _start_quantum(self, core):
+        """Starts a time slice for the job computing on the core, unless one is already running."""
+        if self.schedule_every and core.index not in self.timed_cores:
+            self.timed_cores.add(core.index)
+            event = Event(QUANTUM_EXPIRED, core.job.id)
+            self.events.push(event, self.time + self.schedule_every)
+
+    def _cancel_quantum(self, core):
+        if core.index in self.timed_cores:
+            self.timed_cores.discard(core.index)
+            self.events.remove_event(event_type=QUANTUM_EXPIRED, job_id=core.job.id)
+
+    def _charge_compute(self, core):
+        """If the core is computing, deduct the time since it was last charged from its job's current task."""
+        if core.state == COMPUTING:
+            compute_time = self.time - core.since
+            if compute_time:
+                job = core.job
+                job.time_remaining -= compute_time
+                for listener in self.listeners:
+                    listener.on_job_computed(self, job, compute_time)
+            core.set_state(self.time, COMPUTING)
+
     def _process_next_events(self):
 
         assert self.need_scheduling == False
         next_event_time = self.events.get_next_event_time()
         if next_event_time is None:
             assert not self.jobs
-        time_elapsed = next_event_time - self.time
         self.time = next_event_time
 
-        # If the current job is running, reduce its remaining compute time.
-        if self.current_job is not None and self.current_job.remaining_tasks:
-            current_task = self.current_job.remaining_tasks[0]
-            task_type, time_remaining = current_task
-            is_computing = (
-                not self.context_switching
-                and not self.current_job.blocked
-                and task_type == COMPUTE
-            )
-            if is_computing:
-                new_time_remaining = time_remaining - time_elapsed
-                self.current_job.remaining_tasks[0] = Task(COMPUTE, new_time_remaining)
-
         # Process all the events which occur at this time.
+        record = self.history.record
         while self.events.get_next_event_time() == self.time:
             event = self.events.pop_next_event()
             self._process_event(event)
-            self.history.append((self.time, event))
+            record(self.time, event)
 
     def _process_event(self, event):
         event_type, job_id = event
-        is_current_job = self.current_job is not None and job_id == self.current_job.id
+        core = self.job_cores.get(job_id)
+        if event_type == QUANTUM_EXPIRED:
+            # The job used up its time slice. It keeps computing unless the scheduler preempts it.
+            self.timed_cores.discard(core.index)
+            self.need_scheduling = True
+            return
         if event_type == START_JOB:
-            start_time, job = self.job_timeline[job_id]
+            start_time, job = self._next_arrival
             assert self.time == start_time
+            job.id = job_id
+            self._queue_next_arrival()
             self.jobs[job_id] = job
+            self.ready_jobs[job_id] = job
             self.need_scheduling = True
+            for listener in self.listeners:
+                listener.on_job_arrival(self, job)
         elif event_type == SWITCHING_DONE:
-            assert is_current_job
-            self.context_switching = False
+            assert core is not None
+            core.set_state(self.time, STALLED)
         elif event_type in WAITING_DONE_TYPES:
-            self.jobs[job_id].blocked = False
+            self.devices[IO_DEVICE_TYPES[event_type]].complete(self.time)
+            job = self.jobs[job_id]
+            job.advance()
+            for listener in self.listeners:
+                listener.on_job_advance(self, job)
+            job.blocked = False
+            del self.blocked_jobs[job_id]
+            self.ready_jobs[job_id] = job
             self.need_scheduling = bool(self.jobs)
+            for listener in self.listeners:
+                listener.on_job_ready(self, job)
         elif event_type == COMPUTING_DONE:
-            assert is_current_job
+            assert core is not None
+            self._charge_compute(core)
+            core.job.advance()
+            for listener in self.listeners:
+                listener.on_job_advance(self, core.job)
             self.need_scheduling = bool(self.jobs)
 
         # if event_type == "COMPUTING_DONE" and self.time == 7:
         # pdb.set_trace()
 
-        if (
-            is_current_job
-            and not self.context_switching
-            and not self.current_job.blocked
-        ):
-            self._start_next_task(self.current_job)
+        # A job which is on a core, done switching, and not blocked starts its next task
+        if core is not None and core.state != SWITCHING and not core.job.blocked:
+            self._start_next_task(core)
 
-    def _start_next_task(self, job):
+    def _start_next_task(self, core):
+        job = core.job
         # if there's no next task, then the job is done!
-        assert job.id == self.current_job.id
-        if not job.remaining_tasks:
+        if not job.has_tasks():
             # job is finished!
-            self.current_job = None
+            self._release(core)
             del self.jobs[job.id]
+            del self.ready_jobs[job.id]
             self.need_scheduling = bool(self.jobs)
+            for listener in self.listeners:
+                listener.on_job_exit(self, job)
             return
 
-        task_type, time_remaining = job.remaining_tasks.pop(0)
-
-        if task_type == COMPUTE:
+        # The current task resumes where it left off if the job was preempted while running it.
+        task_code = job.current_task_type()
+        if task_code == COMPUTE_CODE:
             event = Event(type=COMPUTING_DONE, job_id=job.id)
-            time = self.time + time_remaining
+            time = self.time + job.time_remaining
+            self.events.push(event, time)
+            core.set_state(self.time, COMPUTING)
+            self.computing_cores[core.index] = core
+            self._start_quantum(core)
+            return
+        task_type = TASK_TYPES[task_code]
+        device = self.devices.get(task_type)
+        if device is not None:
+            event = Event(type=IO_DONE_TYPES[task_type], job_id=job.id)
+            time = device.enqueue(self.time, job.time_remaining)
             self.events.push(event, time)
+            core.set_state(self.time, STALLED)
+            self.computing_cores.pop(core.index, None)
+            self._cancel_quantum(core)
+            job.blocked = True
+            del self.ready_jobs[job.id]
+            self.blocked_jobs[job.id] = job
+            for listener in self.listeners:
+                listener.on_job_blocked(self, job)
             return
-        for io_task_type, io_done_type in {
-            (MEMORY, MEMORY_DONE),
-            (DISK, DISK_DONE),
-            (NETWORK, NETWORK_DONE),
-        }:
-            if task_type == io_task_type:
-                last_event_time, last_event = self.events.get_event(
-                    event_type=io_done_type, get_last=True
-                )
-                if last_event_time is None:
-                    last_event_time = self.time
-                event = Event(type=io_done_type, job_id=job.id)
-                time = last_event_time + time_remaining
-                self.events.push(event, time)
-                job.blocked = True
-                return
 
         raise ValueError(f"Unrecognized task type: {task_type}")
 
     def tokenize_state(self):
         """
-        Returns a tokenized encoding of the simulation state.
+        Returns a (resident jobs, tokens.NUM_FEATURES) array with one token per resident job.
+
+        The tokens are a view of a JobTokenBuffer, which is subscribed on the first call and updated in place
+        on every event after that, so later calls allocate nothing. Row i is the token of the job with id
+        self.token_buffer.job_ids[i]. The view is only valid until the simulation processes another event.
         """
-        pass
-        # TODO:
-        # for each process
-        # come up with a unique process ID vector
-        # tokenize the process
-        # concat the process ID vector to each of the tokens
-        # add the tokens to the list of tokens
-        # Sort the tokens so that the process tokens come first
-        # return the tokens
+        if self.token_buffer is None:
+            # tokens depends on this module for SimulationListener
+            from tokens import JobTokenBuffer
+
+            self.token_buffer = JobTokenBuffer()
+            self.subscribe(self.token_buffer)
+        return self.token_buffer.tokens(self)
+
+    def device_stats(self):
+        """
+        Returns the utilization and queue-length counters of each I/O device, keyed by task type.
+        """
+        return {
+            task_type: device.stats(self.time)
+            for task_type, device in self.devices.items()
+        }
+
+    def core_stats(self):
+        """
+        Returns the fraction of time each core spent idle, switching, computing and stalled on I/O, in core order.
+        """
+        return [core.stats(self.time) for core in self.cores]
 
     def is_finished(self):
         return not (self.events or self.jobs)
@@ -0,0 +1,88 @@
+import random
+import unittest
+
+from job import Job, Task, COMPUTE
+from job_timeline import make_workload, workload_to_job_timeline
+from simulation import Simulation, SWITCHING_DONE
+from schedulers.basic import FIFOScheduler, RandomScheduler, RoundRobinScheduler
+from schedulers.priority import WeightedRandomScheduler
+
+
+def make_job_timeline():
+    return [
+        (0, Job(None, 0, [Task(COMPUTE, 10)])),
+        (1, Job(None, 0, [Task(COMPUTE, 10)])),
+        (3, Job(None, 0, [Task(COMPUTE, 1)])),
+    ]
+
+
+def dispatches(simulation):
+    return [
+        (time, event.job_id)
+        for time, event in simulation.history
+        if event.type == SWITCHING_DONE
+    ]
+
+
+class TestRoundRobinScheduler(unittest.TestCase):
+    def test_new_jobs_run_first_then_rotate(self):
+        simulation = Simulation(make_job_timeline()).run(RoundRobinScheduler())
+        # job 1 preempts job 0 before its context switch is done, and job 2 preempts job 1
+        self.assertEqual(dispatches(simulation), [(3, 1), (5, 2), (8, 0), (20, 1)])
+        self.assertEqual(simulation.time, 30)
+
+    def test_finished_jobs_are_skipped(self):
+        scheduler = RoundRobinScheduler()
+        simulation = Simulation(make_job_timeline()).run(scheduler)
+        self.assertFalse(scheduler.queued)
+
+
+class TestFIFOScheduler(unittest.TestCase):
+    def test_jobs_run_to_completion_in_arrival_order(self):
+        simulation = Simulation(make_job_timeline()).run(FIFOScheduler())
+        self.assertEqual(dispatches(simulation), [(2, 0), (14, 1), (26, 2)])
+        self.assertEqual(simulation.time, 27)
+
+    def test_scheduler_subscribes_on_first_decision(self):
+        # Driving the simulation by hand, without Simulation.run
+        simulation = Simulation(make_job_timeline())
+        scheduler = FIFOScheduler()
+        simulation.run_until_scheduling_needed()
+        while not simulation.is_finished():
+            simulation.schedule_job(scheduler.schedule(simulation))
+            simulation.run_until_scheduling_needed()
+        self.assertEqual(dispatches(simulation), [(2, 0), (14, 1), (26, 2)])
+
+
+class TestReadyOnly(unittest.TestCase):
+    def test_ready_only_schedulers_skip_blocked_jobs(self):
+        for scheduler_type in (
+            RandomScheduler,
+            RoundRobinScheduler,
+            FIFOScheduler,
+            WeightedRandomScheduler,
+        ):
+            with self.subTest(scheduler_type=scheduler_type.__name__):
+                random.seed(0)
+                job_timeline = workload_to_job_timeline(make_workload(100, 500, rng=1))
+                simulation = Simulation(job_timeline)
+                scheduler = scheduler_type(ready_only=True)
+                simulation.run_until_scheduling_needed()
+                while not simulation.is_finished():
+                    self.assertEqual(
+                        simulation.ready_jobs.keys() | simulation.blocked_jobs.keys(),
+                        simulation.jobs.keys(),
+                    )
+                    self.assertTrue(
+                        all(job.blocked for job in simulation.blocked_jobs.values())
+                    )
+                    job_id = scheduler.schedule(simulation)
+                    current_job_id = (
+                        simulation.current_job and simulation.current_job.id
+                    )
+                    if simulation.ready_jobs:
+                        self.assertIn(job_id, simulation.ready_jobs)
+                    else:
+                        self.assertEqual(job_id, current_job_id)
+                    simulation.schedule_job(job_id)
+                    simulation.run_until_scheduling_needed()
@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+
+from batch_simulation import BatchSimulation, FIFO, PRIORITY, ROUND_ROBIN
+from job_timeline import make_workload, workload_to_job_timeline
+from metrics import collect_job_times
+from schedulers.basic import FIFOScheduler, RoundRobinScheduler
+from schedulers.priority import PriorityScheduler
+from simulation import Simulation
+
+SCHEDULERS = {
+    FIFO: FIFOScheduler,
+    ROUND_ROBIN: RoundRobinScheduler,
+    PRIORITY: PriorityScheduler,
+}
+
+
+class TestBatchSimulation(unittest.TestCase):
+    def setUp(self):
+        # runs with different numbers of jobs exercise the padding
+        self.workloads = [
+            make_workload(num_jobs, 500, rng=seed)
+            for seed, num_jobs in enumerate([30, 50, 40, 50])
+        ]
+
+    def assert_same_as_simulation(self, policy, **options):
+        batch = BatchSimulation(self.workloads, policy, **options).run()
+        arrival, dispatch, completion = batch.job_times()
+        for run, workload in enumerate(self.workloads):
+            job_timeline = workload_to_job_timeline(workload)
+            simulation = Simulation(
+                job_timeline, schedule_every=options.get("schedule_every", 10)
+            )
+            scheduler = SCHEDULERS[policy](ready_only=options.get("ready_only", False))
+            simulation.run(scheduler)
+            job_times = collect_job_times(
+                simulation.history, {job.id: job.priority for _, job in job_timeline}
+            )
+            num_jobs = len(job_timeline)
+            np.testing.assert_array_equal(arrival[run, :num_jobs], job_times.arrival)
+            np.testing.assert_array_equal(dispatch[run, :num_jobs], job_times.dispatch)
+            np.testing.assert_array_equal(
+                completion[run, :num_jobs], job_times.completion
+            )
+            self.assertEqual(batch.context_switches[run], simulation.context_switches)
+
+    def test_same_job_times_as_simulation(self):
+        for policy in (FIFO, ROUND_ROBIN, PRIORITY):
+            for schedule_every in (10, None):
+                with self.subTest(policy=policy, schedule_every=schedule_every):
+                    self.assert_same_as_simulation(
+                        policy, schedule_every=schedule_every
+                    )
+
+    def test_ready_only(self):
+        for policy in (FIFO, PRIORITY):
+            with self.subTest(policy=policy):
+                self.assert_same_as_simulation(policy, ready_only=True)
+        with self.assertRaises(ValueError):
+            BatchSimulation(self.workloads, ROUND_ROBIN, ready_only=True)
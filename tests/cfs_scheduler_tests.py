@@ -0,0 +1,91 @@
+import random
+import unittest
+
+from job import COMPUTE, Job, Task
+from job_timeline import make_workload, workload_to_job_timeline
+from schedulers.cfs import AVLTree, CFSScheduler, _height
+from simulation import Simulation, SimulationListener
+
+
+class ComputeMeter(SimulationListener):
+    """Sums the compute time of each job, and keeps the sums from when the first job exited."""
+
+    def __init__(self):
+        self.compute_times = {}
+        self.at_first_exit = None
+
+    def on_job_computed(self, simulation, job, compute_time):
+        self.compute_times[job.id] = self.compute_times.get(job.id, 0) + compute_time
+
+    def on_job_exit(self, simulation, job):
+        if self.at_first_exit is None:
+            self.at_first_exit = dict(self.compute_times)
+
+
+class TestAVLTree(unittest.TestCase):
+    def test_matches_a_sorted_list(self):
+        rng = random.Random(0)
+        tree = AVLTree()
+        keys = set()
+        for _ in range(3000):
+            if rng.random() < 0.6 or not keys:
+                key = rng.randrange(500)
+                if key in keys:
+                    with self.assertRaises(KeyError):
+                        tree.insert(key)
+                    continue
+                keys.add(key)
+                tree.insert(key)
+            else:
+                key = rng.choice(sorted(keys))
+                keys.remove(key)
+                tree.remove(key)
+            self.assertEqual(len(tree), len(keys))
+            self.assertEqual(tree.first(), min(keys, default=None))
+        self.assertEqual(list(tree), sorted(keys))
+        # an AVL tree of n keys is at most about 1.44 log2(n) high
+        self.assertLessEqual(_height(tree.root), 1.45 * len(keys).bit_length())
+
+
+class TestCFSScheduler(unittest.TestCase):
+    def test_cpu_shares_follow_nice_weights(self):
+        job_timeline = [
+            (0, Job(None, priority, [Task(COMPUTE, 2000)])) for priority in range(3)
+        ]
+        simulation = Simulation(job_timeline)
+        meter = ComputeMeter()
+        simulation.subscribe(meter)
+        simulation.run(CFSScheduler())
+        # Each priority level gets 1 / 1.25 of the CPU time of the level before it
+        self.assertEqual(meter.at_first_exit, {0: 2000, 1: 1600, 2: 1280})
+
+    def test_waking_jobs_do_not_catch_up(self):
+        class Job:
+            def __init__(self, job_id, priority):
+                self.id = job_id
+                self.priority = priority
+
+        scheduler = CFSScheduler(ready_only=True)
+        scheduler.simulation = simulation = object()
+        sleeper, worker = Job(0, 0), Job(1, 1)
+        scheduler.on_job_arrival(simulation, sleeper)
+        scheduler.on_job_arrival(simulation, worker)
+        scheduler.on_job_blocked(simulation, sleeper)
+        scheduler.on_job_computed(simulation, worker, 80)
+        self.assertEqual(scheduler.min_vruntime, 100)
+        # The sleeper comes back level with the worker rather than running until it has caught up
+        scheduler.on_job_ready(simulation, sleeper)
+        self.assertEqual(scheduler.vruntimes, {0: 100, 1: 100})
+        self.assertEqual(scheduler.schedule(simulation), 0)
+        scheduler.on_job_computed(simulation, sleeper, 10)
+        self.assertEqual(scheduler.schedule(simulation), 1)
+
+    def test_every_job_finishes(self):
+        for ready_only in (False, True):
+            with self.subTest(ready_only=ready_only):
+                job_timeline = workload_to_job_timeline(make_workload(300, 5000, rng=0))
+                scheduler = CFSScheduler(ready_only)
+                simulation = Simulation(job_timeline, num_cores=2).run(scheduler)
+                self.assertTrue(simulation.is_finished())
+                self.assertEqual(len(scheduler.tree), 0)
+                self.assertFalse(scheduler.vruntimes)
@@ -94,3 +94,36 @@ class TestEventQueue(unittest.TestCase):
         self.assertEqual(
             self.event_queue.get_event(event_type="job_started", job_id=2), (None, None)
         )
+
+    def test_events_at_same_time_pop_in_push_order(self):
+        events = [Event("job_started", job_id) for job_id in range(5)]
+        for event in reversed(events):
+            self.event_queue.push(event, 10)
+        for event in reversed(events):
+            self.assertEqual(self.event_queue.pop_next_event(), event)
+        self.assertFalse(self.event_queue)
+
+    def test_get_event_get_last(self):
+        self.event_queue.push(Event("io_done", 1), 5)
+        self.event_queue.push(Event("io_done", 2), 9)
+        self.event_queue.push(Event("io_done", 3), 7)
+        self.assertEqual(
+            self.event_queue.get_event(event_type="io_done", get_last=True),
+            (9, Event("io_done", 2)),
+        )
+        self.assertEqual(
+            self.event_queue.get_event(event_type="io_done"), (5, Event("io_done", 1))
+        )
+
+    def test_removed_events_are_skipped(self):
+        for job_id in range(200):
+            self.event_queue.push(Event("job_started", job_id), job_id)
+        for job_id in range(0, 200, 2):
+            self.event_queue.remove_event(job_id=job_id)
+        self.assertEqual(len(self.event_queue), 100)
+        self.assertEqual(self.event_queue.get_next_event_time(), 1)
+        popped = []
+        while self.event_queue:
+            popped.append(self.event_queue.pop_next_event().job_id)
+        self.assertEqual(popped, list(range(1, 200, 2)))
+        self.assertIsNone(self.event_queue.get_next_event_time())
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from history import FULL, METRICS, NONE, HistoryRecorder, load_history
+from job_timeline import make_workload, workload_to_job_timeline
+from metrics import collect_job_times
+from schedulers.basic import RoundRobinScheduler
+from simulation import EVENT_TYPES, SWITCHING_DONE, Simulation
+
+
+def run(record=FULL, history_path=None, chunk_size=1 << 16):
+    job_timeline = workload_to_job_timeline(make_workload(200, 2000, rng=0))
+    simulation = Simulation(job_timeline, record=NONE)
+    # small chunks exercise growing the columns and streaming them in pieces
+    simulation.history = HistoryRecorder(
+        EVENT_TYPES,
+        len(job_timeline),
+        level=record,
+        path=history_path,
+        dispatch_type=SWITCHING_DONE,
+        chunk_size=chunk_size,
+    )
+    job_priorities = {job.id: job.priority for start_time, job in job_timeline}
+    return simulation.run(RoundRobinScheduler()), job_priorities
+
+
+class TestHistoryRecorder(unittest.TestCase):
+    def test_record_levels_give_the_same_job_times(self):
+        full, job_priorities = run(FULL, chunk_size=16)
+        metrics_only, _ = run(METRICS)
+        events = list(full.history)
+        self.assertEqual(len(events), len(full.history))
+
+        expected = collect_job_times(events, job_priorities)
+        for history in (full.history, metrics_only.history):
+            job_times = collect_job_times(history, job_priorities)
+            for name in ("arrival", "dispatch", "completion"):
+                np.testing.assert_array_equal(
+                    getattr(job_times, name), getattr(expected, name)
+                )
+
+    def test_nothing_recorded(self):
+        simulation, _ = run(NONE)
+        self.assertEqual(len(simulation.history), 0)
+        with self.assertRaises(ValueError):
+            list(simulation.history)
+
+    def test_streamed_history_matches_in_memory_history(self):
+        in_memory, _ = run(FULL)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "history")
+            streamed, _ = run(FULL, history_path=path, chunk_size=100)
+            columns = load_history(path)
+            self.assertIsInstance(columns.time, np.memmap)
+            expected = in_memory.history.columns()
+            for name in ("time", "type", "job_id"):
+                np.testing.assert_array_equal(
+                    getattr(columns, name), getattr(expected, name)
+                )
+            self.assertEqual(list(streamed.history), list(in_memory.history))
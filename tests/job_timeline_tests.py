@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+
+from job import TASK_TYPES
+from job_timeline import make_workload, workload_to_job_timeline
+
+
+class TestMakeWorkload(unittest.TestCase):
+    def setUp(self):
+        self.workload = make_workload(500, 1000, rng=0)
+
+    def test_workload_layout(self):
+        workload = self.workload
+        self.assertEqual(len(workload.start_times), 500)
+        self.assertEqual(len(workload.priorities), 500)
+        self.assertEqual(workload.job_offsets[0], 0)
+        self.assertEqual(workload.job_offsets[-1], len(workload.task_types))
+        self.assertEqual(len(workload.durations), len(workload.task_types))
+        # every job has at least one task
+        self.assertTrue((np.diff(workload.job_offsets) > 0).all())
+        self.assertTrue((workload.durations >= 1).all())
+        self.assertTrue((workload.task_types >= 0).all())
+        self.assertTrue((workload.task_types < len(TASK_TYPES)).all())
+        self.assertEqual(workload.start_times[0], 0)
+        self.assertTrue((np.diff(workload.start_times) >= 0).all())
+        self.assertTrue((workload.start_times <= 1000).all())
+
+    def test_same_seed_same_workload(self):
+        other = make_workload(500, 1000, rng=0)
+        for column, other_column in zip(self.workload, other):
+            np.testing.assert_array_equal(column, other_column)
+
+    def test_workload_to_job_timeline(self):
+        job_timeline = workload_to_job_timeline(self.workload)
+        self.assertEqual(len(job_timeline), 500)
+        start_time, job = job_timeline[3]
+        start, end = self.workload.job_offsets[3], self.workload.job_offsets[4]
+        self.assertEqual(start_time, self.workload.start_times[3])
+        self.assertEqual(job.priority, self.workload.priorities[3])
+        self.assertEqual(
+            [task.type for task in job.instructions],
+            [TASK_TYPES[code] for code in self.workload.task_types[start:end]],
+        )
+        self.assertEqual(
+            [task.time_remaining for task in job.instructions],
+            self.workload.durations[start:end].tolist(),
+        )
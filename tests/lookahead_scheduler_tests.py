@@ -0,0 +1,39 @@
+import unittest
+
+from job import COMPUTE, Job, Task
+from job_timeline import make_workload, workload_to_job_timeline
+from schedulers.basic import RandomScheduler
+from schedulers.lookahead import RolloutScheduler
+from simulation import SWITCHING_DONE, Simulation
+
+
+class TestRolloutScheduler(unittest.TestCase):
+    def test_short_job_goes_first(self):
+        job_timeline = [
+            (0, Job(None, 0, [Task(COMPUTE, 100)])),
+            (0, Job(None, 0, [Task(COMPUTE, 5)])),
+        ]
+        simulation = Simulation(job_timeline, schedule_every=None).run(
+            RolloutScheduler(horizon=300)
+        )
+        dispatches = [
+            event.job_id
+            for time, event in simulation.history
+            if event.type == SWITCHING_DONE
+        ]
+        # FIFO would run job 0 first; the rollouts find that running job 1 first finishes a job sooner
+        self.assertEqual(dispatches, [1, 0])
+
+    def test_every_job_finishes(self):
+        for ready_only in (False, True):
+            with self.subTest(ready_only=ready_only):
+                job_timeline = workload_to_job_timeline(make_workload(40, 2000, rng=0))
+                scheduler = RolloutScheduler(
+                    horizon=100,
+                    num_rollouts=2,
+                    rollout_policy=RandomScheduler,
+                    ready_only=ready_only,
+                )
+                simulation = Simulation(job_timeline).run(scheduler)
+                self.assertTrue(simulation.is_finished())
+                self.assertGreater(scheduler.num_forks, 0)
@@ -0,0 +1,49 @@
+import unittest
+
+from event_queue import Event
+from metrics import (
+    summarize,
+    weighted_mean_response_time,
+    weighted_mean_turnaround_time,
+)
+from simulation import START_JOB, SWITCHING_DONE, COMPUTING_DONE, DISK_DONE
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.history = [
+            (0, Event(START_JOB, 0)),
+            (2, Event(SWITCHING_DONE, 0)),
+            (5, Event(START_JOB, 1)),
+            (7, Event(SWITCHING_DONE, 1)),
+            (10, Event(COMPUTING_DONE, 1)),
+            (12, Event(SWITCHING_DONE, 0)),
+            (20, Event(DISK_DONE, 0)),
+        ]
+        self.job_priorities = {0: 0, 1: 1}
+
+    def test_weighted_mean_turnaround_time(self):
+        # job 0 takes 20 with weight 1, job 1 takes 5 with weight 1/2
+        self.assertAlmostEqual(
+            weighted_mean_turnaround_time(self.history, self.job_priorities),
+            (20 + 5 / 2) / (1 + 1 / 2),
+        )
+
+    def test_weighted_mean_response_time(self):
+        self.assertAlmostEqual(
+            weighted_mean_response_time(self.history, self.job_priorities),
+            (2 + 2 / 2) / (1 + 1 / 2),
+        )
+
+    def test_summarize(self):
+        summary = summarize(self.history, self.job_priorities, {0: 10, 1: 1})
+        self.assertEqual(summary["num_jobs"], 2)
+        self.assertAlmostEqual(
+            summary["weighted_mean_waiting_time"], (10 + 4 / 2) / (1 + 1 / 2)
+        )
+        self.assertAlmostEqual(
+            summary["weighted_mean_slowdown"], (2 + 5 / 2) / (1 + 1 / 2)
+        )
+        self.assertAlmostEqual(summary["p50_turnaround_time"], 12.5)
+        self.assertEqual(summary["by_priority"][1]["num_jobs"], 1)
+        self.assertAlmostEqual(summary["by_priority"][0]["mean_turnaround_time"], 20)
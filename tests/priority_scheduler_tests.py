@@ -0,0 +1,135 @@
+import random
+import unittest
+from collections import Counter
+
+from job_timeline import make_workload, workload_to_job_timeline
+from simulation import Simulation, SWITCHING_DONE
+from job import Job, Task, COMPUTE
+from schedulers.priority import (
+    FenwickTree,
+    MLFQScheduler,
+    PriorityScheduler,
+    WeightedRandomScheduler,
+)
+
+
+class TestFenwickTree(unittest.TestCase):
+    def test_find_samples_in_proportion_to_weight(self):
+        tree = FenwickTree(capacity=2)
+        weights = [1.0, 0.0, 3.0, 2.0, 0.0]
+        for index, weight in enumerate(weights):
+            tree.set(index, weight)
+        self.assertAlmostEqual(tree.total(), 6.0)
+        self.assertEqual(tree.find(0.5), 0)
+        self.assertEqual(tree.find(1.0), 2)
+        self.assertEqual(tree.find(3.9), 2)
+        self.assertEqual(tree.find(4.0), 3)
+        self.assertEqual(tree.find(5.9), 3)
+        tree.set(2, 0.0)
+        self.assertEqual(tree.find(1.5), 3)
+
+
+class TestWeightedRandomScheduler(unittest.TestCase):
+    def test_only_resident_jobs_are_scheduled(self):
+        random.seed(0)
+        job_timeline = workload_to_job_timeline(make_workload(200, 1000, rng=0))
+        scheduler = WeightedRandomScheduler()
+        simulation = Simulation(job_timeline)
+        simulation.subscribe(scheduler)
+        simulation.run_until_scheduling_needed()
+        while not simulation.is_finished():
+            job_id = scheduler.schedule(simulation)
+            self.assertIn(job_id, simulation.jobs)
+            simulation.schedule_job(job_id)
+            simulation.run_until_scheduling_needed()
+        self.assertFalse(scheduler.slots)
+
+    def test_weights_follow_priority(self):
+        random.seed(0)
+
+        class Job:
+            def __init__(self, job_id, priority):
+                self.id = job_id
+                self.priority = priority
+
+        scheduler = WeightedRandomScheduler(weight_function="inverse")
+        scheduler.on_job_arrival(None, Job(0, 0))
+        scheduler.on_job_arrival(None, Job(1, 3))
+        scheduler.simulation = simulation = object()
+        counts = Counter(scheduler.schedule(simulation) for _ in range(20000))
+        # weights 1 and 1/4
+        self.assertAlmostEqual(counts[0] / counts[1], 4, delta=0.4)
+
+
+class TestPriorityScheduler(unittest.TestCase):
+    def test_most_important_job_runs_first(self):
+        job_timeline = [
+            (0, Job(None, 2, [Task(COMPUTE, 20)])),
+            (5, Job(None, 0, [Task(COMPUTE, 5)])),
+            (5, Job(None, 1, [Task(COMPUTE, 5)])),
+        ]
+        simulation = Simulation(job_timeline).run(PriorityScheduler())
+        dispatches = [
+            (time, event.job_id)
+            for time, event in simulation.history
+            if event.type == SWITCHING_DONE
+        ]
+        # job 1 preempts job 0 as soon as it arrives, then job 2 runs before job 0 gets the CPU back
+        self.assertEqual(dispatches, [(2, 0), (7, 1), (14, 2), (21, 0)])
+
+
+class TestMLFQScheduler(unittest.TestCase):
+    class Job:
+        def __init__(self, job_id):
+            self.id = job_id
+            self.priority = 0
+
+    class Simulation:
+        time = 0
+
+    def test_jobs_move_between_levels(self):
+        scheduler = MLFQScheduler(num_levels=3, quanta=(10, 20, 40), boost_every=None)
+        scheduler.simulation = simulation = self.Simulation()
+        cpu_bound, io_bound = self.Job(0), self.Job(1)
+        scheduler.on_job_arrival(simulation, cpu_bound)
+        scheduler.on_job_arrival(simulation, io_bound)
+        self.assertEqual(scheduler.schedule(simulation), 0)
+        scheduler.on_job_computed(simulation, cpu_bound, 10)
+        # cpu_bound used up its quantum and dropped to level 1, behind io_bound
+        self.assertEqual(scheduler.levels, {0: 1, 1: 0})
+        self.assertEqual(scheduler.schedule(simulation), 1)
+        scheduler.on_job_computed(simulation, io_bound, 5)
+        scheduler.on_job_computed(simulation, io_bound, 5)
+        scheduler.on_job_computed(simulation, cpu_bound, 40)
+        self.assertEqual(scheduler.levels, {0: 2, 1: 1})
+        # returning from I/O moves a job up a level
+        scheduler.on_job_ready(simulation, io_bound)
+        self.assertEqual(scheduler.levels, {0: 2, 1: 0})
+        self.assertEqual(scheduler.schedule(simulation), 1)
+        scheduler.on_job_exit(simulation, io_bound)
+        self.assertEqual(scheduler.non_empty, 0b100)
+        self.assertEqual(scheduler.schedule(simulation), 0)
+
+    def test_boost_moves_every_job_to_the_top(self):
+        scheduler = MLFQScheduler(num_levels=2, quanta=(10, 10), boost_every=100)
+        scheduler.simulation = simulation = self.Simulation()
+        jobs = [self.Job(job_id) for job_id in range(3)]
+        for job in jobs:
+            scheduler.on_job_arrival(simulation, job)
+        scheduler.on_job_computed(simulation, jobs[0], 10)
+        scheduler.on_job_computed(simulation, jobs[1], 10)
+        self.assertEqual(scheduler.schedule_many(simulation, 3), [2, 0, 1])
+        simulation.time = 150
+        self.assertEqual(scheduler.schedule_many(simulation, 3), [2, 0, 1])
+        self.assertEqual(scheduler.levels, {0: 0, 1: 0, 2: 0})
+        self.assertEqual(scheduler.next_boost, 200)
+
+    def test_every_job_finishes(self):
+        for ready_only in (False, True):
+            with self.subTest(ready_only=ready_only):
+                job_timeline = workload_to_job_timeline(make_workload(300, 5000, rng=0))
+                scheduler = MLFQScheduler(boost_every=200, ready_only=ready_only)
+                simulation = Simulation(job_timeline, num_cores=2).run(scheduler)
+                self.assertTrue(simulation.is_finished())
+                self.assertFalse(scheduler.queued)
+                self.assertEqual(scheduler.non_empty, 0)
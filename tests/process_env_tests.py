@@ -0,0 +1,35 @@
+import unittest
+
+from process_env import SchedulingEnv, VectorSchedulingEnv
+
+
+def play(env, num_steps):
+    """Always runs the job in the last row, and returns the infos of the finished episodes."""
+    tokens, mask = env.reset()
+    finished = []
+    for _ in range(num_steps):
+        tokens, mask, rewards, dones, infos = env.step(mask.sum(axis=1) - 1)
+        assert sorted(infos) == dones.nonzero()[0].tolist()
+        finished.extend(sorted(infos.items()))
+    return finished
+
+
+class TestSchedulingEnv(unittest.TestCase):
+    def test_return_is_minus_the_weighted_mean_turnaround_time(self):
+        env = SchedulingEnv(30, 300, seed=0)
+        env.reset()
+        done = False
+        while not done:
+            reward, done = env.step(0)
+        info = env.episode_info()
+        self.assertAlmostEqual(info["return"], -info["turnaround"])
+
+
+class TestVectorSchedulingEnv(unittest.TestCase):
+    def test_worker_processes_give_the_same_episodes(self):
+        with VectorSchedulingEnv(4, 8, 100, seed=0) as env:
+            expected = play(env, 200)
+        with VectorSchedulingEnv(4, 8, 100, workers=2, seed=0) as env:
+            self.assertEqual(play(env, 200), expected)
+        # episodes finished and were reset
+        self.assertGreater(len(expected), 4)
@@ -0,0 +1,45 @@
+import unittest
+
+from job_timeline import make_workload, workload_to_job_timeline
+from profiling import SimulationProfile, merge_summaries
+from schedulers.basic import RoundRobinScheduler
+from simulation import Simulation
+
+
+def run(profile=None):
+    job_timeline = workload_to_job_timeline(make_workload(100, 1000, rng=0))
+    return Simulation(job_timeline, profile=profile).run(RoundRobinScheduler())
+
+
+class TestSimulationProfile(unittest.TestCase):
+    def test_profiling_counts_without_changing_the_run(self):
+        expected = run()
+        profile = SimulationProfile(timers=True)
+        simulation = run(profile)
+        self.assertEqual(list(simulation.history), list(expected.history))
+
+        counters = profile.summary()["counters"]
+        self.assertEqual(counters["events_processed"], len(expected.history))
+        self.assertEqual(counters["context_switches"], expected.context_switches)
+        self.assertGreater(counters["scheduling_decisions"], 0)
+        self.assertGreater(counters["max_queue_length"], 0)
+        self.assertEqual(
+            profile.timers["process_event"][0], counters["events_processed"]
+        )
+        self.assertEqual(
+            profile.timers["schedule"][0], counters["scheduling_decisions"]
+        )
+
+    def test_merge_summaries(self):
+        first, second = SimulationProfile(), SimulationProfile()
+        run(first)
+        run(second)
+        merged = merge_summaries([first.summary(), second.summary()])
+        self.assertEqual(merged["runs"], 2)
+        self.assertEqual(
+            merged["counters"]["events_processed"],
+            2 * first.counters["events_processed"],
+        )
+        self.assertEqual(
+            merged["counters"]["max_queue_length"], first.counters["max_queue_length"]
+        )
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import main
+from main import RESULT_FIELDS, iter_simulation_results, run_key
+from result_cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ResultCache(
+            os.path.join(directory.name, "results.sqlite"), RESULT_FIELDS
+        )
+        self.addCleanup(self.cache.close)
+
+    def test_cached_runs_are_not_run_again(self):
+        options = dict(num_runs=6, seed=0, cache=self.cache, schedule_every=5)
+        first = list(iter_simulation_results("RR", 30, 300, **options))
+        self.assertEqual(len(self.cache), 6)
+        with patch.object(main, "run_simulation") as run_simulation:
+            second = list(iter_simulation_results("RR", 30, 300, **options))
+        run_simulation.assert_not_called()
+        self.assertEqual(
+            second, [{name: r[name] for name in RESULT_FIELDS} for r in first]
+        )
+
+        # only the runs of the new scheduler are run
+        with patch.object(
+            main, "run_simulation", wraps=main.run_simulation
+        ) as run_simulation:
+            list(iter_simulation_results("FIFO", 30, 300, **options))
+        self.assertEqual(run_simulation.call_count, 6)
+        self.assertEqual(len(self.cache), 12)
+
+    def test_keys_cover_the_configuration(self):
+        key = run_key("RR", 30, 300, 7)
+        self.assertEqual(run_key("RR", 30, 300, 7, schedule_every=10), key)
+        for other in (
+            run_key("FIFO", 30, 300, 7),
+            run_key("RR", 31, 300, 7),
+            run_key("RR", 30, 300, 8),
+            run_key("RR", 30, 300, 7, schedule_every=5),
+            run_key("RR", 30, 300, 7, context_switch_time=1),
+            run_key("RR", 30, 300, 7, engine="batch"),
+        ):
+            self.assertNotEqual(other, key)
+
+    def test_least_recently_used_results_are_evicted(self):
+        self.cache.max_entries = 2
+        results = {
+            key: {name: index for name in RESULT_FIELDS}
+            for index, key in enumerate((b"a", b"b", b"c"))
+        }
+        self.cache.put_many([(b"a", results[b"a"]), (b"b", results[b"b"])])
+        # the last use times must differ
+        time.sleep(0.01)
+        self.cache.get_many([b"a"])
+        time.sleep(0.01)
+        self.cache.put_many([(b"c", results[b"c"])])
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertEqual(
+            self.cache.get_many([b"a", b"b", b"c"]),
+            [results[b"a"], None, results[b"c"]],
+        )
@@ -0,0 +1,284 @@
+import unittest
+
+import numpy as np
+
+from job import Job, Task, COMPUTE, DISK
+from simulation import (
+    Simulation,
+    SimulationListener,
+    COMPUTING_DONE,
+    DISK_DONE,
+    QUANTUM_EXPIRED,
+    SWITCHING_DONE,
+)
+from schedulers.basic import FIFOScheduler, RoundRobinScheduler
+from schedulers.priority import PriorityScheduler
+from job_timeline import make_workload, workload_to_job_timeline
+
+
+class TestIODevices(unittest.TestCase):
+    def test_device_requests_queue_in_fifo_order(self):
+        job_timeline = [
+            (0, Job(None, 0, [Task(DISK, 20)])),
+            (3, Job(None, 0, [Task(COMPUTE, 1), Task(DISK, 20)])),
+        ]
+        simulation = Simulation(job_timeline).run(RoundRobinScheduler())
+        disk_done_times = [
+            time for time, event in simulation.history if event.type == DISK_DONE
+        ]
+        # the second request has to wait for the first one to finish
+        self.assertEqual(disk_done_times, [22, 42])
+
+        disk = simulation.devices[DISK]
+        self.assertEqual(disk.num_requests, 2)
+        self.assertEqual(disk.max_queue_length, 2)
+        self.assertEqual(disk.queue_length, 0)
+        self.assertEqual(disk.tail_time, 42)
+        self.assertAlmostEqual(disk.utilization(simulation.time), 40 / 42)
+
+
+class TestJobProgress(unittest.TestCase):
+    def test_job_tasks(self):
+        job = Job(None, 0, [Task(COMPUTE, 5), Task(DISK, 20)])
+        self.assertEqual(job.instructions, [Task(COMPUTE, 5), Task(DISK, 20)])
+        job.time_remaining -= 3
+        self.assertEqual(job.remaining_tasks, [Task(COMPUTE, 2), Task(DISK, 20)])
+        job.advance()
+        self.assertEqual(job.remaining_tasks, [Task(DISK, 20)])
+        job.advance()
+        self.assertFalse(job.has_tasks())
+        # the instructions are left untouched
+        self.assertEqual(job.instructions, [Task(COMPUTE, 5), Task(DISK, 20)])
+
+    def test_preempted_compute_task_resumes(self):
+        job_timeline = [
+            (0, Job(None, 0, [Task(COMPUTE, 10)])),
+            (5, Job(None, 0, [Task(COMPUTE, 1)])),
+        ]
+        simulation = Simulation(job_timeline).run(RoundRobinScheduler())
+        computing_done = [
+            (time, event.job_id)
+            for time, event in simulation.history
+            if event.type == COMPUTING_DONE
+        ]
+        # job 0 computes from 2 to 5, is preempted by job 1 (switch 5-7, compute 7-8),
+        # then switches back in at 8 and finishes its remaining 7 units at 17.
+        self.assertEqual(computing_done, [(8, 1), (17, 0)])
+
+
+class TestMultiCore(unittest.TestCase):
+    def make_job_timeline(self):
+        return [
+            (0, Job(None, 0, [Task(COMPUTE, 10)])),
+            (0, Job(None, 0, [Task(COMPUTE, 10)])),
+            (0, Job(None, 0, [Task(COMPUTE, 10)])),
+        ]
+
+    def test_jobs_run_in_parallel(self):
+        simulation = Simulation(self.make_job_timeline(), num_cores=2)
+        simulation.run(FIFOScheduler())
+        computing_done = [
+            (time, event.job_id)
+            for time, event in simulation.history
+            if event.type == COMPUTING_DONE
+        ]
+        # jobs 0 and 1 run side by side; job 2 takes the first free core
+        self.assertEqual(computing_done, [(12, 0), (12, 1), (24, 2)])
+        core_stats = simulation.core_stats()
+        self.assertAlmostEqual(core_stats[0]["utilization"], 20 / 24)
+        self.assertAlmostEqual(core_stats[1]["idle"], 12 / 24)
+        self.assertEqual(simulation.context_switches, 3)
+
+    def test_schedule_jobs_migrates_jobs(self):
+        simulation = Simulation(self.make_job_timeline(), num_cores=2)
+        simulation.run_until_scheduling_needed()
+        simulation.schedule_jobs([0, 1])
+        self.assertEqual([core.job.id for core in simulation.cores], [0, 1])
+        simulation.need_scheduling = True
+        simulation.schedule_jobs([1, None])
+        self.assertEqual(simulation.cores[0].job.id, 1)
+        self.assertIsNone(simulation.cores[1].job)
+        self.assertEqual(simulation.job_cores, {1: simulation.cores[0]})
+        with self.assertRaises(AssertionError):
+            simulation.need_scheduling = True
+            simulation.schedule_jobs([2, 2])
+
+
+class TestTimeSlices(unittest.TestCase):
+    def event_times(self, simulation, event_type):
+        return [
+            (time, event.job_id)
+            for time, event in simulation.history
+            if event.type == event_type
+        ]
+
+    def test_quantum_expires_while_computing(self):
+        job_timeline = [(0, Job(None, 0, [Task(COMPUTE, 15), Task(COMPUTE, 20)]))]
+        simulation = Simulation(job_timeline, schedule_every=10)
+        simulation.run(FIFOScheduler())
+        # time slices keep running across consecutive compute tasks
+        self.assertEqual(
+            self.event_times(simulation, QUANTUM_EXPIRED), [(12, 0), (22, 0), (32, 0)]
+        )
+        self.assertEqual(simulation.time, 37)
+        self.assertEqual(simulation.context_switches, 1)
+
+    def test_no_time_slices(self):
+        job_timeline = [(0, Job(None, 0, [Task(COMPUTE, 35)]))]
+        simulation = Simulation(job_timeline, schedule_every=None)
+        simulation.run(FIFOScheduler())
+        self.assertEqual(self.event_times(simulation, QUANTUM_EXPIRED), [])
+        self.assertEqual(simulation.time, 37)
+
+    def test_round_robin_preempts_on_quantum(self):
+        job_timeline = [
+            (0, Job(None, 0, [Task(COMPUTE, 15)])),
+            (0, Job(None, 0, [Task(COMPUTE, 15)])),
+        ]
+        simulation = Simulation(job_timeline, schedule_every=10)
+        simulation.run(RoundRobinScheduler())
+        self.assertEqual(
+            self.event_times(simulation, SWITCHING_DONE),
+            [(2, 0), (14, 1), (26, 0), (33, 1)],
+        )
+        # job 0 computes 2-12 and 26-31, job 1 computes 14-24 and 33-38
+        self.assertEqual(
+            self.event_times(simulation, COMPUTING_DONE), [(31, 0), (38, 1)]
+        )
+
+    def test_quantum_is_cancelled_when_job_blocks(self):
+        job_timeline = [(0, Job(None, 0, [Task(COMPUTE, 5), Task(DISK, 20)]))]
+        simulation = Simulation(job_timeline, schedule_every=10)
+        simulation.run(FIFOScheduler())
+        self.assertEqual(self.event_times(simulation, QUANTUM_EXPIRED), [])
+        self.assertFalse(simulation.events)
+
+
+class CountingScheduler:
+    """Wraps a scheduler and counts its decisions."""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.num_decisions = 0
+        schedule = scheduler.schedule
+
+        def counted_schedule(simulation):
+            self.num_decisions += 1
+            return schedule(simulation)
+
+        scheduler.schedule = counted_schedule
+
+
+class TestFastForward(unittest.TestCase):
+    def run_simulation(self, scheduler, fast_forward, **options):
+        # sparse arrivals leave long stretches with a single runnable job
+        job_timeline = workload_to_job_timeline(make_workload(100, 50000, rng=4))
+        counter = CountingScheduler(scheduler)
+        simulation = Simulation(job_timeline, **options)
+        simulation.run(scheduler, fast_forward=fast_forward)
+        return simulation, counter.num_decisions
+
+    def test_fast_forward_matches_step_by_step(self):
+        for scheduler_class in (RoundRobinScheduler, FIFOScheduler):
+            for ready_only in (False, True):
+                for schedule_every in (10, None):
+                    with self.subTest(
+                        scheduler=scheduler_class.__name__,
+                        ready_only=ready_only,
+                        schedule_every=schedule_every,
+                    ):
+                        options = {"schedule_every": schedule_every}
+                        stepped, stepped_decisions = self.run_simulation(
+                            scheduler_class(ready_only=ready_only), False, **options
+                        )
+                        skipped, skipped_decisions = self.run_simulation(
+                            scheduler_class(ready_only=ready_only), True, **options
+                        )
+                        expected = stepped.history.columns()
+                        columns = skipped.history.columns()
+                        for name in ("time", "type", "job_id"):
+                            np.testing.assert_array_equal(
+                                getattr(columns, name), getattr(expected, name)
+                            )
+                        self.assertEqual(skipped.core_stats(), stepped.core_stats())
+                        self.assertEqual(skipped.device_stats(), stepped.device_stats())
+                        self.assertLess(skipped_decisions, stepped_decisions)
+
+    def test_pending_events_keep_their_order(self):
+        # each job's disk request is pending while the other job is the only ready job,
+        # so it is taken out of the event queue and merged back in during a fast-forward
+        def make_job_timeline():
+            return [
+                (0, Job(None, 0, [Task(DISK, 10), Task(COMPUTE, 30)])),
+                (1, Job(None, 0, [Task(DISK, 9), Task(COMPUTE, 3)])),
+            ]
+
+        stepped = Simulation(make_job_timeline()).run(
+            RoundRobinScheduler(ready_only=True), fast_forward=False
+        )
+        skipped = Simulation(make_job_timeline()).run(
+            RoundRobinScheduler(ready_only=True)
+        )
+        self.assertEqual(list(skipped.history), list(stepped.history))
+        self.assertEqual(skipped.time, stepped.time)
+
+
+class ExitRecorder(SimulationListener):
+    def __init__(self):
+        self.exits = []
+
+    def on_job_exit(self, simulation, job):
+        self.exits.append((simulation.time, job.id))
+
+
+class TestFork(unittest.TestCase):
+    def run_to_end(self, simulation, scheduler):
+        while not simulation.is_finished():
+            simulation.schedule_job(scheduler.schedule(simulation))
+            simulation.run_until_scheduling_needed()
+
+    def test_fork_runs_like_the_original(self):
+        for ready_only in (False, True):
+            with self.subTest(ready_only=ready_only):
+                # PriorityScheduler's decisions only depend on the resident jobs,
+                # so a new one on a fork decides like the original's
+                job_timeline = workload_to_job_timeline(make_workload(150, 3000, rng=0))
+                expected = ExitRecorder()
+                simulation = Simulation(job_timeline)
+                simulation.subscribe(expected)
+                simulation.run(PriorityScheduler(ready_only))
+
+                job_timeline = workload_to_job_timeline(make_workload(150, 3000, rng=0))
+                simulation = Simulation(job_timeline)
+                recorder = ExitRecorder()
+                simulation.subscribe(recorder)
+                scheduler = PriorityScheduler(ready_only)
+                simulation.subscribe(scheduler)
+                simulation.run_until_scheduling_needed()
+                for _ in range(200):
+                    simulation.schedule_job(scheduler.schedule(simulation))
+                    simulation.run_until_scheduling_needed()
+                fork_time = simulation.time
+                self.assertTrue(simulation.jobs)
+
+                # Running a fork with another policy leaves the original and other forks alone
+                self.run_to_end(simulation.fork(), RoundRobinScheduler(ready_only))
+                fork = simulation.fork()
+                fork_recorder = ExitRecorder()
+                fork.subscribe(fork_recorder)
+                fork_scheduler = PriorityScheduler(ready_only)
+                fork.subscribe(fork_scheduler)
+                self.run_to_end(fork, fork_scheduler)
+                self.run_to_end(simulation, scheduler)
+
+                self.assertEqual(recorder.exits, expected.exits)
+                self.assertEqual(
+                    fork_recorder.exits,
+                    [
+                        (time, job_id)
+                        for time, job_id in expected.exits
+                        if time > fork_time
+                    ],
+                )
+                self.assertEqual(fork.core_stats(), simulation.core_stats())
+                self.assertEqual(fork.device_stats(), simulation.device_stats())
@@ -0,0 +1,91 @@
+import random
+import unittest
+
+from job import COMPUTE, DISK, Job, Task
+from job_timeline import make_workload, workload_to_job_timeline
+from schedulers.base import Scheduler
+from schedulers.srpt import IndexedHeap, SJFScheduler, SRPTScheduler
+from simulation import SWITCHING_DONE, Simulation
+
+
+class RescanSRPTScheduler(Scheduler):
+    """SRPT which recomputes every job's work left at each decision."""
+
+    def __init__(self, weighted=False, ready_only=False):
+        super().__init__(ready_only)
+        self.weighted = weighted
+
+    def schedule(self, simulation):
+        pool = simulation.ready_jobs if self.ready_only else simulation.jobs
+        if not pool:
+            return self.no_ready_job(simulation)
+
+        def key(job):
+            work = job.time_remaining + sum(job.task_times[job.cursor + 1 : job.end])
+            return (work * (1 + job.priority) if self.weighted else work), job.id
+
+        return min(pool.values(), key=key).id
+
+
+class TestIndexedHeap(unittest.TestCase):
+    def test_matches_a_sorted_list(self):
+        rng = random.Random(0)
+        heap = IndexedHeap()
+        keys = {}
+        for _ in range(2000):
+            operation = rng.random()
+            if operation < 0.4 or not keys:
+                item = rng.randrange(100)
+                if item not in keys:
+                    keys[item] = rng.randrange(50)
+                    heap.push(item, keys[item])
+            elif operation < 0.7:
+                item = rng.choice(list(keys))
+                keys[item] = rng.randrange(50)
+                heap.update(item, keys[item])
+            elif operation < 0.85:
+                item = rng.choice(list(keys))
+                del keys[item]
+                heap.remove(item)
+            else:
+                item = heap.pop()
+                self.assertEqual(item, min(keys, key=lambda item: (keys[item], item)))
+                del keys[item]
+            self.assertEqual(len(heap), len(keys))
+
+
+class TestSRPTScheduler(unittest.TestCase):
+    def test_matches_rescanning_every_job(self):
+        for weighted in (False, True):
+            for ready_only in (False, True):
+                with self.subTest(weighted=weighted, ready_only=ready_only):
+                    runs = []
+                    for scheduler in (
+                        SRPTScheduler(weighted, ready_only),
+                        RescanSRPTScheduler(weighted, ready_only),
+                    ):
+                        job_timeline = workload_to_job_timeline(
+                            make_workload(150, 3000, rng=0)
+                        )
+                        simulation = Simulation(job_timeline).run(
+                            scheduler, fast_forward=False
+                        )
+                        runs.append(list(simulation.history))
+                    self.assertEqual(runs[0], runs[1])
+
+    def test_shortest_job_first_is_not_preempted(self):
+        def dispatches(scheduler):
+            job_timeline = [
+                (0, Job(None, 0, [Task(COMPUTE, 30)])),
+                (5, Job(None, 0, [Task(COMPUTE, 5), Task(DISK, 5)])),
+            ]
+            simulation = Simulation(job_timeline).run(scheduler)
+            return [
+                (time, event.job_id)
+                for time, event in simulation.history
+                if event.type == SWITCHING_DONE
+            ]
+
+        # SRPT preempts the long job when the short one arrives; SJF lets it finish
+        self.assertEqual(dispatches(SRPTScheduler()), [(2, 0), (7, 1), (19, 0)])
+        self.assertEqual(dispatches(SJFScheduler()), [(2, 0), (34, 1)])
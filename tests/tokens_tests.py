@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+
+import tokens
+from job import TASK_TYPES
+from job_timeline import make_workload, workload_to_job_timeline
+from schedulers.basic import RoundRobinScheduler
+from simulation import Simulation
+
+
+def expected_token(simulation, job):
+    token = np.zeros(tokens.NUM_FEATURES, np.float32)
+    token[tokens.PRIORITY] = job.priority
+    token[tokens.BLOCKED] = job.blocked
+    token[tokens.ON_CORE] = any(core.job is job for core in simulation.cores)
+    token[tokens.AGE] = simulation.time - simulation.job_timeline[job.id][0]
+    token[tokens.TASKS_LEFT] = len(job.remaining_tasks)
+    for i, task in enumerate(job.remaining_tasks[: tokens.NUM_UPCOMING_TASKS + 1]):
+        column = tokens.CURRENT_TASK + i * tokens.TASK_FEATURES
+        token[column + TASK_TYPES.index(task.type)] = 1
+        token[column + len(TASK_TYPES)] = task.time_remaining
+    return token
+
+
+class TestJobTokenBuffer(unittest.TestCase):
+    def test_tokens_match_the_simulation_state(self):
+        job_timeline = workload_to_job_timeline(make_workload(40, 400, rng=0))
+        simulation = Simulation(job_timeline, num_cores=2)
+        scheduler = RoundRobinScheduler()
+        simulation.subscribe(scheduler)
+        simulation.run_until_scheduling_needed()
+        # enabled part way through a run, the buffer picks up the resident jobs
+        simulation.schedule_jobs(scheduler.place(simulation))
+        simulation.run_until_scheduling_needed()
+        buffer = None
+        while not simulation.is_finished():
+            state = simulation.tokenize_state()
+            if buffer is None:
+                buffer = simulation.token_buffer.buffer
+            token_buffer = simulation.token_buffer
+            self.assertEqual(len(state), len(simulation.jobs))
+            if token_buffer.buffer is buffer:
+                self.assertTrue(np.shares_memory(state, buffer))
+            for row, job_id in enumerate(token_buffer.job_ids[: len(state)]):
+                job = simulation.jobs[int(job_id)]
+                np.testing.assert_allclose(state[row], expected_token(simulation, job))
+            simulation.schedule_jobs(scheduler.place(simulation))
+            simulation.run_until_scheduling_needed()
+        self.assertEqual(token_buffer.num_jobs, 0)
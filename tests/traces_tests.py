@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from job import COMPUTE, DISK, TASK_CODES
+from job_timeline import make_workload, workload_to_job_timeline
+from schedulers.basic import RoundRobinScheduler
+from simulation import Simulation
+from traces import (
+    Trace,
+    load_trace,
+    read_csv_trace,
+    read_jsonl_trace,
+    save_trace,
+    workload_from_job_timeline,
+)
+
+
+class TestTraces(unittest.TestCase):
+    def test_saved_trace_replays_the_same_simulation(self):
+        workload = make_workload(300, 3000, rng=0)
+        expected = Simulation(workload_to_job_timeline(workload)).run(
+            RoundRobinScheduler()
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            save_trace(workload, directory)
+            trace = load_trace(directory)
+            self.assertIsInstance(trace.durations, np.memmap)
+            simulation = Simulation(Trace(trace)).run(RoundRobinScheduler())
+        self.assertEqual(list(simulation.history), list(expected.history))
+
+    def test_workload_from_job_timeline(self):
+        workload = make_workload(50, 500, rng=1)
+        converted = workload_from_job_timeline(workload_to_job_timeline(workload))
+        for name in workload._fields:
+            np.testing.assert_array_equal(
+                getattr(converted, name), getattr(workload, name)
+            )
+
+    def test_csv_and_jsonl_logs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, "log.csv")
+            with open(csv_path, "w") as file:
+                file.write("job,start_time,priority,task_type,duration\n")
+                file.write("b,7,1,compute,3\n")
+                file.write("a,2,0,disk,20\n")
+                file.write("b,7,1,DISK,4\n")
+            jsonl_path = os.path.join(directory, "log.jsonl")
+            with open(jsonl_path, "w") as file:
+                file.write(
+                    json.dumps(
+                        {
+                            "start_time": 7,
+                            "priority": 1,
+                            "tasks": [["compute", 3], ["disk", 4]],
+                        }
+                    )
+                    + "\n"
+                )
+                file.write(
+                    json.dumps(
+                        {"start_time": 2, "priority": 0, "tasks": [["disk", 20]]}
+                    )
+                    + "\n"
+                )
+            for workload in (read_csv_trace(csv_path), read_jsonl_trace(jsonl_path)):
+                # jobs are sorted by start time
+                self.assertEqual(workload.start_times.tolist(), [2, 7])
+                self.assertEqual(workload.priorities.tolist(), [0, 1])
+                self.assertEqual(workload.job_offsets.tolist(), [0, 1, 3])
+                self.assertEqual(
+                    workload.task_types.tolist(),
+                    [TASK_CODES[DISK], TASK_CODES[COMPUTE], TASK_CODES[DISK]],
+                )
+                self.assertEqual(workload.durations.tolist(), [20, 3, 4])
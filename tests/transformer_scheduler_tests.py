@@ -0,0 +1,39 @@
+import importlib.util
+import unittest
+
+from job_timeline import make_workload, workload_to_job_timeline
+from simulation import Simulation
+
+HAS_TORCH = importlib.util.find_spec("torch") is not None
+
+
+def make_simulations(count):
+    return [
+        Simulation(workload_to_job_timeline(make_workload(30, 300, rng=seed)))
+        for seed in range(count)
+    ]
+
+
+@unittest.skipUnless(HAS_TORCH, "torch is not installed")
+class TestTransformerScheduler(unittest.TestCase):
+    def test_batched_decisions_match_one_at_a_time(self):
+        import torch
+
+        from transformer_scheduler import TransformerScheduler, run_batched
+
+        torch.manual_seed(0)
+        scheduler = TransformerScheduler(ready_only=True)
+        batched = run_batched(make_simulations(4), scheduler)
+        for simulation, expected in zip(batched, make_simulations(4)):
+            expected.run(scheduler)
+            self.assertEqual(list(simulation.history), list(expected.history))
+
+    def test_unchanged_tokens_reuse_the_decision(self):
+        from transformer_scheduler import TransformerScheduler
+
+        (simulation,) = make_simulations(1)
+        simulation.run_until_scheduling_needed()
+        scheduler = TransformerScheduler()
+        first = scheduler.schedule(simulation)
+        self.assertEqual(scheduler.schedule(simulation), first)
+        self.assertEqual(scheduler.num_forward_passes, 1)
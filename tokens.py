@@ -0,0 +1,132 @@
+# Job tokens: a fixed-size feature vector per resident job, for learned schedulers.
+import numpy as np
+
+from job import TASK_TYPES
+from simulation import SimulationListener
+
+# Columns of a job token
+PRIORITY = 0
+BLOCKED = 1
+ON_CORE = 2
+AGE = 3  # time since the job arrived
+TASKS_LEFT = 4  # including the current task
+CURRENT_TASK = 5
+# Each task is described by a one-hot task type followed by its (remaining) duration
+TASK_FEATURES = len(TASK_TYPES) + 1
+NUM_UPCOMING_TASKS = 2
+UPCOMING_TASKS = CURRENT_TASK + TASK_FEATURES
+NUM_FEATURES = UPCOMING_TASKS + NUM_UPCOMING_TASKS * TASK_FEATURES
+
+
+class JobTokenBuffer(SimulationListener):
+    """
+    A preallocated array with one token (row) per resident job, kept up to date as the simulation runs.
+
+    Rows are packed: the resident jobs are rows 0 to num_jobs - 1, and a job which exits is replaced
+    by the last row. Each event only rewrites the rows of the job it concerns. The features which
+    change with the clock (the age of every job and the remaining time of running compute tasks)
+    are brought up to date in place by tokens(), so getting the tokens allocates nothing.
+
+    Attributes:
+        buffer (np.ndarray): (capacity, NUM_FEATURES) float32 array of tokens.
+        job_ids (np.ndarray): the id of the job in each row.
+        rows (dict): job id -> row.
+        num_jobs (int): the number of rows in use.
+    """
+
+    def __init__(self, capacity=64):
+        self.buffer = np.zeros((capacity, NUM_FEATURES), np.float32)
+        self.job_ids = np.zeros(capacity, np.int64)
+        self.arrival_times = np.zeros(capacity)
+        self.rows = {}
+        self.num_jobs = 0
+        self.on_core = []  # job ids whose rows have ON_CORE set
+
+    def on_subscribe(self, simulation):
+        self.buffer[:] = 0
+        self.rows.clear()
+        self.num_jobs = 0
+        self.on_core = []
+
+    def on_job_arrival(self, simulation, job):
+        row = self.num_jobs
+        if row == len(self.buffer):
+            self._grow()
+        self.num_jobs += 1
+        self.rows[job.id] = row
+        self.job_ids[row] = job.id
+        # jobs replayed when the buffer subscribes arrived before now
+        self.arrival_times[row] = simulation.job_timeline[job.id][0]
+        token = self.buffer[row]
+        token[:] = 0
+        token[PRIORITY] = job.priority
+        self._write_tasks(token, job)
+
+    def on_job_exit(self, simulation, job):
+        row = self.rows.pop(job.id)
+        last = self.num_jobs - 1
+        if row != last:
+            self.buffer[row] = self.buffer[last]
+            self.job_ids[row] = self.job_ids[last]
+            self.arrival_times[row] = self.arrival_times[last]
+            self.rows[int(self.job_ids[row])] = row
+        self.num_jobs = last
+
+    def on_job_blocked(self, simulation, job):
+        self.buffer[self.rows[job.id], BLOCKED] = 1
+
+    def on_job_ready(self, simulation, job):
+        self.buffer[self.rows[job.id], BLOCKED] = 0
+
+    def on_job_advance(self, simulation, job):
+        self._write_tasks(self.buffer[self.rows[job.id]], job)
+
+    def _write_tasks(self, token, job):
+        token[TASKS_LEFT] = job.end - job.cursor
+        token[CURRENT_TASK:] = 0
+        for i in range(NUM_UPCOMING_TASKS + 1):
+            index = job.cursor + i
+            if index >= job.end:
+                break
+            column = CURRENT_TASK + i * TASK_FEATURES
+            token[column + job.task_types[index]] = 1
+            token[column + len(TASK_TYPES)] = (
+                job.time_remaining if i == 0 else job.task_times[index]
+            )
+
+    def _grow(self):
+        capacity = 2 * len(self.buffer)
+        self.buffer = np.resize(self.buffer, (capacity, NUM_FEATURES))
+        self.job_ids = np.resize(self.job_ids, capacity)
+        self.arrival_times = np.resize(self.arrival_times, capacity)
+
+    def tokens(self, simulation):
+        """
+        Returns a view of the tokens of the resident jobs, brought up to date with the simulation's clock.
+        The view is only valid until the simulation processes another event.
+        """
+        num_jobs = self.num_jobs
+        buffer = self.buffer
+        np.subtract(
+            simulation.time, self.arrival_times[:num_jobs], out=buffer[:num_jobs, AGE]
+        )
+        rows = self.rows
+        for job_id in self.on_core:
+            row = rows.get(job_id)
+            if row is not None:
+                buffer[row, ON_CORE] = 0
+                # a job taken off its core keeps the progress it was charged for
+                self._write_time_remaining(row, simulation.jobs[job_id])
+        self.on_core.clear()
+        for core in simulation.cores:
+            if core.job is not None:
+                row = rows[core.job.id]
+                buffer[row, ON_CORE] = 1
+                # the simulation charges running compute tasks before every decision
+                self._write_time_remaining(row, core.job)
+                self.on_core.append(core.job.id)
+        return buffer[:num_jobs]
+
+    def _write_time_remaining(self, row, job):
+        if job.has_tasks():
+            self.buffer[row, CURRENT_TASK + len(TASK_TYPES)] = job.time_remaining
@@ -0,0 +1,229 @@
+# Workload traces: saving, loading and importing workloads, so the same jobs can be replayed.
+#
+# A trace is a directory with one .npy file per Workload column, which load_trace memory-maps,
+# so opening a trace costs nothing however many jobs it has. A Trace turns the columns into
+# Jobs lazily, as a Simulation admits them.
+import argparse
+import csv
+import json
+import os
+from array import array
+
+import numpy as np
+
+from job import TASK_CODES, TASK_TYPES, Job
+from job_timeline import Workload
+
+TRACE_DTYPES = {
+    "task_types": np.int8,
+    "durations": np.int64,
+    "job_offsets": np.int64,
+    "priorities": np.int8,
+    "start_times": np.int64,
+}
+# Jobs are converted into Jobs this many at a time
+CHUNK_SIZE = 1 << 12
+
+
+def save_trace(workload, path):
+    """Saves a Workload to the directory at path, with one .npy file per column."""
+    os.makedirs(path, exist_ok=True)
+    for name, dtype in TRACE_DTYPES.items():
+        np.save(
+            os.path.join(path, f"{name}.npy"),
+            np.ascontiguousarray(getattr(workload, name), dtype),
+        )
+
+
+def load_trace(path, mmap_mode="r"):
+    """Loads a trace saved with save_trace as a Workload, memory-mapping the columns by default."""
+    return Workload(
+        **{
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in TRACE_DTYPES
+        }
+    )
+
+
+def workload_from_job_timeline(job_timeline):
+    """Converts a job timeline of (start_time, Job), such as make_job_timeline's, into a Workload."""
+    task_types = []
+    durations = []
+    job_offsets = [0]
+    for start_time, job in job_timeline:
+        task_types.extend(job.task_types[job.start : job.end])
+        durations.extend(job.task_times[job.start : job.end])
+        job_offsets.append(len(task_types))
+    return Workload(
+        np.array(task_types, TRACE_DTYPES["task_types"]),
+        np.array(durations, TRACE_DTYPES["durations"]),
+        np.array(job_offsets, TRACE_DTYPES["job_offsets"]),
+        np.array(
+            [job.priority for start_time, job in job_timeline],
+            TRACE_DTYPES["priorities"],
+        ),
+        np.array(
+            [start_time for start_time, job in job_timeline],
+            TRACE_DTYPES["start_times"],
+        ),
+    )
+
+
+def _make_workload(jobs):
+    """
+    Builds a Workload sorted by start time from a list of (start_time, priority, [(task type, duration)]).
+    Jobs which start at the same time keep their order.
+    """
+    jobs = sorted(jobs, key=lambda job: job[0])
+    task_types = []
+    durations = []
+    job_offsets = [0]
+    for start_time, priority, tasks in jobs:
+        if not tasks:
+            raise ValueError(f"A job starting at {start_time} has no tasks")
+        for task_type, duration in tasks:
+            task_type = task_type.upper()
+            if task_type not in TASK_CODES:
+                raise ValueError(
+                    f"Unrecognized task type: {task_type}. Expected one of {TASK_TYPES}"
+                )
+            task_types.append(TASK_CODES[task_type])
+            durations.append(int(duration))
+        job_offsets.append(len(task_types))
+    return Workload(
+        np.array(task_types, TRACE_DTYPES["task_types"]),
+        np.array(durations, TRACE_DTYPES["durations"]),
+        np.array(job_offsets, TRACE_DTYPES["job_offsets"]),
+        np.array([priority for _, priority, _ in jobs], TRACE_DTYPES["priorities"]),
+        np.array([start for start, _, _ in jobs], TRACE_DTYPES["start_times"]),
+    )
+
+
+def read_csv_trace(path):
+    """
+    Imports a job log in CSV format, with a header row and one row per task, as a Workload.
+
+    The columns are job (any identifier), start_time, priority, task_type (one of TASK_TYPES, in any case)
+    and duration. A job's rows give its tasks in order; its start time and priority are taken from its first row.
+    """
+    jobs = {}
+    with open(path, newline="") as file:
+        for row in csv.DictReader(file):
+            job = jobs.get(row["job"])
+            if job is None:
+                job = jobs[row["job"]] = (
+                    int(row["start_time"]),
+                    int(row["priority"]),
+                    [],
+                )
+            job[2].append((row["task_type"], row["duration"]))
+    return _make_workload(list(jobs.values()))
+
+
+def read_jsonl_trace(path):
+    """
+    Imports a job log in JSON Lines format, with one job per line, as a Workload. For example:
+
+        {"start_time": 0, "priority": 2, "tasks": [["compute", 5], ["disk", 20]]}
+
+    Each task is a [task type, duration] pair, with a task type from TASK_TYPES in any case.
+    """
+    jobs = []
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                job = json.loads(line)
+                jobs.append(
+                    (int(job["start_time"]), int(job["priority"]), job["tasks"])
+                )
+    return _make_workload(jobs)
+
+
+class Trace:
+    """
+    A Workload as a job timeline of (start_time, Job) which makes its Jobs on demand.
+
+    Iterating over a Trace creates each Job as it is reached, converting the columns a chunk of jobs at a time,
+    so a Simulation consuming it only ever holds its resident jobs, and a memory-mapped trace is read
+    from disk as the simulation gets to it. Jobs get their index in the trace as their id.
+    Indexing creates a new Job each time.
+
+    Args:
+        workload: a Workload sorted by start time, e.g. from load_trace.
+    """
+
+    def __init__(self, workload):
+        self.workload = workload
+        self.start_times = workload.start_times
+        self.priorities = workload.priorities
+        self.job_offsets = workload.job_offsets
+
+    def __len__(self):
+        return len(self.start_times)
+
+    def _task_arrays(self, start, end):
+        """Copies the tasks of jobs start to end - 1 into typed arrays for Job.from_arrays."""
+        first, last = int(self.job_offsets[start]), int(self.job_offsets[end])
+        task_types = array("b")
+        task_types.frombytes(
+            np.ascontiguousarray(
+                self.workload.task_types[first:last], np.int8
+            ).tobytes()
+        )
+        durations = array("q")
+        durations.frombytes(
+            np.ascontiguousarray(
+                self.workload.durations[first:last], np.int64
+            ).tobytes()
+        )
+        return first, task_types, durations
+
+    def __getitem__(self, job_id):
+        if not -len(self) <= job_id < len(self):
+            raise IndexError("trace index out of range")
+        job_id %= len(self)
+        _, task_types, durations = self._task_arrays(job_id, job_id + 1)
+        job = Job.from_arrays(
+            job_id,
+            int(self.priorities[job_id]),
+            task_types,
+            durations,
+            0,
+            len(durations),
+        )
+        return int(self.start_times[job_id]), job
+
+    def __iter__(self):
+        for start in range(0, len(self), CHUNK_SIZE):
+            end = min(start + CHUNK_SIZE, len(self))
+            first, task_types, durations = self._task_arrays(start, end)
+            offsets = (self.job_offsets[start : end + 1] - first).tolist()
+            start_times = self.start_times[start:end].tolist()
+            priorities = self.priorities[start:end].tolist()
+            for i in range(end - start):
+                job = Job.from_arrays(
+                    start + i,
+                    priorities[i],
+                    task_types,
+                    durations,
+                    offsets[i],
+                    offsets[i + 1],
+                )
+                yield start_times[i], job
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert a job log in CSV or JSON Lines format into a trace for main.py --trace"
+    )
+    parser.add_argument("log", help="A .csv or .jsonl job log")
+    parser.add_argument("trace", help="The directory to save the trace to")
+    args = parser.parse_args()
+    if args.log.endswith(".csv"):
+        workload = read_csv_trace(args.log)
+    elif args.log.endswith((".jsonl", ".json")):
+        workload = read_jsonl_trace(args.log)
+    else:
+        parser.error("The job log must be a .csv or .jsonl file")
+    save_trace(workload, args.trace)
+    print(f"Saved {len(workload.start_times)} jobs to {args.trace}")
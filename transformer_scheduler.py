@@ -1,9 +1,51 @@
+# A learned scheduler: a transformer over the job tokens of Simulation.tokenize_state.
+# Inference runs on the CPU. Decisions for many simulations can be made in one forward pass
+# with run_batched, and a decision is reused while the job tokens stay the same.
+import numpy as np
+import torch
+from torch import nn
+
+from schedulers.base import Scheduler
+from tokens import AGE, BLOCKED, NUM_FEATURES, PRIORITY
+
+
 class SchedulerModule(nn.Module):
-    def __init__(self):
+    """
+    Scores each job token with self-attention over all of the job tokens, followed by an MLP.
+
+    Args:
+        num_features: the size of a job token.
+        d_model: the width of the attention layers.
+        num_heads: the number of attention heads.
+        num_layers: the number of self-attention layers.
+        hidden_size: the width of the feed-forward layers and of the scoring MLP.
+    """
+
+    def __init__(
+        self,
+        num_features=NUM_FEATURES,
+        d_model=64,
+        num_heads=4,
+        num_layers=2,
+        hidden_size=128,
+    ):
         super().__init__()
-        pass
+        self.embed = nn.Linear(num_features, d_model)
+        layer = nn.TransformerEncoderLayer(
+            d_model,
+            num_heads,
+            dim_feedforward=hidden_size,
+            dropout=0.0,
+            batch_first=True,
+        )
+        self.encoder = nn.TransformerEncoder(
+            layer, num_layers, enable_nested_tensor=False
+        )
+        self.head = nn.Sequential(
+            nn.Linear(d_model, hidden_size), nn.ReLU(), nn.Linear(hidden_size, 1)
+        )
 
-    def forward(self, simulation_state):
+    def forward(self, tokens, padding_mask):
         """Takes in a simulation state
         as an array of tokens.
         The first tokens should be the job tokens.
@@ -11,18 +53,198 @@ class SchedulerModule(nn.Module):
         then queries only for the job tokens.
         Then feeds the results through an MLP
         and chooses the job with the highest activation.
+
+        Args:
+            tokens: (batch, jobs, num_features) float tensor of job tokens, padded to the same number of jobs.
+            padding_mask: (batch, jobs) bool tensor, True at padding.
+
+        Returns:
+            (batch, jobs) tensor of job scores, -inf at padding.
         """
+        # Token features are non-negative times and counts spanning several orders of magnitude
+        x = self.embed(torch.log1p(tokens))
+        x = self.encoder(x, src_key_padding_mask=padding_mask)
+        scores = self.head(x).squeeze(-1)
+        return scores.masked_fill(padding_mask, float("-inf"))
 
 
-class transformer_scheduler:
+def export_torchscript(module, path):
+    """Saves the module as TorchScript, which can be loaded with torch.jit.load and used without this code."""
+    module.eval()
+    torch.jit.save(torch.jit.script(module), path)
+
+
+def compile_module(module):
+    """Returns the module compiled with torch.compile, for faster CPU inference."""
+    module.eval()
+    return torch.compile(module, dynamic=True)
+
+
+class _DecisionCache:
+    """The tokens of a simulation's last decision, and the jobs picked then."""
+
     def __init__(self):
-        pass
+        self.tokens = np.zeros((0, NUM_FEATURES), np.float32)
+        self.job_ids = np.zeros(0, np.int64)
+        self.choices = None
+
+    def get(self, tokens, job_ids, num_jobs):
+        """Returns the cached choices if the tokens are the same, except for the ages of the jobs."""
+        if self.choices is None or len(self.choices) < num_jobs:
+            return None
+        n = len(tokens)
+        if len(self.job_ids) != n or not np.array_equal(self.job_ids, job_ids):
+            return None
+        # Between decisions every job ages by the same amount, so the ages are left out of the comparison
+        if not (
+            np.array_equal(self.tokens[:, :AGE], tokens[:, :AGE])
+            and np.array_equal(self.tokens[:, AGE + 1 :], tokens[:, AGE + 1 :])
+        ):
+            return None
+        return self.choices[:num_jobs]
+
+    def put(self, tokens, job_ids, choices):
+        self.tokens = np.array(tokens)
+        self.job_ids = np.array(job_ids)
+        self.choices = choices
+
+
+class TransformerScheduler(Scheduler):
+    """
+    Runs the job with the highest score from a SchedulerModule,
+    or with sample, samples a job from the softmax of the scores.
+
+    Args:
+        module: a SchedulerModule, or a TorchScript or compiled export of one. A new module by default.
+        ready_only: only pick jobs which are ready to run.
+        sample: sample jobs in proportion to the softmax of their scores, rather than picking the best.
+        max_tokens: at most this many jobs are scored per decision, which bounds the decision latency.
+            With more resident jobs, the most important and oldest ones are scored.
+        reuse_decisions: reuse the last decision for a simulation while its job tokens are unchanged.
+        generator (optional): a torch.Generator for sampling.
+    """
+
+    def __init__(
+        self,
+        module=None,
+        ready_only=False,
+        sample=False,
+        max_tokens=256,
+        reuse_decisions=True,
+        generator=None,
+    ):
+        super().__init__(ready_only)
+        self.module = SchedulerModule() if module is None else module
+        self.module.eval()
+        self.sample = sample
+        self.max_tokens = max_tokens
+        self.reuse_decisions = reuse_decisions and not sample
+        self.generator = generator
+        self.caches = {}  # id(simulation) -> _DecisionCache
+        self.num_forward_passes = 0
+
+    def on_subscribe(self, simulation):
+        super().on_subscribe(simulation)
+        self.caches.pop(id(simulation), None)
 
     def schedule(self, simulation):
-        pass
-        # TODO:
-        # tokenize the simulation
-        # pass it into the network
-        # get the job token with the greatest activation
-        # (or should I do softmax prob. sampling?)
-        # return the id of that job
+        job_ids = self.schedule_many(simulation, 1)
+        if not job_ids:
+            return self.no_ready_job(simulation)
+        return job_ids[0]
+
+    def schedule_many(self, simulation, num_jobs):
+        return self.decide([simulation], num_jobs)[0]
+
+    def decide(self, simulations, num_jobs=1):
+        """
+        Picks up to num_jobs jobs for each simulation, scoring the states of all of the simulations
+        which can't reuse their last decision in one forward pass.
+
+        Returns:
+            list of lists of job ids, one list per simulation, in order of preference.
+        """
+        decisions = [None] * len(simulations)
+        pending = []
+        for index, simulation in enumerate(simulations):
+            tokens = simulation.tokenize_state()
+            job_ids = simulation.token_buffer.job_ids[: len(tokens)]
+            cache = self.caches.setdefault(id(simulation), _DecisionCache())
+            if self.reuse_decisions:
+                decisions[index] = cache.get(tokens, job_ids, num_jobs)
+            if decisions[index] is None:
+                rows = self._candidates(tokens)
+                pending.append((index, tokens, job_ids, rows, cache))
+
+        if pending:
+            scores = self._score([tokens[rows] for _, tokens, _, rows, _ in pending])
+            for (index, tokens, job_ids, rows, cache), job_scores in zip(
+                pending, scores
+            ):
+                order = self._rank(job_scores, tokens[rows])
+                choices = [int(job_ids[rows[i]]) for i in order[:num_jobs]]
+                cache.put(tokens, job_ids, choices)
+                decisions[index] = choices
+        return decisions
+
+    def _candidates(self, tokens):
+        """Returns the rows of the jobs to score: all of them, or the max_tokens most important and oldest jobs."""
+        if len(tokens) <= self.max_tokens:
+            return np.arange(len(tokens))
+        # priorities are small integers, so they dominate the key and ages only break ties
+        key = tokens[:, PRIORITY] - tokens[:, AGE] / (1 + tokens[:, AGE].max())
+        return np.argpartition(key, self.max_tokens)[: self.max_tokens]
+
+    def _score(self, states):
+        """Scores the jobs of several states in one forward pass. Returns one score array per state."""
+        max_jobs = max(len(state) for state in states)
+        batch = np.zeros((len(states), max_jobs, NUM_FEATURES), np.float32)
+        padding = np.ones((len(states), max_jobs), bool)
+        for i, state in enumerate(states):
+            batch[i, : len(state)] = state
+            padding[i, : len(state)] = False
+        with torch.inference_mode():
+            scores = self.module(torch.from_numpy(batch), torch.from_numpy(padding))
+        self.num_forward_passes += 1
+        return [scores[i, : len(state)] for i, state in enumerate(states)]
+
+    def _rank(self, scores, tokens):
+        """Returns the indices of the jobs in order of preference, leaving out blocked jobs with ready_only."""
+        if self.ready_only:
+            blocked = torch.from_numpy(tokens[:, BLOCKED] > 0)
+            scores = scores.masked_fill(blocked, float("-inf"))
+        num_candidates = int(torch.isfinite(scores).sum())
+        if num_candidates == 0:
+            return []
+        if self.sample:
+            probabilities = torch.softmax(scores, dim=0)
+            order = torch.multinomial(
+                probabilities, num_candidates, generator=self.generator
+            )
+        else:
+            order = torch.argsort(scores, descending=True)[:num_candidates]
+        return order.tolist()
+
+
+def run_batched(simulations, scheduler):
+    """
+    Runs single-core simulations side by side until they are all finished.
+    Whenever simulations are waiting for a decision, the scheduler makes all of their decisions at once.
+    """
+    assert all(simulation.num_cores == 1 for simulation in simulations)
+    for simulation in simulations:
+        scheduler.caches.pop(id(simulation), None)
+        simulation.run_until_scheduling_needed()
+    running = [simulation for simulation in simulations if not simulation.is_finished()]
+    while running:
+        decisions = scheduler.decide(running)
+        for simulation, job_ids in zip(running, decisions):
+            if job_ids:
+                simulation.schedule_job(job_ids[0])
+            else:
+                simulation.schedule_job(scheduler.no_ready_job(simulation))
+            simulation.run_until_scheduling_needed()
+        running = [simulation for simulation in running if not simulation.is_finished()]
+    for simulation in simulations:
+        simulation.history.close()
+    return simulations